@@ -3,6 +3,7 @@ from flask_login import LoginManager
 from .config import Config
 from .db import init_database, create_all_tables
 
+import logging
 import os       
 login_manager = LoginManager()
 from app.ext.cache_buster import init_cache_buster
@@ -22,6 +23,15 @@ def create_app():
         app = Flask(__name__, instance_relative_config=True)
     init_cache_buster(app)
     app.config.from_object(Config)
+
+    # One stderr handler for the app.* loggers (replaces ad-hoc basicConfig/print debugging);
+    # the level can be switched at runtime via /admin/instrumentation
+    app_logger = logging.getLogger('app')
+    if not app_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+        app_logger.addHandler(handler)
+        app_logger.setLevel(Config.LOG_LEVEL.upper())
     with app.app_context():
         init_database(app.config['SQLALCHEMY_DATABASE_URI'])
         # create_all_tables()
@@ -40,6 +50,16 @@ def create_app():
     
     os.makedirs(app.media_save, exist_ok=True)
 
+    # Background export archives - kept outside static/ so they are never publicly served
+    if os.getenv('EXPORT_FOLDER'):
+        app.export_save = os.getenv('EXPORT_FOLDER')
+    elif os.path.exists('/var/www/MLMH'):
+        app.export_save = '/var/www/MLMH/exports'
+    else:
+        app.export_save = os.path.join(app.instance_path, 'exports')
+
+    os.makedirs(app.export_save, exist_ok=True)
+
     @login_manager.user_loader
     def load_user(user_id):  # pylint: disable=unused-variable
         from .services.shared.usManService import UserManagerService
@@ -49,6 +69,12 @@ def create_app():
             return SimpleUser(user_data)
         return None
 
+    @app.before_request
+    def refresh_instrumentation():
+        # Picks up settings POSTed to /admin/instrumentation through another worker (TTL-gated)
+        from .services.admin.instrumentationService import InstrumentationService
+        InstrumentationService.refresh()
+
     @app.before_request
     def require_login():
         from flask import request, redirect, url_for
@@ -125,8 +151,9 @@ def create_app():
     # Static files handled by nginx in production
     
     # Initialize APScheduler for background tasks
-    from .services.schedulerService import init_scheduler
-    init_scheduler(app)
+    if Config.SCHEDULER_ENABLED:
+        from .services.schedulerService import init_scheduler
+        init_scheduler(app)
     
     # Error handlers
     @app.errorhandler(403)
@@ -10,6 +10,7 @@ from .model.assessment.sessions import (
 )
 from .db import get_session, create_all_tables, get_engine
 from .services.SMTP.emailNotificationService import EmailNotificationService
+from .services.camera.capturePathService import CapturePathService
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import text
 
@@ -607,6 +608,434 @@ def register_commands(app):
         except Exception as e:
             click.echo(f"[SNAFU] Failed to setup table: {str(e)}")
 
+    @app.cli.command("migrate-capture-frames")
+    @click.option('--skip-backfill', is_flag=True, help='Only create the table and view, leave existing JSON arrays alone')
+    def migrate_capture_frames(skip_backfill):
+        """Create capture_frames, move JSON filename arrays into it and create the compatibility view."""
+        from .model.assessment.sessions import CaptureFrame
+        from datetime import datetime
+
+        click.echo("[OLKORECT] Setting up capture_frames table...")
+        try:
+            engine = get_engine()
+            CaptureFrame.__table__.create(bind=engine, checkfirst=True)
+            with engine.connect() as conn:
+                # Added after the first release of this table
+                conn.execute(text("ALTER TABLE capture_frames ADD COLUMN IF NOT EXISTS original_size INTEGER"))
+                conn.execute(text("ALTER TABLE capture_frames ADD COLUMN IF NOT EXISTS file_status VARCHAR(20) NOT NULL DEFAULT 'WRITTEN'"))
+                conn.commit()
+            click.echo("  ✓ capture_frames table ready")
+
+            if not skip_backfill:
+                history_keys = ('triggers', 'capture_history', 'capture_count', 'last_updated', 'total_duration_seconds')
+                migrated_captures = 0
+                migrated_frames = 0
+                with get_session() as db:
+                    capture_ids = [row[0] for row in db.query(CameraCapture.id).all()]
+                    for capture_id in capture_ids:
+                        capture = db.query(CameraCapture).filter_by(id=capture_id).first()
+                        if not capture.stored_filenames:
+                            continue
+
+                        metadata = dict(capture.stored_metadata or {})
+                        history = {entry.get('filename'): entry for entry in metadata.get('capture_history', [])}
+                        for filename in capture.stored_filenames:
+                            if not filename:
+                                continue
+                            entry = history.get(filename, {})
+                            captured_at = capture.created_at
+                            if entry.get('timestamp'):
+                                captured_at = datetime.fromisoformat(entry['timestamp'])
+                            db.add(CaptureFrame(
+                                capture_id=capture.id,
+                                session_id=capture.session_id,
+                                filename=filename,
+                                trigger=entry.get('trigger', 'unknown'),
+                                timing=entry.get('timing'),
+                                captured_at=captured_at
+                            ))
+                            migrated_frames += 1
+
+                        # Frames now carry the per-image history; keep the batch-level keys only
+                        metadata.setdefault('started_at', capture.created_at.isoformat())
+                        capture.stored_metadata = {k: v for k, v in metadata.items() if k not in history_keys}
+                        capture.stored_filenames = []
+                        db.commit()
+                        migrated_captures += 1
+
+                click.echo(f"  ✓ Backfilled {migrated_frames} frames from {migrated_captures} captures")
+
+            with engine.connect() as conn:
+                conn.execute(text("""
+                    CREATE OR REPLACE VIEW camera_captures_compat AS
+                    SELECT
+                        c.id, c.session_id, c.assessment_id, c.capture_type, c.created_at,
+                        COALESCE(c.filenames::jsonb, '[]'::jsonb) || COALESCE(f.filenames, '[]'::jsonb) AS filenames,
+                        CASE WHEN f.capture_id IS NULL THEN c.capture_metadata::jsonb
+                        ELSE COALESCE(c.capture_metadata::jsonb, '{}'::jsonb) || jsonb_build_object(
+                            'triggers', COALESCE(c.capture_metadata::jsonb -> 'triggers', '[]'::jsonb) || f.triggers,
+                            'capture_history', COALESCE(c.capture_metadata::jsonb -> 'capture_history', '[]'::jsonb) || f.capture_history,
+                            'capture_count', jsonb_array_length(COALESCE(c.capture_metadata::jsonb -> 'capture_history', '[]'::jsonb)) + f.frame_count,
+                            'last_updated', f.last_updated,
+                            'total_duration_seconds', EXTRACT(EPOCH FROM f.last_updated - COALESCE(
+                                (c.capture_metadata::jsonb ->> 'started_at')::timestamp, f.first_captured))
+                        ) END AS capture_metadata
+                    FROM camera_captures c
+                    LEFT JOIN (
+                        SELECT
+                            capture_id,
+                            jsonb_agg(to_jsonb(filename) ORDER BY captured_at) AS filenames,
+                            jsonb_agg(jsonb_build_object('trigger', "trigger", 'timestamp', captured_at) ORDER BY captured_at) AS triggers,
+                            jsonb_agg(jsonb_strip_nulls(jsonb_build_object(
+                                'filename', filename, 'trigger', "trigger", 'timestamp', captured_at, 'timing', timing::jsonb
+                            )) ORDER BY captured_at) AS capture_history,
+                            COUNT(*) AS frame_count,
+                            MIN(captured_at) AS first_captured,
+                            MAX(captured_at) AS last_updated
+                        FROM capture_frames
+                        WHERE file_status = 'WRITTEN'
+                        GROUP BY capture_id
+                    ) f ON f.capture_id = c.id
+                """))
+                conn.commit()
+            click.echo("  ✓ camera_captures_compat view created")
+
+            click.echo("[OLKORECT] capture_frames migration complete!")
+
+        except Exception as e:
+            click.echo(f"[SNAFU] Failed to migrate capture frames: {str(e)}")
+            click.echo("This command works with PostgreSQL. For other databases, modify the SQL syntax.")
+
+    @app.cli.command("migrate-export-jobs")
+    def migrate_export_jobs():
+        """Allow session_exports rows without a single session (background bulk export jobs)."""
+        click.echo("[OLKORECT] Updating session_exports for background export jobs...")
+        try:
+            engine = get_engine()
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE session_exports ALTER COLUMN session_id DROP NOT NULL"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_session_exports_type_status "
+                    "ON session_exports (export_type, export_status)"
+                ))
+                conn.commit()
+            click.echo("  ✓ session_id is nullable, job status index ready")
+            click.echo("[OLKORECT] export jobs migration complete!")
+
+        except Exception as e:
+            click.echo(f"[SNAFU] Failed to migrate export jobs: {str(e)}")
+            click.echo("This command works with PostgreSQL. For other databases, modify the SQL syntax.")
+
+    @app.cli.command("migrate-llm-turns")
+    @click.option('--skip-backfill', is_flag=True, help='Only create the table and view, leave existing JSON documents alone')
+    def migrate_llm_turns(skip_backfill):
+        """Create llm_turns, move conversation_history JSON turns into it and create the compatibility view."""
+        from .model.assessment.sessions import LLMTurn
+        from datetime import datetime
+
+        click.echo("[OLKORECT] Setting up llm_turns table...")
+        try:
+            engine = get_engine()
+            LLMTurn.__table__.create(bind=engine, checkfirst=True)
+            with engine.connect() as conn:
+                # Rolling context summary, added after the first release of llm_turns
+                conn.execute(text("ALTER TABLE llm_conversations ADD COLUMN IF NOT EXISTS context_summary JSON"))
+                conn.commit()
+            click.echo("  ✓ llm_turns table ready")
+
+            if not skip_backfill:
+                migrated_conversations = 0
+                migrated_turns = 0
+                with get_session() as db:
+                    conversation_ids = [row[0] for row in db.query(LLMConversation.id).all()]
+                    for conversation_id in conversation_ids:
+                        conversation = db.query(LLMConversation).filter_by(id=conversation_id).first()
+                        legacy_turns = (conversation.stored_history or {}).get('turns', [])
+                        if not legacy_turns:
+                            continue
+
+                        existing = {row.turn_number for row in conversation.turn_rows}
+                        for position, turn in enumerate(legacy_turns, start=1):
+                            turn_number = turn.get('turn_number') or position
+                            if turn_number in existing:
+                                continue  # A row already supersedes this JSON turn
+                            created_at = conversation.created_at
+                            if turn.get('created_at'):
+                                created_at = datetime.fromisoformat(turn['created_at'])
+                            db.add(LLMTurn(
+                                conversation_id=conversation.id,
+                                session_id=conversation.session_id,
+                                turn_number=turn_number,
+                                user_message=turn.get('user_message') or '',
+                                ai_message=turn.get('ai_message') or '',
+                                has_end_conversation=bool(turn.get('has_end_conversation')),
+                                ai_model_used=turn.get('ai_model_used'),
+                                user_timing=turn.get('user_timing'),
+                                ai_timing=turn.get('ai_timing'),
+                                response_audio_path=turn.get('response_audio_path'),
+                                transcription=turn.get('transcription'),
+                                created_at=created_at
+                            ))
+                            existing.add(turn_number)
+                            migrated_turns += 1
+
+                        # Rows now carry the turns; keep an empty document for NOT NULL
+                        conversation.stored_history = {"turns": []}
+                        db.commit()
+                        migrated_conversations += 1
+
+                click.echo(f"  ✓ Backfilled {migrated_turns} turns from {migrated_conversations} conversations")
+
+            with engine.connect() as conn:
+                conn.execute(text("""
+                    CREATE OR REPLACE VIEW llm_conversations_compat AS
+                    SELECT
+                        c.id, c.session_id, c.is_completed, c.created_at, c.updated_at, c.completed_at,
+                        CASE WHEN t.conversation_id IS NULL THEN c.conversation_history::jsonb
+                        ELSE COALESCE(c.conversation_history::jsonb, '{}'::jsonb) || jsonb_build_object(
+                            'turns', COALESCE(c.conversation_history::jsonb -> 'turns', '[]'::jsonb) || t.turns,
+                            'total_turns', jsonb_array_length(COALESCE(c.conversation_history::jsonb -> 'turns', '[]'::jsonb)) + t.turn_count,
+                            'last_updated', t.last_updated
+                        ) END AS conversation_history
+                    FROM llm_conversations c
+                    LEFT JOIN (
+                        SELECT
+                            conversation_id,
+                            jsonb_agg(jsonb_strip_nulls(jsonb_build_object(
+                                'turn_number', turn_number, 'user_message', user_message, 'ai_message', ai_message,
+                                'has_end_conversation', has_end_conversation, 'user_message_length', length(user_message),
+                                'ai_model_used', ai_model_used, 'created_at', created_at,
+                                'user_timing', user_timing::jsonb, 'ai_timing', ai_timing::jsonb
+                            )) ORDER BY turn_number) AS turns,
+                            COUNT(*) AS turn_count,
+                            MAX(created_at) AS last_updated
+                        FROM llm_turns
+                        GROUP BY conversation_id
+                    ) t ON t.conversation_id = c.id
+                """))
+                conn.commit()
+            click.echo("  ✓ llm_conversations_compat view created")
+
+            click.echo("[OLKORECT] llm_turns migration complete!")
+
+        except Exception as e:
+            click.echo(f"[SNAFU] Failed to migrate LLM turns: {str(e)}")
+            click.echo("This command works with PostgreSQL. For other databases, modify the SQL syntax.")
+
+    @app.cli.command("migrate-llm-analysis")
+    def migrate_llm_analysis():
+        """Create llm_analysis_batches and add input digests to llm_analysis_results."""
+        from .model.assessment.sessions import LLMAnalysisBatch
+
+        click.echo("[OLKORECT] Setting up LLM analysis tables...")
+        try:
+            engine = get_engine()
+            LLMAnalysisBatch.__table__.create(bind=engine, checkfirst=True)
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE llm_analysis_batches ADD COLUMN IF NOT EXISTS force BOOLEAN NOT NULL DEFAULT FALSE"))
+                conn.execute(text("ALTER TABLE llm_analysis_results ADD COLUMN IF NOT EXISTS input_digest VARCHAR(64)"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_llm_analysis_results_input_digest ON llm_analysis_results (input_digest)"
+                ))
+                conn.commit()
+            click.echo("  ✓ llm_analysis_batches table ready")
+            click.echo("  ✓ llm_analysis_results.input_digest ready (existing results have none and are re-run once)")
+            click.echo("[OLKORECT] LLM analysis migration complete!")
+
+        except Exception as e:
+            click.echo(f"[SNAFU] Failed to migrate LLM analysis tables: {str(e)}")
+            click.echo("This command works with PostgreSQL. For other databases, modify the SQL syntax.")
+
+    @app.cli.command("migrate-instrumentation")
+    def migrate_instrumentation():
+        """Create instrumentation_settings (shared /admin/instrumentation toggles)."""
+        from .model.admin.instrumentation import InstrumentationSettings
+
+        try:
+            InstrumentationSettings.__table__.create(bind=get_engine(), checkfirst=True)
+            click.echo("[OLKORECT] instrumentation_settings table ready")
+        except Exception as e:
+            click.echo(f"[SNAFU] Failed to create instrumentation_settings: {str(e)}")
+
+    @app.cli.command("llm-stub-server")
+    @click.option('--host', default='127.0.0.1', help='Interface to listen on')
+    @click.option('--port', default=8090, help='Port to listen on')
+    @click.option('--tokens-per-second', default=40.0, help='Streaming rate per response')
+    @click.option('--first-token-ms', default=300, help='Delay before the first token')
+    @click.option('--reply-tokens', default=40, help='Tokens per chat reply')
+    @click.option('--end-after-turns', default=10, help='Reply with <end_conversation> from this turn on (0 = never)')
+    @click.option('--end-probability', default=0.0, help='Chance of ending any earlier turn')
+    def llm_stub_server(host, port, tokens_per_second, first_token_ms, reply_tokens, end_after_turns, end_probability):
+        """Serve a local OpenAI-compatible stub for load tests (set OPENAI_BASE_URL to its /v1 URL)."""
+        from .services.llm.openaiStub import StubBehavior, build_stub_server
+
+        behavior = StubBehavior(
+            tokens_per_second=tokens_per_second,
+            first_token_delay=first_token_ms / 1000,
+            reply_tokens=reply_tokens,
+            end_after_turns=end_after_turns,
+            end_probability=end_probability
+        )
+        server = build_stub_server(host, port, behavior)
+        click.echo(f"[OLKORECT] OpenAI stub listening on http://{host}:{port}/v1")
+        click.echo(f"  Start the app with OPENAI_BASE_URL=http://{host}:{port}/v1 to use it")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    @app.cli.command("llm-load-test")
+    @click.option('--base-url', default='http://127.0.0.1:5000', help='Running app to drive (behind nginx or gunicorn directly)')
+    @click.option('--sessions', default=20, help='Concurrent chat sessions')
+    @click.option('--turns', default=5, help='Turns per session (fewer if the conversation ends)')
+    @click.option('--think-time', default=0.0, help='Seconds between a reply and the next message')
+    @click.option('--timeout', default=120.0, help='Per-turn timeout in seconds')
+    @click.option('--process-match', default='gunicorn', help='Command-line substring of the server worker processes')
+    @click.option('--keep-sessions', is_flag=True, help='Leave the load-test sessions in the database')
+    def llm_load_test(base_url, sessions, turns, think_time, timeout, process_match, keep_sessions):
+        """Drive concurrent SSE chat sessions and report TTFT, tokens/s, DB writes per turn and worker load."""
+        import json
+        import secrets
+        from .services.llm.loadTestHarness import ChatLoadTest
+        from .services.session.sessionManager import SessionManager
+        from .services.shared.usManService import UserManagerService
+
+        click.echo(f"[OLKORECT] Preparing {sessions} load-test sessions...")
+        targets = []
+        try:
+            for index in range(sessions):
+                username = f"loadtest_{index:04d}"
+                with get_session() as db:
+                    user = db.query(User).filter_by(uname=username).first()
+                    user_id = user.id if user else None
+                if user_id is None:
+                    user_id = UserManagerService.create_user(
+                        uname=username,
+                        password=secrets.token_urlsafe(16),
+                        user_type_name='user',
+                        email=f"{username}@loadtest.example.com"
+                    ).id
+                # Every run starts from a fresh session so turn numbers and endings are comparable
+                for session in SessionManager.get_user_sessions(user_id):
+                    SessionManager.delete_session(session.id)
+                session = SessionManager.create_session(user_id)
+                targets.append({'session_id': session.id, 'user_id': user_id})
+        except Exception as e:
+            click.echo(f"[SNAFU] Failed to prepare load-test sessions: {str(e)}")
+            return
+
+        click.echo(f"  Driving {len(targets)} sessions x {turns} turns against {base_url}...")
+        report = ChatLoadTest(base_url, targets, turns=turns, think_time=think_time, timeout=timeout,
+                              process_match=process_match).run()
+        click.echo(json.dumps(report, indent=2))
+
+        if not keep_sessions:
+            for target in targets:
+                try:
+                    SessionManager.delete_session(target['session_id'])
+                except Exception as e:
+                    click.echo(f"  ! Could not delete session {target['session_id']}: {str(e)}")
+
+        status = "[OLKORECT]" if report['turns_completed'] and not report['turns_failed'] else "[SNAFU]"
+        click.echo(f"{status} Load test finished: {report['turns_completed']}/{report['turns_attempted']} turns completed")
+
+    @app.cli.command("clear-export-cache")
+    def clear_export_cache():
+        """Remove all cached per-session export archives."""
+        from .services.admin.exportCacheService import ExportCacheService
+
+        try:
+            removed = ExportCacheService.clear()
+            click.echo(f"[OLKORECT] Removed {removed} cached session exports")
+        except Exception as e:
+            click.echo(f"[SNAFU] Failed to clear export cache: {str(e)}")
+
+    @app.cli.command("verify-export")
+    @click.argument('archive_path')
+    @click.option('--no-sources', is_flag=True, help='Only check the archive, not the current storage files')
+    def verify_export(archive_path, no_sources):
+        """Verify an export ZIP against its manifest.json (and the files it was built from)."""
+        from .services.admin.exportManifestService import ExportManifestService
+
+        try:
+            result = ExportManifestService.verify_archive(archive_path, None if no_sources else current_app.media_save)
+            status = "OLKORECT" if result['ok'] else "SNAFU"
+            click.echo(f"[{status}] Checked {result['checked']} members ({result['hash_algorithm']}): "
+                       f"{len(result['corrupt'])} corrupt, {len(result['missing'])} missing")
+            for record in result['corrupt']:
+                click.echo(f"  corrupt: {record['path']}")
+            for path in result['missing']:
+                click.echo(f"  missing: {path}")
+            if result['source_changed'] or result['source_missing']:
+                click.echo(f"  storage drift: {len(result['source_changed'])} changed, "
+                           f"{len(result['source_missing'])} deleted since export")
+        except Exception as e:
+            click.echo(f"[SNAFU] Failed to verify export: {str(e)}")
+
+    @app.cli.command("migrate-capture-layout")
+    @click.option('--storage-path', default=None,
+                  help="Storage root holding the flat files (defaults to each session's camera settings storage_path)")
+    @click.option('--dry-run', is_flag=True, help='Count files that would be moved without moving them')
+    def migrate_capture_layout(storage_path, dry_run):
+        """Move flat capture images into {session_id[:2]}/{session_id}/ shard directories."""
+        import os
+        from .model.admin.camera import CameraSettings
+        from .model.assessment.sessions import CaptureFrame
+
+        try:
+            with get_session() as db:
+                # Only (session_id, filename) pairs - no need to load captures or frames
+                pairs = set(db.query(CaptureFrame.session_id, CaptureFrame.filename).all())
+                for session_id, filenames in db.query(CameraCapture.session_id, CameraCapture.stored_filenames).all():
+                    pairs.update((session_id, filename) for filename in (filenames or []) if filename)
+
+                # Same root the upload path wrote to: the session's camera settings, else the
+                # active settings, else media_save (see CameraStorageService.get_filename_context)
+                active = db.query(CameraSettings.storage_path).filter_by(is_active=True).first()
+                default_root = (active[0] if active else None) or current_app.media_save
+                session_roots = dict(
+                    db.query(AssessmentSession.id, CameraSettings.storage_path)
+                    .join(CameraSettings, AssessmentSession.camera_settings_id == CameraSettings.id)
+                    .filter(CameraSettings.is_active == True).all()
+                )
+
+            def root_for(session_id):
+                return storage_path or session_roots.get(session_id) or default_root
+
+            roots = sorted({root_for(session_id) for session_id, _ in pairs})
+            click.echo(f"[OLKORECT] Moving capture images in {', '.join(roots) or root_for(None)} "
+                       f"to sharded layout...")
+
+            moved = 0
+            already_sharded = 0
+            missing = 0
+            for session_id, filename in sorted(pairs):
+                root = root_for(session_id)
+                legacy_path = CapturePathService.get_legacy_path(root, filename)
+                if not os.path.isfile(legacy_path):
+                    if os.path.isfile(CapturePathService.get_write_path(root, session_id, filename)):
+                        already_sharded += 1
+                    else:
+                        missing += 1
+                    continue
+                if dry_run:
+                    moved += 1
+                    continue
+                try:
+                    if CapturePathService.move_to_sharded(root, session_id, filename):
+                        moved += 1
+                except OSError as e:
+                    click.echo(f"  ⚠️  Could not move {filename}: {str(e)}")
+
+            action = "Would move" if dry_run else "Moved"
+            click.echo(f"  ✓ {action} {moved} files ({already_sharded} already sharded, {missing} missing)")
+            click.echo("[OLKORECT] Capture layout migration complete!")
+
+        except Exception as e:
+            click.echo(f"[SNAFU] Failed to migrate capture layout: {str(e)}")
+
     @app.cli.command("list-users")
     def list_users():
         """List all users in the database."""
@@ -1496,17 +1925,16 @@ def register_commands(app):
                     
                     # Delete physical files
                     for capture in camera_capture_records:
-                        if capture.filenames:
-                            for filename in capture.filenames:
+                        if capture.all_filenames:
+                            for filename in capture.all_filenames:
                                 try:
                                     # Use current_app.media_save path
-                                    file_path = os.path.join(current_app.config.get('UPLOAD_FOLDER', current_app.root_path + '/static/uploads'), filename)
+                                    upload_root = current_app.config.get('UPLOAD_FOLDER', current_app.root_path + '/static/uploads')
                                     # Also try media_save attribute
                                     if hasattr(current_app, 'media_save'):
-                                        file_path = os.path.join(current_app.media_save, filename)
+                                        upload_root = current_app.media_save
                                     
-                                    if os.path.exists(file_path):
-                                        os.remove(file_path)
+                                    if CapturePathService.remove(upload_root, capture.session_id, filename):
                                         camera_files_deleted += 1
                                 except Exception as file_error:
                                     click.echo(f"   ⚠️  Could not delete file {filename}: {str(file_error)}")
@@ -1609,16 +2037,14 @@ def register_commands(app):
                 media_path = current_app.media_save if hasattr(current_app, 'media_save') else os.path.join(current_app.root_path, 'static', 'uploads')
                 
                 for capture in unlinked_captures:
-                    if capture.filenames and isinstance(capture.filenames, list):
+                    if capture.all_filenames:
                         # Delete physical files
-                        for filename in capture.filenames:
+                        for filename in capture.all_filenames:
                             if not filename:  # Skip empty filenames
                                 continue
                             
-                            file_path = os.path.join(media_path, filename)
                             try:
-                                if os.path.exists(file_path):
-                                    os.remove(file_path)
+                                if CapturePathService.remove(media_path, capture.session_id, filename):
                                     files_deleted += 1
                                 else:
                                     files_not_found += 1
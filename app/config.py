@@ -16,7 +16,46 @@ class Config:
     MAX_CONTENT_LENGTH: int = int(os.getenv('MAX_CONTENT_LENGTH', '52428800'))
     DEFAULT_SESSION_TIMEOUT: int = int(os.getenv('DEFAULT_SESSION_TIMEOUT', '3600'))
     CAMERA_MAX_PHOTOS: int = int(os.getenv('CAMERA_MAX_PHOTOS', '10'))
+    # Camera frame transcoding on ingest - empty FRAME_TRANSCODE_FORMAT keeps uploaded bytes as-is
+    FRAME_TRANSCODE_FORMAT: str = os.getenv('FRAME_TRANSCODE_FORMAT', '')  # JPEG or WEBP
+    FRAME_TRANSCODE_MAX_DIMENSION: int = int(os.getenv('FRAME_TRANSCODE_MAX_DIMENSION', '0'))
+    FRAME_TRANSCODE_QUALITY: int = int(os.getenv('FRAME_TRANSCODE_QUALITY', '80'))
+    FRAME_TRANSCODE_WORKERS: int = int(os.getenv('FRAME_TRANSCODE_WORKERS', '2'))
+    # Background export jobs - when set, finished archives are handed to nginx (internal location) via X-Accel-Redirect
+    EXPORT_ACCEL_REDIRECT_PREFIX: str = os.getenv('EXPORT_ACCEL_REDIRECT_PREFIX', '')  # e.g. /protected-exports/
+    EXPORT_JOB_RETENTION_DAYS: int = int(os.getenv('EXPORT_JOB_RETENTION_DAYS', '3'))
+    EXPORT_WORKERS: int = int(os.getenv('EXPORT_WORKERS', '4'))  # Sessions prepared concurrently per export
+    # Per-session export archive cache (LRU on disk under the export folder); 0 disables it
+    EXPORT_CACHE_MAX_BYTES: int = int(os.getenv('EXPORT_CACHE_MAX_BYTES', str(5 * 1024 ** 3)))
+    # hashlib algorithm for export manifests (per-member hashes computed while streaming)
+    EXPORT_MANIFEST_HASH: str = os.getenv('EXPORT_MANIFEST_HASH', 'blake2b')
+    LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
+    # Hot-path counters/stage timers and sampled debug logs (switchable at runtime via /admin/instrumentation)
+    INSTRUMENTATION_ENABLED: bool = os.getenv('INSTRUMENTATION_ENABLED', 'True').lower() in ('true', '1', 'yes')
+    INSTRUMENTATION_DEBUG_SAMPLE_RATE: float = float(os.getenv('INSTRUMENTATION_DEBUG_SAMPLE_RATE', '0.01'))
+    # Seconds between each worker's re-read of the shared instrumentation_settings row
+    INSTRUMENTATION_SETTINGS_TTL: int = int(os.getenv('INSTRUMENTATION_SETTINGS_TTL', '15'))
     OPENAI_MODEL: str = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+    # OpenAI-compatible endpoint for every LLM call (e.g. http://127.0.0.1:8090/v1 for `flask llm-stub-server`); empty = api.openai.com
+    OPENAI_BASE_URL: str = os.getenv('OPENAI_BASE_URL', '')
+    # Shared per-process HTTP pool for all OpenAI calls (HTTP/2 when the h2 package is installed)
+    OPENAI_HTTP2: bool = os.getenv('OPENAI_HTTP2', 'True').lower() in ('true', '1', 'yes')
+    OPENAI_MAX_CONNECTIONS: int = int(os.getenv('OPENAI_MAX_CONNECTIONS', '100'))
+    OPENAI_MAX_KEEPALIVE: int = int(os.getenv('OPENAI_MAX_KEEPALIVE', '20'))
+    OPENAI_KEEPALIVE_EXPIRY: float = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '60'))
+    # Seconds a worker trusts its cached active LLM settings (changes made through another worker show up after this)
+    LLM_SETTINGS_CACHE_TTL: int = int(os.getenv('LLM_SETTINGS_CACHE_TTL', '30'))
+    # SSE comment pings while a chat stream is open but quiet (keeps proxies from timing it out)
+    SSE_HEARTBEAT_SECONDS: float = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+    # Tokens of chat history sent per request (older turns are folded into a rolling summary); 0 sends the full history
+    LLM_CONTEXT_TOKEN_BUDGET: int = int(os.getenv('LLM_CONTEXT_TOKEN_BUDGET', '3000'))
+    LLM_CONTEXT_SUMMARY_TOKENS: int = int(os.getenv('LLM_CONTEXT_SUMMARY_TOKENS', '400'))
+    # Background batch analysis - one batch runs at a time across workers; concurrent calls per batch (capped at the DB pool size), limited to the provider's per-minute limits for the model
+    LLM_ANALYSIS_CONCURRENCY: int = int(os.getenv('LLM_ANALYSIS_CONCURRENCY', '16'))
+    LLM_ANALYSIS_RPM: int = int(os.getenv('LLM_ANALYSIS_RPM', '500'))
+    LLM_ANALYSIS_TPM: int = int(os.getenv('LLM_ANALYSIS_TPM', '200000'))
+    LLM_ANALYSIS_MAX_RETRIES: int = int(os.getenv('LLM_ANALYSIS_MAX_RETRIES', '5'))
+    LLM_ANALYSIS_TIMEOUT: float = float(os.getenv('LLM_ANALYSIS_TIMEOUT', '60'))
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
     SQLALCHEMY_ECHO: bool = DEBUG
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
@@ -35,6 +74,8 @@ class Config:
     CANCEL_URL: str = BASE_URL if BASE_URL else '/'
     
     # APScheduler Configuration
+    # Off on the gevent chat stream instance (gunicorn.stream.conf.py) - jobs run on the main workers only
+    SCHEDULER_ENABLED: bool = os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'true'
     OTP_CLEANUP_INTERVAL_HOURS: int = int(os.getenv('OTP_CLEANUP_INTERVAL_HOURS', '1'))
     SESMAN_ELI_DAYS: int = int(os.getenv('SESMAN_ELI_DAYS', '14'))
     SESMAN_NOTIFICATION_HOUR: int = int(os.getenv('SESMAN_NOTIFICATION_HOUR', '9'))
@@ -48,6 +48,12 @@ def get_engine():
     return _engine
 
 
+def get_pool_size(default: int = 5) -> int:
+    """Connections the engine keeps pooled (pool_size), or default for pools without a fixed size."""
+    size = getattr(get_engine().pool, 'size', None)
+    return size() if callable(size) else default
+
+
 def get_session():
     """Get database session context manager."""
     if _get_session is None:
@@ -64,7 +70,8 @@ def create_all_tables():
     from .model.admin.camera import CameraSettings
     from .model.admin.llm import LLMSettings
     from .model.admin.consent import ConsentSettings
-    from .model.assessment.sessions import AssessmentSession, PHQResponse, LLMConversation, LLMAnalysisResult, CameraCapture, SessionExport
+    from .model.admin.instrumentation import InstrumentationSettings
+    from .model.assessment.sessions import AssessmentSession, PHQResponse, LLMConversation, LLMTurn, LLMAnalysisResult, LLMAnalysisBatch, CameraCapture, CaptureFrame, SessionExport
     from .model.assessment.facial_analysis import SessionFacialAnalysis
     engine = get_engine()
     Base.metadata.create_all(bind=engine)
@@ -5,4 +5,5 @@ from .admin.llm import LLMSettings
 from .admin.phq import PHQSettings
 from .admin.camera import CameraSettings
 from .admin.consent import ConsentSettings
-from .assessment.sessions import AssessmentSession, PHQResponse, LLMConversation, LLMAnalysisResult, CameraCapture
\ No newline at end of file
+from .admin.instrumentation import InstrumentationSettings
+from .assessment.sessions import AssessmentSession, PHQResponse, LLMConversation, LLMTurn, LLMAnalysisResult, LLMAnalysisBatch, CameraCapture, CaptureFrame
\ No newline at end of file
@@ -0,0 +1,20 @@
+# app/model/admin/instrumentation.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Boolean, Float, DateTime
+from ..base import BaseModel
+
+
+class InstrumentationSettings(BaseModel):
+    """Single row shared by every worker; each one re-reads it every INSTRUMENTATION_SETTINGS_TTL seconds"""
+    __tablename__ = 'instrumentation_settings'
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    debug_sample_rate: Mapped[float] = mapped_column(Float, default=0.01, nullable=False)
+    log_level: Mapped[Optional[str]] = mapped_column(String(10))  # None keeps LOG_LEVEL
+    reset_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))  # Workers reset counters started before this
+
+    def __repr__(self) -> str:
+        return f"<InstrumentationSettings enabled={self.enabled} rate={self.debug_sample_rate}>"
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 import uuid
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..base import BaseModel
 
@@ -364,32 +364,205 @@ class LLMConversation(BaseModel):
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     session_id: Mapped[str] = mapped_column(String(36), ForeignKey('assessment_sessions.id', ondelete='CASCADE'), nullable=False)
-    # Entire conversation as JSON
-    conversation_history: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
+    # Legacy JSON document - new turns go to llm_turns instead
+    stored_history: Mapped[Dict[str, Any]] = mapped_column('conversation_history', JSON, nullable=False)
+    # Rolling summary of turns that no longer fit the chat context budget: {text, through_turn, updated_at}
+    context_summary: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
     
     is_completed: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.utcnow())
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.utcnow(), onupdate=lambda: datetime.utcnow())
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     session = relationship("AssessmentSession", back_populates="llm_conversations")
+    # Eager (selectin) so detached conversations still expose conversation_history
+    turn_rows = relationship("LLMTurn", back_populates="conversation", cascade="all, delete-orphan",
+                             lazy="selectin", order_by="LLMTurn.turn_number")
+
+    @staticmethod
+    def merge_turns(legacy_turns: List[Dict[str, Any]], rows: List['LLMTurn']) -> List[Dict[str, Any]]:
+        """Legacy JSON turns plus llm_turns rows (a row wins over a legacy turn with the same number), in turn order"""
+        turns = {turn.get('turn_number'): turn for turn in legacy_turns}
+        for row in rows:
+            turns[row.turn_number] = row.to_turn_dict()
+        return sorted(turns.values(), key=lambda turn: turn.get('turn_number') or 0)
+
+    @property
+    def turns(self) -> List[Dict[str, Any]]:
+        return LLMConversation.merge_turns((self.stored_history or {}).get('turns', []), self.turn_rows)
+
+    @property
+    def conversation_history(self) -> Dict[str, Any]:
+        """Compatibility view: the legacy {"turns": [...]} document rebuilt from llm_turns"""
+        history = dict(self.stored_history or {})
+        if not self.turn_rows:
+            history.setdefault('turns', [])
+            return history
+
+        turns = self.turns
+        history.update({
+            'turns': turns,
+            'total_turns': len(turns),
+            'last_updated': max(row.created_at for row in self.turn_rows).isoformat()
+        })
+        return history
+
+    @conversation_history.setter
+    def conversation_history(self, value: Dict[str, Any]) -> None:
+        self.stored_history = value
+
     def __repr__(self):
         return f'<LLMConversation {self.id}: Session {self.session_id}>'
 
+
+class LLMTurn(BaseModel):
+    """One row per chat turn - append-only replacement for LLMConversation's growing JSON document"""
+    __tablename__ = 'llm_turns'
+    __table_args__ = (UniqueConstraint('session_id', 'turn_number', name='uq_llm_turns_session_turn'),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    conversation_id: Mapped[str] = mapped_column(String(36), ForeignKey('llm_conversations.id', ondelete='CASCADE'), nullable=False, index=True)
+    session_id: Mapped[str] = mapped_column(String(36), ForeignKey('assessment_sessions.id', ondelete='CASCADE'), nullable=False)
+    turn_number: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_message: Mapped[str] = mapped_column(Text, nullable=False, default='')
+    ai_message: Mapped[str] = mapped_column(Text, nullable=False, default='')
+    has_end_conversation: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    ai_model_used: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    user_timing: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    ai_timing: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    response_audio_path: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    transcription: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.utcnow(), nullable=False)
+    conversation = relationship("LLMConversation", back_populates="turn_rows")
+
+    def to_turn_dict(self) -> Dict[str, Any]:
+        """Same shape as the legacy conversation_history['turns'] entries"""
+        turn = {
+            'turn_number': self.turn_number,
+            'user_message': self.user_message,
+            'ai_message': self.ai_message,
+            'has_end_conversation': self.has_end_conversation,
+            'user_message_length': len(self.user_message or ''),
+            'ai_model_used': self.ai_model_used,
+            'created_at': self.created_at.isoformat()
+        }
+        for key in ('user_timing', 'ai_timing', 'response_audio_path', 'transcription'):
+            value = getattr(self, key)
+            if value:
+                turn[key] = value
+        return turn
+
+    def __repr__(self):
+        return f'<LLMTurn {self.turn_number} for session {self.session_id}>'
+
 class CameraCapture(BaseModel):
     __tablename__ = 'camera_captures'
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     session_id: Mapped[str] = mapped_column(String(36), ForeignKey('assessment_sessions.id', ondelete='CASCADE'), nullable=False)
     assessment_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True)  # Can reference either LLM or PHQ record, set after assessment creation
-    filenames: Mapped[List[str]] = mapped_column(JSON, nullable=False)
+    # Legacy/batch JSON columns - incremental uploads go to capture_frames instead
+    stored_filenames: Mapped[List[str]] = mapped_column('filenames', JSON, nullable=False, default=list)
     capture_type: Mapped[str] = mapped_column(String(50), nullable=False)  # LLM or PHQ
-    capture_metadata: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=True)  # Rich batch metadata
+    stored_metadata: Mapped[Dict[str, Any]] = mapped_column('capture_metadata', JSON, nullable=True)  # Rich batch metadata
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.utcnow())
     session = relationship("AssessmentSession", back_populates="camera_captures")
-    
+    # Eager (selectin) so detached captures still expose filenames/capture_metadata
+    frames = relationship("CaptureFrame", back_populates="capture", cascade="all, delete-orphan",
+                          lazy="selectin", order_by="CaptureFrame.captured_at")
+
+    @property
+    def written_frames(self) -> List['CaptureFrame']:
+        """Frames whose file is on disk - queued or failed writes are left out"""
+        return [frame for frame in self.frames if frame.file_status == 'WRITTEN']
+
+    @property
+    def filenames(self) -> List[str]:
+        """Legacy JSON filenames followed by append-only frame filenames"""
+        return list(self.stored_filenames or []) + [frame.filename for frame in self.written_frames]
+
+    @filenames.setter
+    def filenames(self, value: List[str]) -> None:
+        self.stored_filenames = value
+
+    @property
+    def all_filenames(self) -> List[str]:
+        """Every filename including frames still queued or failed - for deleting files"""
+        return list(self.stored_filenames or []) + [frame.filename for frame in self.frames]
+
+    @property
+    def capture_metadata(self) -> Dict[str, Any]:
+        """Compatibility view: legacy metadata with triggers/capture_history rebuilt from frames"""
+        metadata = dict(self.stored_metadata or {})
+        frames = self.written_frames
+        if not frames:
+            return metadata
+
+        triggers = list(metadata.get('triggers', []))
+        capture_history = list(metadata.get('capture_history', []))
+        for frame in frames:
+            timestamp_iso = frame.captured_at.isoformat()
+            triggers.append({'trigger': frame.trigger, 'timestamp': timestamp_iso})
+            capture_history.append(frame.to_history_entry())
+
+        started_at = metadata.get('started_at') or capture_history[0]['timestamp']
+        last_updated = frames[-1].captured_at
+        metadata.update({
+            'triggers': triggers,
+            'capture_count': len(capture_history),
+            'started_at': started_at,
+            'last_updated': last_updated.isoformat(),
+            'capture_history': capture_history,
+            'total_duration_seconds': (last_updated - datetime.fromisoformat(started_at)).total_seconds()
+        })
+        return metadata
+
+    @capture_metadata.setter
+    def capture_metadata(self, value: Dict[str, Any]) -> None:
+        self.stored_metadata = value
+
+    def history_by_filename(self) -> Dict[str, Dict[str, Any]]:
+        """capture_history entries keyed by filename (first entry wins, like the old linear scans)"""
+        history: Dict[str, Dict[str, Any]] = {}
+        for entry in (self.stored_metadata or {}).get('capture_history', []):
+            history.setdefault(entry.get('filename'), entry)
+        for frame in self.written_frames:
+            history.setdefault(frame.filename, frame.to_history_entry())
+        return history
+
     def __repr__(self):
         return f'<CameraCapture {self.id}: {len(self.filenames)} files for session {self.session_id}>'
 
 
+class CaptureFrame(BaseModel):
+    """One row per uploaded image - append-only replacement for the growing CameraCapture JSON arrays"""
+    __tablename__ = 'capture_frames'
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    capture_id: Mapped[str] = mapped_column(String(36), ForeignKey('camera_captures.id', ondelete='CASCADE'), nullable=False, index=True)
+    session_id: Mapped[str] = mapped_column(String(36), ForeignKey('assessment_sessions.id', ondelete='CASCADE'), nullable=False, index=True)
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    trigger: Mapped[str] = mapped_column(String(50), nullable=False)
+    timing: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)  # Assessment timing sent by the frontend
+    original_size: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Uploaded bytes before transcoding
+    captured_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(), nullable=False)
+    # PENDING until the ingest writer has the file on disk, then WRITTEN (or FAILED)
+    file_status: Mapped[str] = mapped_column(String(20), nullable=False, default='WRITTEN', server_default='WRITTEN')
+    capture = relationship("CameraCapture", back_populates="frames")
+
+    def to_history_entry(self) -> Dict[str, Any]:
+        """Same shape as the legacy capture_metadata['capture_history'] entries"""
+        entry = {
+            'filename': self.filename,
+            'trigger': self.trigger,
+            'timestamp': self.captured_at.isoformat()
+        }
+        if self.timing:
+            entry['timing'] = self.timing
+        return entry
+
+    def __repr__(self):
+        return f'<CaptureFrame {self.filename} ({self.trigger}) for capture {self.capture_id}>'
+
+
 class LLMAnalysisResult(BaseModel):
     __tablename__ = 'llm_analysis_results'
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -404,14 +577,41 @@ class LLMAnalysisResult(BaseModel):
     total_aspects_detected: Mapped[int] = mapped_column(Integer, nullable=False)
     average_severity_score: Mapped[float] = mapped_column(nullable=False)  # 0-3 average
     analysis_confidence: Mapped[Optional[float]] = mapped_column(nullable=True)  # AI confidence in analysis
+    # sha256 of chat history + aspects + scale + model + prompt version - an unchanged input reuses this result
+    input_digest: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.utcnow())
     session = relationship("AssessmentSession")
     def __repr__(self):
         return f'<LLMAnalysisResult {self.id}: {self.total_aspects_detected} aspects for session {self.session_id}>'
+
+
+class LLMAnalysisBatch(BaseModel):
+    """Background batch of conversation analyses - PENDING → RUNNING → COMPLETED/FAILED"""
+    __tablename__ = 'llm_analysis_batches'
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    session_ids: Mapped[List[str]] = mapped_column(JSON, nullable=False)
+    # {"total", "done", "succeeded", "failed", "reused", "retries"}
+    progress: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
+    # Per-session outcome, written as sessions finish: {session_id: {"status", "analysis_id"|"error"}}
+    results: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    status: Mapped[str] = mapped_column(String(20), default='PENDING')
+    # Re-analyze even when a result with the same input digest exists
+    force: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    requested_by_user: Mapped[int] = mapped_column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.utcnow())
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    requested_by = relationship("User")
+
+    def __repr__(self):
+        return f'<LLMAnalysisBatch {self.id}: {self.status} ({len(self.session_ids or [])} sessions)>'
+
+
 class SessionExport(BaseModel):
     __tablename__ = 'session_exports'
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    session_id: Mapped[str] = mapped_column(String(36), ForeignKey('assessment_sessions.id', ondelete='CASCADE'), nullable=False)
+    # NULL for multi-session jobs (BULK_SESSIONS / ALL_SESSIONS) - session ids live in export_data['params']
+    session_id: Mapped[Optional[str]] = mapped_column(String(36), ForeignKey('assessment_sessions.id', ondelete='CASCADE'), nullable=True)
     export_type: Mapped[str] = mapped_column(String(50), nullable=False)
 
     export_data: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
@@ -1,13 +1,30 @@
 # app/routes/admin/export_routes.py
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, Response, stream_with_context, send_file
 from flask_login import login_required, current_user
+from ...config import Config
 from ...decorators import admin_required, raw_response, api_response
 from ...services.admin.exportService import ExportService
+from ...services.admin.exportJobService import ExportJobService
+from ...services.admin.exportManifestService import ExportManifestService
+from ...services.admin.tabularExportService import TabularExportService
 from ...services.session.sessionManager import SessionManager
 
 export_bp = Blueprint('export', __name__, url_prefix='/admin/export')
 
 
+def zip_stream_response(chunks, filename: str) -> Response:
+    """Stream a ZIP generator as a download without buffering it in the worker"""
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            # Let nginx pass chunks through instead of spooling the archive first
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
 @export_bp.route('/session/<session_id>')
 @login_required
 @admin_required
@@ -15,15 +32,10 @@ export_bp = Blueprint('export', __name__, url_prefix='/admin/export')
 def export_session(session_id):
     """Export single session as ZIP download"""
     try:
-        zip_buffer = ExportService.export_session(session_id)
+        zip_stream = ExportService.stream_session(session_id)
         filename = ExportService.get_export_filename(session_id)
         
-        return send_file(
-            zip_buffer,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/zip'
-        )
+        return zip_stream_response(zip_stream, filename)
         
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
@@ -36,23 +48,26 @@ def export_session(session_id):
 @admin_required
 @raw_response
 def export_bulk_sessions():
-    """Export multiple sessions as ZIP of ZIPs"""
+    """Export multiple sessions as ZIP of ZIPs ({"background": true} queues a job instead of streaming)"""
     try:
         data = request.get_json()
         session_ids = data.get('session_ids', [])
+        # 'nested' = ZIP of per-session ZIPs (default), 'flat' = one archive with a folder per session
+        layout = data.get('layout', 'nested')
         
         if not session_ids:
             return jsonify({"error": "No session IDs provided"}), 400
+        if layout not in ('nested', 'flat'):
+            return jsonify({"error": "layout must be 'nested' or 'flat'"}), 400
+
+        if data.get('background'):
+            job = ExportJobService.queue_export_job('BULK_SESSIONS', current_user.id, session_ids, layout)
+            return jsonify(job), 202
         
-        zip_buffer = ExportService.export_bulk_sessions(session_ids)
+        zip_stream = ExportService.stream_bulk_sessions(session_ids, layout)
         filename = ExportService.get_bulk_export_filename()
         
-        return send_file(
-            zip_buffer,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/zip'
-        )
+        return zip_stream_response(zip_stream, filename)
         
     except Exception as e:
         return jsonify({"error": f"Bulk export failed: {str(e)}"}), 500
@@ -63,22 +78,170 @@ def export_bulk_sessions():
 @admin_required
 @raw_response
 def export_all_sessions():
-    """Export all sessions organized by session number"""
+    """Export all sessions organized by session number (?layout=flat for folders, ?background=1 to queue a job)"""
     try:
-        zip_buffer = ExportService.export_sessions_by_session_number()
+        layout = request.args.get('layout', 'nested')
+        if layout not in ('nested', 'flat'):
+            return jsonify({"error": "layout must be 'nested' or 'flat'"}), 400
+
+        if request.args.get('background') in ('1', 'true'):
+            job = ExportJobService.queue_export_job('ALL_SESSIONS', current_user.id, layout=layout)
+            return jsonify(job), 202
+
+        zip_stream = ExportService.stream_sessions_by_session_number(layout)
         filename = ExportService.get_all_sessions_export_filename()
         
-        return send_file(
-            zip_buffer,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/zip'
-        )
+        return zip_stream_response(zip_stream, filename)
         
     except Exception as e:
         return jsonify({"error": f"All sessions export failed: {str(e)}"}), 500
 
 
+@export_bp.route('/delta')
+@login_required
+@admin_required
+@raw_response
+def export_delta_sessions():
+    """Export only what changed since ?since=<ISO timestamp> or ?since_export=<export job id> (?background=1 to queue)"""
+    try:
+        try:
+            since = ExportService.resolve_delta_watermark(
+                request.args.get('since'), request.args.get('since_export')
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if request.args.get('background') in ('1', 'true'):
+            job = ExportJobService.queue_export_job('DELTA_SESSIONS', current_user.id, since=since)
+            return jsonify(job), 202
+
+        zip_stream = ExportService.stream_delta_sessions(since)
+        filename = ExportService.get_delta_export_filename(since)
+
+        return zip_stream_response(zip_stream, filename)
+
+    except Exception as e:
+        return jsonify({"error": f"Delta export failed: {str(e)}"}), 500
+
+
+@export_bp.route('/tables')
+@login_required
+@admin_required
+@raw_response
+def export_research_tables():
+    """Flat research tables as CSV or Parquet (?format=csv|parquet, ?tables=phq_items,llm_turns, ?background=1)"""
+    try:
+        export_format = request.args.get('format', 'csv')
+        tables = [t for t in request.args.get('tables', '').split(',') if t]
+
+        try:
+            zip_stream = TabularExportService.stream_tables(export_format, tables)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if request.args.get('background') in ('1', 'true'):
+            job = ExportJobService.queue_export_job('TABULAR', current_user.id, export_format=export_format,
+                                                    tables=tables)
+            return jsonify(job), 202
+
+        filename = TabularExportService.get_export_filename(export_format)
+        return zip_stream_response(zip_stream, filename)
+
+    except Exception as e:
+        return jsonify({"error": f"Tabular export failed: {str(e)}"}), 500
+
+
+@export_bp.route('/jobs/<job_id>')
+@login_required
+@admin_required
+@api_response
+def get_export_job(job_id):
+    """Status and progress of a background export job"""
+    try:
+        job = ExportJobService.get_job_status(job_id)
+        if not job:
+            return {"success": False, "message": "Export job not found"}, 404
+        return job, 200
+    except Exception as e:
+        return {"success": False, "message": f"Failed to get export job: {str(e)}"}, 500
+
+
+@export_bp.route('/jobs/<job_id>/download')
+@login_required
+@admin_required
+@raw_response
+def download_export_job(job_id):
+    """Download a finished export archive (Range requests supported, so downloads can resume)"""
+    try:
+        artifact = ExportJobService.get_artifact(job_id)
+        if not artifact:
+            return jsonify({"error": "Export is not ready or no longer available"}), 404
+
+        if Config.EXPORT_ACCEL_REDIRECT_PREFIX:
+            # nginx serves the file itself (sendfile + Range) from its internal location
+            response = Response(mimetype='application/zip')
+            response.headers['X-Accel-Redirect'] = Config.EXPORT_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + artifact['file_name']
+            response.headers['Content-Disposition'] = f'attachment; filename="{artifact["download_name"]}"'
+        else:
+            response = send_file(
+                artifact['path'],
+                mimetype='application/zip',
+                as_attachment=True,
+                download_name=artifact['download_name'],
+                conditional=True
+            )
+
+        archive = artifact.get('archive')
+        if archive:
+            # Whole-file hash so a resumed/assembled download can be checked client-side
+            response.headers['X-Export-Hash'] = f"{archive['hash_algorithm']}={archive['hash']}"
+        return response
+
+    except Exception as e:
+        return jsonify({"error": f"Export download failed: {str(e)}"}), 500
+
+
+@export_bp.route('/jobs/<job_id>/manifest')
+@login_required
+@admin_required
+@api_response
+def get_export_job_manifest(job_id):
+    """Manifest of a finished export (member sizes, hashes and byte offsets for ranged repair)"""
+    try:
+        artifact = ExportJobService.get_artifact(job_id)
+        if not artifact:
+            return {"success": False, "message": "Export is not ready or no longer available"}, 404
+        manifest = ExportManifestService.read_manifest(artifact['path'])
+        manifest['archive'] = artifact.get('archive')
+        return manifest, 200
+    except ValueError as e:
+        return {"success": False, "message": str(e)}, 404
+    except Exception as e:
+        return {"success": False, "message": f"Failed to read export manifest: {str(e)}"}, 500
+
+
+@export_bp.route('/jobs/<job_id>/verify', methods=['POST'])
+@login_required
+@admin_required
+@api_response
+def verify_export_job(job_id):
+    """
+    Queue re-verification of a finished export against its manifest and current storage
+    (?sources=0 skips storage). Poll /jobs/<returned job_id> - the report is in 'result'.
+    """
+    try:
+        job = ExportJobService.queue_verify_job(
+            job_id, current_user.id, check_sources=request.args.get('sources', '1') not in ('0', 'false')
+        )
+        if job is None:
+            return {"success": False, "message": "Export is not ready or no longer available"}, 404
+        return job, 202
+    except ValueError as e:
+        return {"success": False, "message": str(e)}, 400
+    except Exception as e:
+        return {"success": False, "message": f"Export verification failed: {str(e)}"}, 500
+
+
 @export_bp.route('/session/<session_id>/delete', methods=['DELETE'])
 @admin_required
 @api_response
@@ -240,15 +403,10 @@ def mark_session_complete(session_id):
 def export_session_facial_analysis(session_id):
     """Export single session with facial analysis JSONL + processed images"""
     try:
-        zip_buffer = ExportService.export_session_with_facial_analysis(session_id)
+        zip_stream = ExportService.stream_session_with_facial_analysis(session_id)
         filename = ExportService.get_facial_analysis_export_filename(session_id)
 
-        return send_file(
-            zip_buffer,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/zip'
-        )
+        return zip_stream_response(zip_stream, filename)
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
@@ -269,15 +427,10 @@ def export_bulk_facial_analysis():
         if not session_ids:
             return jsonify({"error": "No session IDs provided"}), 400
 
-        zip_buffer = ExportService.export_bulk_facial_analysis(session_ids)
+        zip_stream = ExportService.stream_bulk_facial_analysis(session_ids)
         filename = ExportService.get_bulk_facial_analysis_export_filename()
 
-        return send_file(
-            zip_buffer,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/zip'
-        )
+        return zip_stream_response(zip_stream, filename)
 
     except Exception as e:
         return jsonify({"error": f"Bulk facial analysis export failed: {str(e)}"}), 500
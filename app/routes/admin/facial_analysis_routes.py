@@ -4,7 +4,7 @@ Admin routes for facial analysis processing
 Dedicated management page for processing facial expression analysis
 """
 
-from flask import Blueprint, current_app, render_template, send_file, abort
+from flask import Blueprint, current_app, render_template, send_file, abort, request
 from flask_login import login_required, current_user
 from ...decorators import admin_required, api_response, raw_response
 from ...services.facial_analysis.processingService import FacialAnalysisProcessingService
@@ -852,7 +852,8 @@ def serve_image(filename):
     Serve an image from the media_save path
 
     Args:
-        filename: Image filename (e.g., 'image_123.jpg')
+        filename: Image filename (e.g., 'image_123.jpg') or path relative to media_save
+                  (sharded files: '{session_id[:2]}/{session_id}/image_123.jpg')
 
     Returns:
         Image file
@@ -1112,6 +1113,7 @@ def bulk_export_facial_analysis():
     """
     from flask import request
     from ...services.admin.exportService import ExportService
+    from .export_routes import zip_stream_response
     from ...db import get_session
     from ...model.assessment.sessions import AssessmentSession
     from ...model.assessment.facial_analysis import SessionFacialAnalysis
@@ -1214,15 +1216,10 @@ def bulk_export_facial_analysis():
                 }, 400
 
         # Bulk export facial analysis
-        zip_buffer = ExportService.export_bulk_facial_analysis(session_ids)
+        zip_stream = ExportService.stream_bulk_facial_analysis(session_ids)
         filename = ExportService.get_bulk_facial_analysis_export_filename()
 
-        return send_file(
-            zip_buffer,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=filename
-        )
+        return zip_stream_response(zip_stream, filename)
 
     except Exception as e:
         return {
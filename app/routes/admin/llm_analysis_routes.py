@@ -3,6 +3,7 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_login import current_user, login_required
 from ...decorators import raw_response
 from ...services.llm.analysisService import LLMAnalysisService
+from ...services.llm.analysisBatchService import LLMAnalysisBatchService
 
 llm_analysis_bp = Blueprint('llm_analysis', __name__, url_prefix='/admin/llm/analysis')
 
@@ -11,13 +12,16 @@ llm_analysis_bp = Blueprint('llm_analysis', __name__, url_prefix='/admin/llm/ana
 @login_required
 @raw_response
 def run_analysis(session_id):
-    """Run LLM conversation analysis for a session"""
+    """Run LLM conversation analysis for a session (an unchanged conversation reuses its stored result unless force is set)"""
     if not current_user.is_authenticated or not current_user.is_admin():
         return jsonify({"status": "SNAFU", "error": "Admin access required"}), 403
     
     try:
+        data = request.get_json(silent=True) or {}
+        force = bool(data.get('force')) or request.args.get('force') in ('1', 'true')
+        
         # Run the analysis
-        result = LLMAnalysisService.run_conversation_analysis(session_id)
+        result = LLMAnalysisService.run_conversation_analysis(session_id, force=force)
         
         if result:
             return jsonify({
@@ -32,6 +36,7 @@ def run_analysis(session_id):
                     "average_severity_score": result.average_severity_score,
                     "analysis_confidence": result.analysis_confidence,
                     "aspect_scores": result.aspect_scores,
+                    "input_digest": result.input_digest,
                     "created_at": result.created_at.isoformat()
                 }
             })
@@ -195,7 +200,7 @@ def preview_analysis_prompt():
 @login_required
 @raw_response
 def batch_run_analysis():
-    """Run analysis for multiple sessions"""
+    """Queue analysis for multiple sessions as a background batch (poll /batch/<batch_id> for progress)"""
     if not current_user.is_authenticated or not current_user.is_admin():
         return jsonify({"status": "SNAFU", "error": "Admin access required"}), 403
     
@@ -206,45 +211,36 @@ def batch_run_analysis():
         if not session_ids:
             return jsonify({"status": "SNAFU", "error": "No session IDs provided"}), 400
         
-        results = []
-        
-        for session_id in session_ids:
-            try:
-                result = LLMAnalysisService.run_conversation_analysis(session_id)
-                if result:
-                    results.append({
-                        "session_id": session_id,
-                        "status": "success",
-                        "analysis_id": result.id,
-                        "total_aspects_detected": result.total_aspects_detected,
-                        "average_severity_score": result.average_severity_score
-                    })
-                else:
-                    results.append({
-                        "session_id": session_id,
-                        "status": "failed",
-                        "error": "Analysis failed"
-                    })
-            except Exception as e:
-                results.append({
-                    "session_id": session_id,
-                    "status": "error",
-                    "error": str(e)
-                })
-        
-        successful_count = sum(1 for r in results if r["status"] == "success")
+        batch = LLMAnalysisBatchService.queue_batch(session_ids, current_user.id, force=bool(data.get('force')))
         
         return jsonify({
             "status": "OLKORECT",
-            "message": f"Batch analysis completed: {successful_count}/{len(session_ids)} successful",
-            "data": {
-                "results": results,
-                "total_sessions": len(session_ids),
-                "successful_count": successful_count,
-                "failed_count": len(session_ids) - successful_count
-            }
-        })
+            "message": f"Batch analysis queued for {batch['total_sessions']} sessions",
+            "data": batch
+        }), 202
         
     except Exception as e:
         current_app.logger.error(f"Batch analysis error: {str(e)}")
-        return jsonify({"status": "SNAFU", "error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"status": "SNAFU", "error": str(e)}), 500
+
+
+@llm_analysis_bp.route('/batch/<batch_id>', methods=['GET'])
+@login_required
+@raw_response
+def get_batch_status(batch_id):
+    """Progress and per-session results of a batch analysis (?results=0 for progress only)"""
+    if not current_user.is_authenticated or not current_user.is_admin():
+        return jsonify({"status": "SNAFU", "error": "Admin access required"}), 403
+    
+    try:
+        include_results = request.args.get('results', '1') not in ('0', 'false')
+        batch = LLMAnalysisBatchService.get_batch_status(batch_id, include_results=include_results)
+        
+        if not batch:
+            return jsonify({"status": "SNAFU", "error": f"No analysis batch {batch_id}"}), 404
+        
+        return jsonify({"status": "OLKORECT", "data": batch})
+        
+    except Exception as e:
+        current_app.logger.error(f"Error getting analysis batch {batch_id}: {str(e)}")
+        return jsonify({"status": "SNAFU", "error": str(e)}), 500
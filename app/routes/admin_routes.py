@@ -513,6 +513,45 @@ def search_users_ajax():
 
 
 
+@admin_bp.route('/instrumentation', methods=['GET', 'POST'])
+@login_required
+@admin_required
+@api_response
+def instrumentation_settings():
+    """
+    Hot-path counters/timers of the worker that served the request (pid in the response).
+    POST {enabled, debug_sample_rate, log_level, reset} stores the settings for all workers;
+    the others apply them within INSTRUMENTATION_SETTINGS_TTL seconds.
+    """
+    from flask import request
+    from ..config import Config
+    from ..services.admin.instrumentationService import InstrumentationService
+    from ..utils.instrumentation import instrumentation
+
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        log_level = data.get('log_level')
+        if log_level is not None and str(log_level).upper() not in ('DEBUG', 'INFO', 'WARNING', 'ERROR'):
+            return {"message": "log_level must be DEBUG, INFO, WARNING or ERROR"}, 400
+        try:
+            shared = InstrumentationService.save_settings(
+                enabled=data.get('enabled'),
+                debug_sample_rate=data.get('debug_sample_rate'),
+                log_level=str(log_level) if log_level is not None else None,
+                reset=bool(data.get('reset'))
+            )
+        except Exception as e:
+            return {"message": f"Failed to store instrumentation settings (run `flask migrate-instrumentation`?): {e}"}, 500
+    else:
+        InstrumentationService.refresh(force=True)
+        shared = None
+
+    snapshot = instrumentation.snapshot()
+    snapshot['shared_settings'] = shared
+    snapshot['propagation_seconds'] = Config.INSTRUMENTATION_SETTINGS_TTL
+    return snapshot
+
+
 @admin_bp.route('/phq')
 @login_required
 @admin_required
@@ -32,6 +32,17 @@ def upload_single_image(session_id):
     return CameraAssessmentService.process_single_upload(session_id, request)
 
 
+@camera_assessment_bp.route('/upload-batch/<session_id>', methods=['POST'])
+@user_required
+@api_response
+def upload_batch_images(session_id):
+    """Upload several images in one request - acknowledged once queued for the background writer"""
+    if not SessionManager.validate_user_session(session_id, current_user.id):
+        return {"message": "Session not found or access denied"}, 403
+    
+    return CameraAssessmentService.process_batch_upload(session_id, request)
+
+
 @camera_assessment_bp.route('/create-batch/<assessment_id>', methods=['POST'])
 @user_required
 @api_response
@@ -588,10 +588,10 @@ def save_timing_data(session_id):
         return {"message": f"No matching turn found for message or turn number"}, 404
     
 
-@llm_assessment_bp.route('/stream-async/', methods=['GET'])  # New async version
+@llm_assessment_bp.route('/stream-async/', methods=['GET'])
 def stream_sse_async():
-    """Async version of SSE streaming using astream_ai_response"""
-    from asgiref.sync import async_to_sync
+    """SSE chat streaming - the LLM stream runs in ChatStreamRelay, heartbeats go out on a timer"""
+    from ...services.llm.streamRelay import ChatStreamRelay
     
     session_id = request.args.get('session_id')
     message = request.args.get('message', '').strip()
@@ -634,31 +634,20 @@ def stream_sse_async():
                 except:
                     user_timing = None
             
-            # Stream response using ASYNC approach
-            chat_service = LLMChatService()
+            relay = ChatStreamRelay(session_id, message, user_timing).start()
             yield sse({'type': 'stream_start'})
             
-            last_beat = time.time()
-            chunk_count = 0
-            
-            # Use sync streaming (reliable and works)
-            for chunk_data in chat_service.stream_ai_response(session_id, message, user_timing):
-                chunk_count += 1
-                chunk_payload = {
+            for kind, chunk_data in relay.events():
+                if kind == 'heartbeat':
+                    yield ": ping\n\n"
+                    continue
+                yield sse({
                     'type': 'chunk', 
                     'data': chunk_data['content'],
                     'conversation_ended': chunk_data['conversation_ended']
-                }
-                yield sse(chunk_payload)
-                
-                # If conversation ended, stop streaming immediately
-                if chunk_data['conversation_ended']:
-                    break
-                
-                if time.time() - last_beat > 20:
-                    yield ": ping\n\n"  
-                    last_beat = time.time()
-            time.sleep(0.1)  # 100ms should be enough for database commit
+                })
+            
+            # events() ends once the turn is saved, so the completion check sees it
             ended = LLMChatService.is_conversation_complete(session_id)
             yield sse({'type': 'complete', 'conversation_ended': ended})
         except Exception as e:
@@ -4,6 +4,7 @@ from flask import current_app
 from sqlalchemy import and_
 from ...model.admin.camera import CameraSettings
 from ...db import get_session
+from ..camera.cameraStorageService import CameraStorageService
 
 
 class CameraService:
@@ -126,6 +127,7 @@ class CameraService:
                 db.add(settings)
             
             db.commit()
+            CameraStorageService.invalidate_filename_context()
             
             return {
                 'id': settings.id,
@@ -183,6 +185,7 @@ class CameraService:
             settings.is_active = all_fields_valid
 
             db.commit()
+            CameraStorageService.invalidate_filename_context()
 
             return {
                 'id': settings.id,
@@ -0,0 +1,188 @@
+"""
+Export Cache Service
+
+Content-addressed cache of built per-session export archives:
+1. The key is a sha256 over the session's DB stamps (session/PHQ/LLM updated_at, captures,
+   frames, username - read from the export SessionBundle) and the stat (size, mtime) of
+   every image file it references
+2. Archives live at {export_save}/session_cache/{key[:2]}/{key}.zip - a changed session simply
+   gets a new key, stale entries are never read again
+3. Hits touch the file's mtime. Each process keeps a running total of the cache size (one
+   directory scan to seed it) and only scans again when a build pushes it over
+   EXPORT_CACHE_MAX_BYTES; eviction then removes the oldest files down to
+   EVICT_LOW_WATER of the limit, so the next builds do not scan again (0 disables the cache)
+
+Completed sessions practically never change, so repeated bulk exports splice the cached
+archives in without re-reading images or re-serializing models.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from typing import Iterator, Optional, TYPE_CHECKING
+
+from flask import current_app
+
+from ...config import Config
+from ..camera.capturePathService import CapturePathService
+from .exportDataLoader import ExportDataLoader
+from .zipStreamService import CHUNK_SIZE
+
+if TYPE_CHECKING:
+    from .exportDataLoader import SessionBundle
+
+logger = logging.getLogger(__name__)
+
+# Bump when the per-session archive layout changes so old entries stop matching
+CACHE_FORMAT_VERSION = 2
+
+# Eviction frees down to this fraction of EXPORT_CACHE_MAX_BYTES
+EVICT_LOW_WATER = 0.9
+
+_evict_lock = threading.Lock()
+# Cache size as last scanned by this process plus what it has built since (None = not scanned
+# yet). Other workers' builds are picked up by the rescan that runs once this total overflows.
+_cache_bytes: Optional[int] = None
+
+
+class ExportCacheService:
+    """Build-once cache for per-session export ZIPs"""
+
+    @staticmethod
+    def enabled() -> bool:
+        return Config.EXPORT_CACHE_MAX_BYTES > 0
+
+    @staticmethod
+    def get_cache_dir() -> str:
+        return os.path.join(current_app.export_save, 'session_cache')
+
+    @staticmethod
+    def session_digest(session_id: str, bundle: Optional['SessionBundle'] = None) -> str:
+        """Cache key for a session's current state (raises ValueError if it does not exist)"""
+        bundle = bundle or ExportDataLoader.load_one(session_id)
+        session = bundle.session
+        hasher = hashlib.sha256(f"v{CACHE_FORMAT_VERSION}:{session_id}".encode())
+        upload_path = current_app.media_save
+
+        hasher.update(f"{session.updated_at}|{session.status}|{bundle.username or ''}".encode())
+        if bundle.phq_response:
+            hasher.update(f"phq:{bundle.phq_response.id}:{bundle.phq_response.updated_at}".encode())
+        if bundle.llm_conversation:
+            hasher.update(f"llm:{bundle.llm_conversation.id}:{bundle.llm_conversation.updated_at}".encode())
+
+        filenames = []
+        for capture in sorted(bundle.captures, key=lambda c: c.id):
+            hasher.update(f"cap:{capture.id}:{capture.capture_type}:{capture.assessment_id}:{capture.updated_at}".encode())
+            filenames.extend(capture.stored_filenames or [])
+            for frame in capture.frames:
+                hasher.update(f"frame:{frame.filename}:{frame.created_at}".encode())
+                filenames.append(frame.filename)
+
+        # A transcoded or re-written image changes size/mtime even when the rows do not
+        for filename in sorted(f for f in filenames if f):
+            try:
+                stat = os.stat(CapturePathService.resolve(upload_path, session_id, filename))
+                hasher.update(f"file:{filename}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+            except OSError:
+                hasher.update(f"missing:{filename}".encode())
+
+        return hasher.hexdigest()
+
+    @staticmethod
+    def get_session_archive(session_id: str, bundle: Optional['SessionBundle'] = None) -> str:
+        """Path of the session's export ZIP, building it on a miss (raises ValueError if not found)"""
+        from .exportService import ExportService
+
+        bundle = bundle or ExportDataLoader.load_one(session_id)
+        key = ExportCacheService.session_digest(session_id, bundle)
+        cache_path = os.path.join(ExportCacheService.get_cache_dir(), key[:2], f"{key}.zip")
+
+        if os.path.exists(cache_path):
+            try:
+                os.utime(cache_path)  # LRU: mtime is the last use
+                return cache_path
+            except OSError:
+                pass  # Evicted between exists() and utime() - rebuild
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{uuid.uuid4().hex}.part"
+        try:
+            with open(temp_path, 'wb') as f:
+                for chunk in ExportService.stream_session_uncached(session_id, bundle):
+                    f.write(chunk)
+            # Concurrent builders of the same key produce the same content - last rename wins
+            os.replace(temp_path, cache_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        ExportCacheService._note_added(os.path.getsize(cache_path), keep=cache_path)
+        return cache_path
+
+    @staticmethod
+    def _note_added(size: int, keep: Optional[str] = None) -> None:
+        """Count a new archive; scan and evict only when the running total exceeds the limit"""
+        global _cache_bytes
+        with _evict_lock:
+            if _cache_bytes is not None:
+                _cache_bytes += size
+                if _cache_bytes <= Config.EXPORT_CACHE_MAX_BYTES:
+                    return
+        ExportCacheService.evict(int(Config.EXPORT_CACHE_MAX_BYTES * EVICT_LOW_WATER), keep=keep)
+
+    @staticmethod
+    def iter_file(path: str) -> Iterator[bytes]:
+        """Stream a cached archive in chunks"""
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    @staticmethod
+    def evict(max_bytes: Optional[int] = None, keep: Optional[str] = None) -> int:
+        """Delete least recently used archives (never `keep`) until the cache fits max_bytes. Returns files removed."""
+        global _cache_bytes
+        max_bytes = Config.EXPORT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        cache_dir = ExportCacheService.get_cache_dir()
+
+        with _evict_lock:
+            files = []
+            total = 0
+            for root, _dirs, names in os.walk(cache_dir):
+                for name in names:
+                    if not name.endswith('.zip'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+
+            removed = 0
+            for _mtime, size, path in sorted(files):
+                if total <= max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            _cache_bytes = total
+
+        if removed:
+            logger.info(f"Evicted {removed} cached session exports")
+        return removed
+
+    @staticmethod
+    def clear() -> int:
+        """Remove every cached archive"""
+        return ExportCacheService.evict(max_bytes=0)
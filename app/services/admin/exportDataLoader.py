@@ -0,0 +1,105 @@
+"""
+Export Data Loader
+
+Set-based loading for exports: instead of each serializer querying per session
+(session, PHQ record, PHQ scale twice, LLM record, captures, frames, facial analysis),
+sessions are loaded in chunks with selectinload - a fixed handful of queries per chunk -
+and handed to the serializers as SessionBundle objects.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import selectinload
+
+from ...db import get_session
+from ...model.admin.phq import PHQSettings
+from ...model.assessment.sessions import AssessmentSession
+from ...utils.instrumentation import instrumentation
+
+# Sessions per IN (...) batch - keeps parameter lists and per-chunk memory bounded
+LOAD_CHUNK_SIZE = 200
+
+
+class SessionBundle:
+    """One session with every row the export serializers read, detached and fully loaded"""
+
+    __slots__ = ('session', 'phq_response', 'llm_conversation', 'captures', 'facial_analyses')
+
+    def __init__(self, session: AssessmentSession):
+        self.session = session
+        self.phq_response = session.phq_responses[0] if session.phq_responses else None
+        self.llm_conversation = session.llm_conversations[0] if session.llm_conversations else None
+        self.captures = list(session.camera_captures)
+        self.facial_analyses = {analysis.assessment_type: analysis for analysis in session.facial_analysis}
+
+    @property
+    def session_id(self) -> str:
+        return self.session.id
+
+    @property
+    def username(self) -> Optional[str]:
+        return self.session.user.uname if self.session.user else None
+
+    @property
+    def scale_max(self) -> int:
+        """PHQ scale max value (4 when the session has no scale, like PHQResponseService)"""
+        settings = self.session.phq_settings
+        if settings and settings.scale:
+            return settings.scale.max_value
+        return 4
+
+    @property
+    def llm_turns(self) -> List[Dict]:
+        if not self.llm_conversation:
+            return []
+        return self.llm_conversation.turns
+
+
+class ExportDataLoader:
+    """Batch loader producing SessionBundles"""
+
+    @staticmethod
+    def load(session_ids: Iterable[str]) -> Dict[str, SessionBundle]:
+        """Bundles for the given ids (missing ids are simply absent)"""
+        session_ids = list(session_ids)
+        if not session_ids:
+            return {}
+
+        with instrumentation.stage('export.load_bundles'), get_session() as db:
+            sessions = db.query(AssessmentSession).options(
+                selectinload(AssessmentSession.user),
+                selectinload(AssessmentSession.phq_settings).selectinload(PHQSettings.scale),
+                selectinload(AssessmentSession.phq_responses),
+                selectinload(AssessmentSession.llm_conversations),
+                # CameraCapture.frames is lazy="selectin", so frames come in one more query
+                selectinload(AssessmentSession.camera_captures),
+                selectinload(AssessmentSession.facial_analysis),
+            ).filter(AssessmentSession.id.in_(session_ids)).all()
+
+            return {session.id: SessionBundle(session) for session in sessions}
+
+    @staticmethod
+    def load_one(session_id: str) -> SessionBundle:
+        """Bundle for a single session (raises ValueError if it does not exist)"""
+        bundle = ExportDataLoader.load([session_id]).get(session_id)
+        if not bundle:
+            raise ValueError(f"Session {session_id} not found")
+        return bundle
+
+    @staticmethod
+    def iter_bundles(session_ids: Iterable[str], chunk_size: int = LOAD_CHUNK_SIZE) -> Iterator[Tuple[str, Optional[SessionBundle]]]:
+        """(session_id, bundle or None) in input order, loading one chunk at a time as the consumer advances"""
+        chunk: List[str] = []
+        for session_id in session_ids:
+            chunk.append(session_id)
+            if len(chunk) >= chunk_size:
+                yield from ExportDataLoader._load_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from ExportDataLoader._load_chunk(chunk)
+
+    @staticmethod
+    def _load_chunk(chunk: List[str]) -> Iterator[Tuple[str, Optional[SessionBundle]]]:
+        bundles = ExportDataLoader.load(chunk)
+        for session_id in chunk:
+            yield session_id, bundles.get(session_id)
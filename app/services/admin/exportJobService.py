@@ -0,0 +1,372 @@
+"""
+Export Job Service
+
+Runs large exports (bulk / all-sessions / delta / research tables) as background jobs tracked in session_exports:
+1. A route queues a PENDING SessionExport row and returns its id right away
+2. The scheduler claims one job at a time and streams the archive to {export_save}/{id}.zip
+3. Progress (sessions/users done, bytes written) is stored in export_data while it runs
+4. The finished file is served by nginx (X-Accel-Redirect) or send_file with Range support,
+   so a dropped connection resumes instead of rebuilding the archive
+5. The whole archive is hashed while it is written; the hash is stored with the job and sent
+   as X-Export-Hash on download so clients can check the assembled file
+6. Re-verifying a finished archive (multi-GB reads) is a VERIFY job on the same queue; its
+   result is stored in export_data['result'] and polled like any other job
+"""
+
+import hashlib
+import os
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import current_app
+
+from ...config import Config
+from ...db import get_session
+from ...model.assessment.sessions import SessionExport
+from .exportService import ExportService
+from .tabularExportService import TabularExportService
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPES = ('BULK_SESSIONS', 'ALL_SESSIONS', 'DELTA_SESSIONS', 'TABULAR')
+
+# Everything the queue processor runs: archive builds plus verification of a finished archive
+QUEUE_TYPES = JOB_TYPES + ('VERIFY',)
+
+# Seconds between progress writes (also the heartbeat that keeps a job from looking stale)
+PROGRESS_INTERVAL = 5
+
+# A RUNNING job without a heartbeat for this long lost its worker (restart/deploy) and is re-queued
+STALE_JOB_MINUTES = 15
+
+
+class ExportJobService:
+    """Service for queuing, building and serving background export archives"""
+
+    @classmethod
+    def queue_export_job(cls, export_type: str, requested_by_user: int,
+                         session_ids: Optional[List[str]] = None, layout: str = 'nested',
+                         since: Optional[datetime] = None, export_format: str = 'csv',
+                         tables: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Create a PENDING export job; the queue processor builds it (DELTA_SESSIONS needs `since`)"""
+        if export_type not in JOB_TYPES:
+            raise ValueError(f"Unsupported export type: {export_type}")
+
+        if export_type == 'BULK_SESSIONS':
+            download_name = ExportService.get_bulk_export_filename()
+        elif export_type == 'DELTA_SESSIONS':
+            if since is None:
+                raise ValueError("Delta export jobs need a 'since' watermark")
+            download_name = ExportService.get_delta_export_filename(since)
+        elif export_type == 'TABULAR':
+            download_name = TabularExportService.get_export_filename(export_format)
+        else:
+            download_name = ExportService.get_all_sessions_export_filename()
+
+        with get_session() as db:
+            job = SessionExport(
+                session_id=session_ids[0] if session_ids and len(session_ids) == 1 else None,
+                export_type=export_type,
+                export_data={
+                    'params': {'session_ids': session_ids or [], 'layout': layout,
+                               'since': since.isoformat() if since else None,
+                               'format': export_format, 'tables': tables or []},
+                    'download_name': download_name,
+                    'progress': {'done': 0, 'total': len(session_ids) if session_ids else None, 'bytes_written': 0},
+                    'error': None
+                },
+                requested_by_user=requested_by_user,
+                export_status='PENDING'
+            )
+            db.add(job)
+            db.commit()
+            job_id = job.id
+
+        logger.info(f"[EXPORT-QUEUE] Queued {export_type} export job {job_id}")
+        return {'job_id': job_id, 'status': 'PENDING'}
+
+    @classmethod
+    def queue_verify_job(cls, export_job_id: str, requested_by_user: int,
+                         check_sources: bool = True) -> Optional[Dict[str, Any]]:
+        """Queue re-verification of a finished export (None if it has no archive); poll the returned job id"""
+        if not cls.get_artifact(export_job_id):
+            return None
+
+        with get_session() as db:
+            job = SessionExport(
+                export_type='VERIFY',
+                export_data={
+                    'params': {'job_id': export_job_id, 'check_sources': check_sources},
+                    'progress': {'done': 0, 'total': None},
+                    'result': None,
+                    'error': None
+                },
+                requested_by_user=requested_by_user,
+                export_status='PENDING'
+            )
+            db.add(job)
+            db.commit()
+            job_id = job.id
+
+        logger.info(f"[EXPORT-QUEUE] Queued verification {job_id} of export job {export_job_id}")
+        return {'job_id': job_id, 'status': 'PENDING'}
+
+    @classmethod
+    def get_job_status(cls, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job state and progress, or None if no export job has that id"""
+        with get_session() as db:
+            job = db.query(SessionExport).filter(
+                SessionExport.id == job_id,
+                SessionExport.export_type.in_(QUEUE_TYPES)
+            ).first()
+            if not job:
+                return None
+
+            export_data = job.export_data or {}
+            progress = dict(export_data.get('progress') or {})
+            if job.export_status == 'COMPLETED':
+                progress['percent'] = 100
+            elif progress.get('total'):
+                progress['percent'] = min(99, int(progress.get('done', 0) * 100 / progress['total']))
+            else:
+                progress['percent'] = 0
+
+            return {
+                'job_id': job.id,
+                'export_type': job.export_type,
+                'status': job.export_status,
+                'progress': progress,
+                'download_name': export_data.get('download_name'),
+                'archive': export_data.get('archive'),
+                'created_at': job.created_at.isoformat() if job.created_at else None,
+                'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+                'result': export_data.get('result'),
+                'error': export_data.get('error')
+            }
+
+    @classmethod
+    def get_artifact(cls, job_id: str) -> Optional[Dict[str, Any]]:
+        """Finished archive for a COMPLETED job: {'file_name', 'path', 'download_name', 'archive'}, else None"""
+        with get_session() as db:
+            job = db.query(SessionExport).filter_by(id=job_id, export_status='COMPLETED').first()
+            if not job or not job.file_path:
+                return None
+            file_name = job.file_path
+            download_name = (job.export_data or {}).get('download_name') or file_name
+            archive = (job.export_data or {}).get('archive')
+
+        path = os.path.join(current_app.export_save, file_name)
+        if not os.path.isfile(path):
+            return None
+        return {'file_name': file_name, 'path': path, 'download_name': download_name, 'archive': archive}
+
+    @classmethod
+    def _requeue_stale_jobs(cls, db):
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=STALE_JOB_MINUTES)
+        requeued = db.query(SessionExport).filter(
+            SessionExport.export_type.in_(QUEUE_TYPES),
+            SessionExport.export_status == 'RUNNING',
+            SessionExport.updated_at < cutoff
+        ).update({'export_status': 'PENDING'}, synchronize_session=False)
+        if requeued:
+            logger.warning(f"[EXPORT-QUEUE] Re-queued {requeued} stale export job(s)")
+
+    @classmethod
+    def _update_job(cls, job_id: str, export_data: Dict[str, Any], **fields):
+        with get_session() as db:
+            # export_data is plain JSON (not mutable-tracked) - always write a fresh dict
+            db.query(SessionExport).filter_by(id=job_id).update(
+                {'export_data': dict(export_data), **fields}, synchronize_session=False
+            )
+            db.commit()
+
+    @classmethod
+    def process_queue(cls) -> Dict[str, Any]:
+        """
+        Build ONE pending export job (called by the scheduler).
+
+        Every worker process runs the scheduler, so the job is claimed with a conditional
+        UPDATE - only the worker whose UPDATE matched a PENDING row builds it.
+
+        Returns:
+            {'processed': 0|1, 'job_id': str|None, 'error': str (on failure)}
+        """
+        with get_session() as db:
+            cls._requeue_stale_jobs(db)
+            db.commit()
+
+            job = db.query(SessionExport).filter(
+                SessionExport.export_type.in_(QUEUE_TYPES),
+                SessionExport.export_status == 'PENDING'
+            ).order_by(SessionExport.created_at).first()
+            if not job:
+                return {'processed': 0, 'job_id': None}
+
+            claimed = db.query(SessionExport).filter_by(id=job.id, export_status='PENDING').update(
+                {'export_status': 'RUNNING'}, synchronize_session=False
+            )
+            db.commit()
+            if not claimed:
+                # Another worker got it first
+                return {'processed': 0, 'job_id': None}
+
+            job_id = job.id
+            export_type = job.export_type
+            export_data = dict(job.export_data or {})
+
+        if export_type == 'VERIFY':
+            return cls._run_verify_job(job_id, export_data)
+
+        logger.info(f"[EXPORT-QUEUE] Starting {export_type} export job {job_id}")
+
+        export_dir = current_app.export_save
+        os.makedirs(export_dir, exist_ok=True)
+        file_name = f"{job_id}.zip"
+        final_path = os.path.join(export_dir, file_name)
+        part_path = f"{final_path}.part"
+
+        params = export_data.get('params') or {}
+        # Build start time - a later delta export can use this job's id as its watermark
+        watermark = datetime.utcnow()
+        export_data['watermark'] = watermark.isoformat()
+        progress = dict(export_data.get('progress') or {})
+        progress.update({'done': 0, 'bytes_written': 0})
+        export_data['progress'] = progress
+        last_write = 0.0
+
+        def on_progress(done: int, total: int):
+            progress['done'] = done
+            progress['total'] = total
+
+        try:
+            if export_type == 'BULK_SESSIONS':
+                chunks = ExportService.stream_bulk_sessions(params.get('session_ids', []), params.get('layout', 'nested'),
+                                                            on_progress=on_progress)
+            elif export_type == 'DELTA_SESSIONS':
+                chunks = ExportService.stream_delta_sessions(datetime.fromisoformat(params['since']), watermark,
+                                                             on_progress=on_progress)
+            elif export_type == 'TABULAR':
+                chunks = TabularExportService.stream_tables(params.get('format', 'csv'), params.get('tables'))
+            else:
+                chunks = ExportService.stream_sessions_by_session_number(params.get('layout', 'nested'),
+                                                                         on_progress=on_progress)
+
+            archive_digest = hashlib.new(Config.EXPORT_MANIFEST_HASH)
+            with open(part_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    archive_digest.update(chunk)
+                    progress['bytes_written'] += len(chunk)
+                    if time.monotonic() - last_write >= PROGRESS_INTERVAL:
+                        cls._update_job(job_id, export_data)
+                        last_write = time.monotonic()
+
+            # Only a complete archive ever gets the .zip name
+            os.replace(part_path, final_path)
+            export_data['archive'] = {
+                'size': progress['bytes_written'],
+                'hash_algorithm': Config.EXPORT_MANIFEST_HASH,
+                'hash': archive_digest.hexdigest()
+            }
+            cls._update_job(job_id, export_data, export_status='COMPLETED', file_path=file_name,
+                            completed_at=datetime.utcnow())
+
+            logger.info(f"[EXPORT-QUEUE] Completed export job {job_id} ({progress['bytes_written']} bytes)")
+            return {'processed': 1, 'job_id': job_id}
+
+        except Exception as e:
+            logger.error(f"[EXPORT-QUEUE] Failed export job {job_id}: {str(e)}")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            export_data['error'] = str(e)
+            cls._update_job(job_id, export_data, export_status='FAILED', completed_at=datetime.utcnow())
+            return {'processed': 0, 'job_id': job_id, 'error': str(e)}
+
+    @classmethod
+    def _run_verify_job(cls, job_id: str, export_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a claimed VERIFY job, writing progress as the heartbeat"""
+        params = export_data.get('params') or {}
+        progress = dict(export_data.get('progress') or {})
+        export_data['progress'] = progress
+        last_write = time.monotonic()
+
+        def on_progress(done: int, total: int):
+            nonlocal last_write
+            progress['done'] = done
+            progress['total'] = total
+            if time.monotonic() - last_write >= PROGRESS_INTERVAL:
+                cls._update_job(job_id, export_data)
+                last_write = time.monotonic()
+
+        logger.info(f"[EXPORT-QUEUE] Verifying export job {params.get('job_id')} ({job_id})")
+        try:
+            result = cls.verify_job(params['job_id'], params.get('check_sources', True), on_progress)
+            if result is None:
+                raise ValueError("Export is not ready or no longer available")
+            progress['done'] = progress.get('total') or 0
+            export_data['result'] = result
+            cls._update_job(job_id, export_data, export_status='COMPLETED', completed_at=datetime.utcnow())
+            return {'processed': 1, 'job_id': job_id}
+        except Exception as e:
+            logger.error(f"[EXPORT-QUEUE] Failed verification {job_id}: {str(e)}")
+            export_data['error'] = str(e)
+            cls._update_job(job_id, export_data, export_status='FAILED', completed_at=datetime.utcnow())
+            return {'processed': 0, 'job_id': job_id, 'error': str(e)}
+
+    @classmethod
+    def verify_job(cls, job_id: str, check_sources: bool = True,
+                   on_progress: Optional[Callable[[int, int], None]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Re-verify a finished archive: whole-file hash, every manifest member, and (optionally)
+        each member's current source file in storage. None if the job has no archive.
+        Reads the whole archive - run it through queue_verify_job, not in a request.
+        """
+        from .exportManifestService import ExportManifestService
+
+        artifact = cls.get_artifact(job_id)
+        if not artifact:
+            return None
+
+        result = ExportManifestService.verify_archive(
+            artifact['path'], current_app.media_save if check_sources else None, on_progress
+        )
+        archive = artifact.get('archive')
+        if archive:
+            size, archive_hash = ExportManifestService.hash_file(artifact['path'], archive['hash_algorithm'])
+            result['archive_ok'] = size == archive['size'] and archive_hash == archive['hash']
+            result['ok'] = result['ok'] and result['archive_ok']
+        result['job_id'] = job_id
+        return result
+
+    @classmethod
+    def clean_old_jobs(cls, days: int = 3) -> int:
+        """
+        Delete finished export jobs older than `days` together with their archives
+
+        Returns:
+            int: Number of job records deleted
+        """
+        cutoff_time = datetime.utcnow() - timedelta(days=days)
+        export_dir = current_app.export_save
+
+        with get_session() as db:
+            old_jobs = db.query(SessionExport).filter(
+                SessionExport.export_type.in_(QUEUE_TYPES),
+                SessionExport.export_status.in_(['COMPLETED', 'FAILED']),
+                SessionExport.completed_at < cutoff_time
+            ).all()
+
+            for job in old_jobs:
+                if job.file_path:
+                    file_path = os.path.join(export_dir, job.file_path)
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                db.delete(job)
+
+            deleted_count = len(old_jobs)
+            db.commit()
+
+        logger.info(f"Cleaned {deleted_count} old export jobs")
+        return deleted_count
@@ -0,0 +1,118 @@
+"""
+Export Manifest Service
+
+Checks export archives against the manifest.json written while they were streamed:
+1. Every member listed in the manifest is re-hashed from the archive (size + hash)
+2. Members that came from storage ('source' in the manifest) are compared with the
+   current file, so changed or deleted media shows up without re-exporting
+3. The manifest also carries each member's offset/compressed size, so a client holding a
+   damaged download can re-fetch just those byte ranges from the ranged download endpoint
+"""
+
+import hashlib
+import json
+import os
+import zipfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .zipStreamService import CHUNK_SIZE, MANIFEST_NAME
+
+
+class ExportManifestService:
+    """Reads and verifies export manifests"""
+
+    @staticmethod
+    def hash_stream(stream, algorithm: str) -> Tuple[int, str]:
+        """(size, hex digest) of a binary file object, read in chunks"""
+        digest = hashlib.new(algorithm)
+        size = 0
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+        return size, digest.hexdigest()
+
+    @staticmethod
+    def hash_file(path: str, algorithm: str) -> Tuple[int, str]:
+        with open(path, 'rb') as f:
+            return ExportManifestService.hash_stream(f, algorithm)
+
+    @staticmethod
+    def read_manifest(archive_path: str) -> Dict[str, Any]:
+        """The archive's manifest.json (raises ValueError if the archive has none)"""
+        with zipfile.ZipFile(archive_path) as archive:
+            try:
+                return json.loads(archive.read(MANIFEST_NAME))
+            except KeyError:
+                raise ValueError(f"{os.path.basename(archive_path)} has no {MANIFEST_NAME}")
+
+    @staticmethod
+    def verify_archive(archive_path: str, source_root: Optional[str] = None,
+                       on_progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Re-hash every manifest member (and, with source_root, its current source file)
+        on_progress(done, total) is called after each member is checked, ending at (total, total).
+
+        Returns:
+            {'ok', 'hash_algorithm', 'checked', 'corrupt': [...], 'missing': [...],
+             'source_changed': [...], 'source_missing': [...]}
+            'ok' covers the archive itself; source drift means storage changed since the export.
+        """
+        problems = {'corrupt': [], 'missing': [], 'source_changed': [], 'source_missing': []}
+
+        with zipfile.ZipFile(archive_path) as archive:
+            try:
+                manifest = json.loads(archive.read(MANIFEST_NAME))
+            except KeyError:
+                raise ValueError(f"{os.path.basename(archive_path)} has no {MANIFEST_NAME}")
+            algorithm = manifest.get('hash_algorithm', 'sha256')
+            files = manifest.get('files', [])
+
+            for index, record in enumerate(files):
+                ExportManifestService._verify_member(archive, record, algorithm, source_root, problems)
+                if on_progress:
+                    on_progress(index + 1, len(files))
+
+        return {
+            'ok': not problems['corrupt'] and not problems['missing'],
+            'hash_algorithm': algorithm,
+            'checked': len(files),
+            **problems
+        }
+
+    @staticmethod
+    def _verify_member(archive: zipfile.ZipFile, record: Dict[str, Any], algorithm: str,
+                       source_root: Optional[str], problems: Dict[str, List[Any]]) -> None:
+        """Re-hash one manifest member (and its source file), appending any problem to problems"""
+        path = record['path']
+        expected_hash = record.get('hash') or record.get('sha256')
+        try:
+            with archive.open(path) as member:
+                size, actual_hash = ExportManifestService.hash_stream(member, algorithm)
+        except KeyError:
+            problems['missing'].append(path)
+            return
+        except (zipfile.BadZipFile, OSError) as e:
+            # CRC errors on damaged members surface here
+            problems['corrupt'].append({'path': path, 'error': str(e), 'offset': record.get('offset'),
+                                        'compressed_size': record.get('compressed_size')})
+            return
+
+        if size != record.get('size') or actual_hash != expected_hash:
+            problems['corrupt'].append({'path': path, 'expected_size': record.get('size'), 'size': size,
+                                        'offset': record.get('offset'),
+                                        'compressed_size': record.get('compressed_size')})
+            return
+
+        source = record.get('source')
+        if source and source_root:
+            source_path = os.path.join(source_root, source)
+            try:
+                source_size, source_hash = ExportManifestService.hash_file(source_path, algorithm)
+            except FileNotFoundError:
+                problems['source_missing'].append(path)
+                return
+            if source_size != size or source_hash != actual_hash:
+                problems['source_changed'].append(path)
@@ -1,15 +1,23 @@
 # app/services/admin/exportService.py
+import logging
 import os
-import zipfile
-from datetime import datetime
-from typing import List, Dict, Optional
+import tempfile
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Callable, Iterable, List, Dict, Optional, Iterator, Set
 from io import BytesIO
 from flask import current_app
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from ...config import Config
 from ...db import get_session
-from ...model.assessment.sessions import AssessmentSession, CameraCapture
-from ...services.assessment.phqService import PHQResponseService
-from ...services.assessment.llmService import LLMConversationService
+from ...model.assessment.sessions import (
+    AssessmentSession, CameraCapture, CaptureFrame, PHQResponse, LLMConversation, SessionExport
+)
+from ...services.camera.capturePathService import CapturePathService
+from ...utils.instrumentation import instrumentation
+from ...utils.ordered_pool import ordered_map
+from .zipStreamService import ExportEntry, ZipStreamWriter, CHUNK_SIZE, MANIFEST_NAME
+from .exportCacheService import ExportCacheService
+from .exportDataLoader import ExportDataLoader, SessionBundle
 from ...schemas.export import (
     SessionExportData,
     PHQExportData,
@@ -25,46 +33,83 @@ from ...schemas.export import (
     AllCapturesMetadata,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class ExportService:
     """Service for exporting session data as ZIP files"""
 
     @staticmethod
     def export_session(session_id: str) -> BytesIO:
-        """Export single session as ZIP file"""
-        with get_session() as db:
-            session = db.query(AssessmentSession).filter_by(id=session_id).first()
-            if not session:
-                raise ValueError(f"Session {session_id} not found")
+        """Export single session as ZIP file (buffered - routes use stream_session)"""
+        return ZipStreamWriter.to_buffer(ExportService.stream_session(session_id))
 
-            # Create ZIP in memory
-            zip_buffer = BytesIO()
-            
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                # 1. Session info
-                session_info = ExportService._get_session_info(session)
-                zip_file.writestr('session_info.json', session_info.model_dump_json(indent=2))
-                
-                # 2. PHQ responses
-                if session.phq_completed_at:
-                    phq_data = ExportService._get_phq_data(session_id)
-                    zip_file.writestr('phq_responses.json', phq_data.model_dump_json(indent=2))
-                
-                # 3. LLM conversation
-                if session.llm_completed_at:
-                    llm_data = ExportService._get_llm_data(session_id)
-                    zip_file.writestr('llm_conversation.json', llm_data.model_dump_json(indent=2))
-                
-                # 4. Camera captures
-                ExportService._add_camera_captures(zip_file, session_id)
-                
-                # 5. Human-readable summary
-                phq_model = phq_data if session.phq_completed_at else None
-                summary = ExportService._generate_summary(session, phq_model)
-                zip_file.writestr('summary.txt', summary)
-
-            zip_buffer.seek(0)
-            return zip_buffer
+    @staticmethod
+    def stream_session(session_id: str) -> Iterator[bytes]:
+        """Export single session as a streamed ZIP (raises ValueError before streaming if not found)"""
+        if ExportCacheService.enabled():
+            return ExportCacheService.iter_file(ExportCacheService.get_session_archive(session_id))
+        return ExportService.stream_session_uncached(session_id)
+
+    @staticmethod
+    def _stream_archive(entries: Iterable[ExportEntry], export_type: str,
+                        manifest_fields: Optional[Dict] = None) -> Iterator[bytes]:
+        """ZIP stream ending in a manifest.json of member sizes/hashes/offsets, hashed while streaming"""
+        fields = {'export_type': export_type, 'generated_at': datetime.utcnow().isoformat()}
+        fields.update(manifest_fields or {})
+        return ZipStreamWriter.stream(
+            entries,
+            manifest_name=MANIFEST_NAME,
+            manifest_fields=fields,
+            hash_algorithm=Config.EXPORT_MANIFEST_HASH,
+            source_root=current_app.media_save
+        )
+
+    @staticmethod
+    def stream_session_uncached(session_id: str, bundle: Optional[SessionBundle] = None) -> Iterator[bytes]:
+        """Build the single-session ZIP from the database and image files"""
+        return ExportService._stream_archive(ExportService._session_entries(session_id, bundle=bundle), 'SESSION',
+                                             {'session_id': session_id})
+
+    @staticmethod
+    def _session_entries(session_id: str, only_filenames: Optional[Set[str]] = None,
+                         bundle: Optional[SessionBundle] = None) -> Iterator[ExportEntry]:
+        """
+        Archive entries for one session - serialized from a preloaded bundle, images read lazily while streaming
+
+        only_filenames limits which image files are included (metadata still lists every capture).
+        Without a bundle the session is loaded here (raises ValueError if not found).
+        """
+        bundle = bundle or ExportDataLoader.load_one(session_id)
+        session = bundle.session
+        instrumentation.incr('export.sessions')
+
+        with instrumentation.stage('export.serialize_session'):
+            # 1. Session info
+            session_info = ExportService._get_session_info(session)
+            entries = [ExportEntry('session_info.json', data=session_info.model_dump_json(indent=2))]
+
+            # 2. PHQ responses
+            phq_data = None
+            if session.phq_completed_at:
+                phq_data = ExportService._get_phq_data(session_id, bundle)
+                entries.append(ExportEntry('phq_responses.json', data=phq_data.model_dump_json(indent=2)))
+
+            # 3. LLM conversation
+            if session.llm_completed_at:
+                llm_data = ExportService._get_llm_data(session_id, bundle)
+                entries.append(ExportEntry('llm_conversation.json', data=llm_data.model_dump_json(indent=2)))
+
+            # 5. Human-readable summary
+            summary = ExportService._generate_summary(session, phq_data, bundle.captures)
+
+        # 4. Camera captures (files are opened only when the stream reaches them)
+        upload_path = current_app.media_save
+        return chain(
+            entries,
+            ExportService._iter_camera_capture_entries(bundle.captures, session_id, upload_path, only_filenames),
+            [ExportEntry('summary.txt', data=summary)]
+        )
 
     @staticmethod
     def _get_session_info(session: AssessmentSession) -> SessionExportData:
@@ -86,16 +131,19 @@ class ExportService:
         )
 
     @staticmethod
-    def _get_phq_data(session_id: str) -> PHQExportData:
+    def _get_phq_data(session_id: str, bundle: Optional[SessionBundle] = None) -> PHQExportData:
         """Get PHQ responses in readable format using new JSON structure as Pydantic model"""
-        response_record = PHQResponseService.get_session_responses(session_id)
-        total_score = PHQResponseService.calculate_session_score(session_id)
+        bundle = bundle or ExportDataLoader.load_one(session_id)
+        response_record = bundle.phq_response
+        stored_responses = (response_record.responses if response_record else None) or {}
+        # Same scoring as PHQResponseService: sum of values, questions * scale max
+        total_score = sum(response.get('response_value', 0) for response in stored_responses.values())
 
         # Group by category using new JSON structure
         responses: Dict[str, Dict[str, PHQResponseItem]] = {}
 
-        if response_record and response_record.responses:
-            for question_id, response_data in response_record.responses.items():
+        if stored_responses:
+            for question_id, response_data in stored_responses.items():
                 category = response_data.get('category_name', 'UNKNOWN')
                 if category not in responses:
                     responses[category] = {}
@@ -115,14 +163,15 @@ class ExportService:
 
         return PHQExportData(
             total_score=total_score,
-            max_possible_score=PHQResponseService.get_max_possible_score(session_id),
+            max_possible_score=len(stored_responses) * bundle.scale_max,
             responses=responses
         )
 
     @staticmethod
-    def _get_llm_data(session_id: str) -> LLMExportData:
+    def _get_llm_data(session_id: str, bundle: Optional[SessionBundle] = None) -> LLMExportData:
         """Get LLM conversation in readable format using new JSON structure as Pydantic model"""
-        conversation_turns = LLMConversationService.get_session_conversations(session_id)
+        bundle = bundle or ExportDataLoader.load_one(session_id)
+        conversation_turns = bundle.llm_turns
 
         conversations: List[LLMConversationTurn] = []
 
@@ -152,91 +201,129 @@ class ExportService:
         )
 
     @staticmethod
-    def _add_camera_captures(zip_file: zipfile.ZipFile, session_id: str):
-        """Add camera captures to ZIP with PHQ/LLM organization"""
-        with get_session() as db:
-            captures = db.query(CameraCapture).filter_by(session_id=session_id).all()
-            
-            if not captures:
-                print(f" No camera captures found for session {session_id}")
-                return
-            
-            # Organize captures by assessment type
-            phq_captures = []
-            llm_captures = []
-            unknown_captures = []
-            
-            upload_path = current_app.media_save
-            
-            print(f" Found {len(captures)} camera captures for session {session_id}")
-            
-            for capture in captures:
-                print(f" Processing capture: type={capture.capture_type}, assessment_id={capture.assessment_id}, filenames={capture.filenames}")
-                
-                # Determine assessment type using new model structure
-                if capture.capture_type == 'PHQ':
-                    assessment_type = "PHQ"
-                    folder_path = "images/phq/"
-                    phq_captures.append(capture)
-                    
-                    # Add all image files to PHQ folder (new model uses JSON array)
-                    for filename in capture.filenames:
-                        image_path = os.path.join(upload_path, filename)
-                        if os.path.exists(image_path):
-                            with open(image_path, 'rb') as img_file:
-                                zip_file.writestr(f'{folder_path}{filename}', img_file.read())
-                                
-                elif capture.capture_type == 'LLM':
-                    assessment_type = "LLM"
-                    folder_path = "images/llm/"
-                    llm_captures.append(capture)
-                    
-                    # Add all image files to LLM folder (new model uses JSON array)
-                    for filename in capture.filenames:
-                        image_path = os.path.join(upload_path, filename)
-                        if os.path.exists(image_path):
-                            with open(image_path, 'rb') as img_file:
-                                zip_file.writestr(f'{folder_path}{filename}', img_file.read())
-                else:
-                    # Skip general/unknown captures - don't add to ZIP
-                    unknown_captures.append(capture)
-                    print(f"⚠️ Skipping {capture.capture_type} capture {capture.filenames} from export")
-            
-            # Create comprehensive metadata using Pydantic models
-            linked_captures = phq_captures + llm_captures
-            all_capture_metadata: List[CaptureMetadataFull] = []
-
-            # Add only linked captures to metadata
-            for capture in linked_captures:
-                # Determine assessment type and folder using new structure
-                assessment_type = capture.capture_type
-                folder_path = f"{assessment_type.lower()}/"
-
-                # Add metadata for each filename in the JSON array
+    def _iter_camera_capture_entries(captures: List[CameraCapture], session_id: str, upload_path: str,
+                                     only_filenames: Optional[Set[str]] = None) -> Iterator[ExportEntry]:
+        """Camera capture entries with PHQ/LLM organization - images are streamed from disk, not read here"""
+        if not captures:
+            instrumentation.debug(logger, "No camera captures found for session %s", session_id)
+            return
+
+        # Organize captures by assessment type
+        phq_captures = []
+        llm_captures = []
+        unknown_captures = []
+
+        instrumentation.incr('export.captures', len(captures))
+        instrumentation.debug(logger, "Found %d camera captures for session %s", len(captures), session_id)
+
+        for capture in captures:
+
+            # Determine assessment type using new model structure
+            if capture.capture_type == 'PHQ':
+                assessment_type = "PHQ"
+                folder_path = "images/phq/"
+                phq_captures.append(capture)
+
+                # Add all image files to PHQ folder (new model uses JSON array)
+                for filename in capture.filenames:
+                    if only_filenames is not None and filename not in only_filenames:
+                        continue
+                    image_path = CapturePathService.resolve(upload_path, capture.session_id, filename)
+                    if os.path.exists(image_path):
+                        yield ExportEntry(f'{folder_path}{filename}', path=image_path)
+
+            elif capture.capture_type == 'LLM':
+                assessment_type = "LLM"
+                folder_path = "images/llm/"
+                llm_captures.append(capture)
+
+                # Add all image files to LLM folder (new model uses JSON array)
+                for filename in capture.filenames:
+                    if only_filenames is not None and filename not in only_filenames:
+                        continue
+                    image_path = CapturePathService.resolve(upload_path, capture.session_id, filename)
+                    if os.path.exists(image_path):
+                        yield ExportEntry(f'{folder_path}{filename}', path=image_path)
+            else:
+                # Skip general/unknown captures - don't add to ZIP
+                unknown_captures.append(capture)
+                instrumentation.incr('export.captures_skipped')
+                instrumentation.debug(logger, "Skipping %s capture %s (%d files) from export",
+                                      capture.capture_type, capture.id, len(capture.filenames))
+
+        # Create comprehensive metadata using Pydantic models
+        linked_captures = phq_captures + llm_captures
+        all_capture_metadata: List[CaptureMetadataFull] = []
+
+        # Add only linked captures to metadata
+        for capture in linked_captures:
+            # Determine assessment type and folder using new structure
+            assessment_type = capture.capture_type
+            folder_path = f"{assessment_type.lower()}/"
+
+            # Add metadata for each filename in the JSON array
+            capture_history = capture.history_by_filename()
+            for filename in capture.filenames:
+                # Extract timing data if available
+                timing_data = None
+                capture_timestamp = None
+
+                entry = capture_history.get(filename)
+                if entry and 'timing' in entry:
+                    timing_data = CaptureTimingData(**entry['timing'])
+
+                # For old captures without timing, use the capture timestamp
+                if not timing_data:
+                    capture_timestamp = capture.created_at.isoformat()
+
+                capture_meta = CaptureMetadataFull(
+                    filename=filename,
+                    assessment_type=assessment_type,
+                    folder_path=folder_path,
+                    full_path=CapturePathService.resolve(upload_path, capture.session_id, filename),
+                    zip_path=f'images/{folder_path}{filename}',
+                    timestamp=capture.created_at.isoformat(),
+                    capture_type=capture.capture_type,
+                    assessment_id=capture.assessment_id,
+                    assessment_timing=timing_data,
+                    capture_timestamp=capture_timestamp
+                )
+
+                all_capture_metadata.append(capture_meta)
+
+        # Create AllCapturesMetadata Pydantic model
+        metadata_model = AllCapturesMetadata(
+            total_captures=len(linked_captures),
+            phq_captures=len(phq_captures),
+            llm_captures=len(llm_captures),
+            unknown_captures_skipped=len(unknown_captures),
+            captures=all_capture_metadata
+        )
+
+        # Add main metadata file
+        yield ExportEntry('images/metadata.json', data=metadata_model.model_dump_json(indent=2))
+
+        # Add assessment-specific metadata files using Pydantic models
+        if phq_captures:
+            phq_capture_list: List[CaptureMetadata] = []
+
+            for capture in phq_captures:
+                capture_history = capture.history_by_filename()
                 for filename in capture.filenames:
                     # Extract timing data if available
                     timing_data = None
                     capture_timestamp = None
 
-                    if capture.capture_metadata and 'capture_history' in capture.capture_metadata:
-                        capture_history = capture.capture_metadata['capture_history']
-                        # Find the entry for this filename
-                        for entry in capture_history:
-                            if entry.get('filename') == filename and 'timing' in entry:
-                                timing_dict = entry['timing']
-                                timing_data = CaptureTimingData(**timing_dict)
-                                break
+                    entry = capture_history.get(filename)
+                    if entry and 'timing' in entry:
+                        timing_data = CaptureTimingData(**entry['timing'])
 
                     # For old captures without timing, use the capture timestamp
                     if not timing_data:
                         capture_timestamp = capture.created_at.isoformat()
 
-                    capture_meta = CaptureMetadataFull(
+                    capture_meta = CaptureMetadata(
                         filename=filename,
-                        assessment_type=assessment_type,
-                        folder_path=folder_path,
-                        full_path=os.path.join(current_app.media_save, filename),
-                        zip_path=f'images/{folder_path}{filename}',
                         timestamp=capture.created_at.isoformat(),
                         capture_type=capture.capture_type,
                         assessment_id=capture.assessment_id,
@@ -244,101 +331,54 @@ class ExportService:
                         capture_timestamp=capture_timestamp
                     )
 
-                    all_capture_metadata.append(capture_meta)
+                    phq_capture_list.append(capture_meta)
 
-            # Create AllCapturesMetadata Pydantic model
-            metadata_model = AllCapturesMetadata(
-                total_captures=len(linked_captures),
-                phq_captures=len(phq_captures),
-                llm_captures=len(llm_captures),
-                unknown_captures_skipped=len(unknown_captures),
-                captures=all_capture_metadata
+            phq_metadata_model = AssessmentCaptureMetadata(
+                assessment_type='PHQ',
+                total_captures=len(phq_captures),
+                captures=phq_capture_list
             )
+            yield ExportEntry('images/phq/metadata.json', data=phq_metadata_model.model_dump_json(indent=2))
 
-            # Add main metadata file
-            zip_file.writestr('images/metadata.json', metadata_model.model_dump_json(indent=2))
-            
-            # Add assessment-specific metadata files using Pydantic models
-            if phq_captures:
-                phq_capture_list: List[CaptureMetadata] = []
-
-                for capture in phq_captures:
-                    for filename in capture.filenames:
-                        # Extract timing data if available
-                        timing_data = None
-                        capture_timestamp = None
-
-                        if capture.capture_metadata and 'capture_history' in capture.capture_metadata:
-                            capture_history = capture.capture_metadata['capture_history']
-                            for entry in capture_history:
-                                if entry.get('filename') == filename and 'timing' in entry:
-                                    timing_dict = entry['timing']
-                                    timing_data = CaptureTimingData(**timing_dict)
-                                    break
-
-                        # For old captures without timing, use the capture timestamp
-                        if not timing_data:
-                            capture_timestamp = capture.created_at.isoformat()
-
-                        capture_meta = CaptureMetadata(
-                            filename=filename,
-                            timestamp=capture.created_at.isoformat(),
-                            capture_type=capture.capture_type,
-                            assessment_id=capture.assessment_id,
-                            assessment_timing=timing_data,
-                            capture_timestamp=capture_timestamp
-                        )
-
-                        phq_capture_list.append(capture_meta)
-
-                phq_metadata_model = AssessmentCaptureMetadata(
-                    assessment_type='PHQ',
-                    total_captures=len(phq_captures),
-                    captures=phq_capture_list
-                )
-                zip_file.writestr('images/phq/metadata.json', phq_metadata_model.model_dump_json(indent=2))
-            
-            if llm_captures:
-                llm_capture_list: List[CaptureMetadata] = []
-
-                for capture in llm_captures:
-                    for filename in capture.filenames:
-                        # Extract timing data if available
-                        timing_data = None
-                        capture_timestamp = None
-
-                        if capture.capture_metadata and 'capture_history' in capture.capture_metadata:
-                            capture_history = capture.capture_metadata['capture_history']
-                            for entry in capture_history:
-                                if entry.get('filename') == filename and 'timing' in entry:
-                                    timing_dict = entry['timing']
-                                    timing_data = CaptureTimingData(**timing_dict)
-                                    break
-
-                        # For old captures without timing, use the capture timestamp
-                        if not timing_data:
-                            capture_timestamp = capture.created_at.isoformat()
-
-                        capture_meta = CaptureMetadata(
-                            filename=filename,
-                            timestamp=capture.created_at.isoformat(),
-                            capture_type=capture.capture_type,
-                            assessment_id=capture.assessment_id,
-                            assessment_timing=timing_data,
-                            capture_timestamp=capture_timestamp
-                        )
-
-                        llm_capture_list.append(capture_meta)
-
-                llm_metadata_model = AssessmentCaptureMetadata(
-                    assessment_type='LLM',
-                    total_captures=len(llm_captures),
-                    captures=llm_capture_list
-                )
-                zip_file.writestr('images/llm/metadata.json', llm_metadata_model.model_dump_json(indent=2))
+        if llm_captures:
+            llm_capture_list: List[CaptureMetadata] = []
+
+            for capture in llm_captures:
+                capture_history = capture.history_by_filename()
+                for filename in capture.filenames:
+                    # Extract timing data if available
+                    timing_data = None
+                    capture_timestamp = None
+
+                    entry = capture_history.get(filename)
+                    if entry and 'timing' in entry:
+                        timing_data = CaptureTimingData(**entry['timing'])
+
+                    # For old captures without timing, use the capture timestamp
+                    if not timing_data:
+                        capture_timestamp = capture.created_at.isoformat()
+
+                    capture_meta = CaptureMetadata(
+                        filename=filename,
+                        timestamp=capture.created_at.isoformat(),
+                        capture_type=capture.capture_type,
+                        assessment_id=capture.assessment_id,
+                        assessment_timing=timing_data,
+                        capture_timestamp=capture_timestamp
+                    )
+
+                    llm_capture_list.append(capture_meta)
+
+            llm_metadata_model = AssessmentCaptureMetadata(
+                assessment_type='LLM',
+                total_captures=len(llm_captures),
+                captures=llm_capture_list
+            )
+            yield ExportEntry('images/llm/metadata.json', data=llm_metadata_model.model_dump_json(indent=2))
 
     @staticmethod
-    def _generate_summary(session: AssessmentSession, phq_data: Optional[PHQExportData] = None) -> str:
+    def _generate_summary(session: AssessmentSession, phq_data: Optional[PHQExportData] = None,
+                          captures: Optional[List[CameraCapture]] = None) -> str:
         """Generate human-readable summary"""
         summary = f"""
 MENTAL HEALTH ASSESSMENT EXPORT
@@ -367,11 +407,12 @@ PHQ Results Summary:
 """
         
         # Get image organization info
-        with get_session() as db:
-            captures = db.query(CameraCapture).filter_by(session_id=session.id).all()
-            phq_images = sum(len(c.filenames) for c in captures if c.capture_type == 'PHQ')
-            llm_images = sum(len(c.filenames) for c in captures if c.capture_type == 'LLM')
-            unknown_images = sum(len(c.filenames) for c in captures if c.capture_type == 'GENERAL')
+        if captures is None:
+            with get_session() as db:
+                captures = db.query(CameraCapture).filter_by(session_id=session.id).all()
+        phq_images = sum(len(c.filenames) for c in captures if c.capture_type == 'PHQ')
+        llm_images = sum(len(c.filenames) for c in captures if c.capture_type == 'LLM')
+        unknown_images = sum(len(c.filenames) for c in captures if c.capture_type == 'GENERAL')
         
         summary += f"""
 Export Details:
@@ -391,165 +432,248 @@ Note: This export contains sensitive mental health data. Handle with appropriate
         return summary.strip()
 
     @staticmethod
-    def export_bulk_sessions(session_ids: List[str]) -> BytesIO:
-        """Export multiple sessions organized by session number (S1/S2 folders)"""
-        zip_buffer = BytesIO()
+    def export_bulk_sessions(session_ids: List[str], layout: str = 'nested') -> BytesIO:
+        """Export multiple sessions organized by session number (buffered - routes use stream_bulk_sessions)"""
+        return ZipStreamWriter.to_buffer(ExportService.stream_bulk_sessions(session_ids, layout))
+
+    @staticmethod
+    def stream_bulk_sessions(session_ids: List[str], layout: str = 'nested',
+                             on_progress: Optional[Callable[[int, int], None]] = None) -> Iterator[bytes]:
+        """Export multiple sessions organized by session number (S1/S2 folders) as a streamed ZIP"""
+        return ExportService._stream_archive(ExportService._bulk_session_entries(session_ids, layout, on_progress),
+                                             'BULK_SESSIONS', {'layout': layout})
+
+    @staticmethod
+    def _bulk_member_path(zip_path: str, layout: str) -> str:
+        """Where a session lands in a bulk export: 'nested' keeps the per-session .zip, 'flat' uses a folder"""
+        if layout == 'flat':
+            return zip_path[:-len('.zip')]
+        return zip_path
+
+    @staticmethod
+    def _bulk_member_entries(session_entries: Iterator[ExportEntry], member_path: str, layout: str) -> Iterator[ExportEntry]:
+        """Session entries as one nested ZIP (stored, not re-deflated) or prefixed into a folder (flat)"""
+        if layout == 'flat':
+            for entry in session_entries:
+                entry.arcname = f'{member_path}/{entry.arcname}'
+                yield entry
+        else:
+            yield ExportEntry(member_path, chunks=ExportService._stream_archive(session_entries, 'SESSION'))
+
+    @staticmethod
+    def _session_member_entries(session_id: str, member_path: str, layout: str,
+                                bundle: Optional[SessionBundle] = None) -> List[ExportEntry]:
+        """
+        One session inside a bulk export, prepared so the writer thread only copies bytes
+
+        Runs on a pipeline worker: DB loading (and, for nested members, building the session ZIP)
+        happens here. Nested members come from the export cache when enabled, otherwise from an
+        anonymous temp file; flat entries keep images on disk for the writer to stream.
+        """
+        if layout == 'flat':
+            session_entries = ExportService._session_entries(session_id, bundle=bundle)
+            return list(ExportService._bulk_member_entries(session_entries, member_path, layout))
+        if ExportCacheService.enabled():
+            return [ExportEntry(member_path, path=ExportCacheService.get_session_archive(session_id, bundle))]
+
+        spool = tempfile.TemporaryFile()
+        try:
+            for chunk in ExportService.stream_session_uncached(session_id, bundle):
+                spool.write(chunk)
+            spool.seek(0)
+        except Exception:
+            spool.close()
+            raise
+        return [ExportEntry(member_path, chunks=ExportService._drain_spool(spool))]
+
+    @staticmethod
+    def _drain_spool(spool) -> Iterator[bytes]:
+        """Stream a prepared temp file and close (delete) it"""
+        with spool:
+            while True:
+                chunk = spool.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    @staticmethod
+    def _pipeline(fn: Callable, items: Iterable) -> Iterator:
+        """
+        Ordered, bounded parallel map for export stages
+
+        Up to EXPORT_WORKERS sessions are prepared concurrently (zlib and file I/O release the GIL),
+        at most 2x that many wait for the single writer, and results come back in input order so
+        the archive layout is deterministic.
+        """
+        app = current_app._get_current_object()
+
+        def run(item):
+            with app.app_context():
+                return fn(item)
+
+        return ordered_map(run, items, max_workers=Config.EXPORT_WORKERS, thread_name_prefix='ExportWorker')
+
+    @staticmethod
+    def _prepare_bulk_session(session_id: str, bundle: Optional[SessionBundle], layout: str, timestamp: str) -> Dict:
+        """Pipeline stage for stream_bulk_sessions: summary info plus ready-to-write entries"""
+        try:
+            if bundle is None:
+                raise ValueError(f"Session {session_id} not found")
+
+            # Get session info for the summary
+            session = bundle.session
+            if session.user:
+                username = session.user.uname
+                user_id = session.user_id
+                session_number = session.session_number
+                # Create a clean filename-safe version of the username
+                clean_username = "".join(c for c in username if c.isalnum() or c in (' ', '-', '_')).rstrip()
+                clean_username = clean_username.replace(' ', '_')
+                filename = f'user_{user_id}_{clean_username}_session{session_number}_{session_id}.zip'
+
+                # Organize by session number into folders
+                if session_number == 1:
+                    folder_path = ExportService._bulk_member_path(f'session_1/{filename}', layout)
+                elif session_number == 2:
+                    folder_path = ExportService._bulk_member_path(f'session_2/{filename}', layout)
+                else:
+                    folder_path = ExportService._bulk_member_path(f'unknown_session/{filename}', layout)  # Fallback
+
+                info = {
+                    'user_id': user_id,
+                    'username': username,
+                    'session_id': session_id,
+                    'session_number': session_number,
+                    'filename': filename,
+                    'folder_path': folder_path
+                }
+            else:
+                filename = f'session_{session_id}_{timestamp}.zip'
+                folder_path = ExportService._bulk_member_path(f'unknown_user/{filename}', layout)
+                info = {
+                    'user_id': 'Unknown',
+                    'username': 'Unknown',
+                    'session_id': session_id,
+                    'session_number': 'Unknown',
+                    'filename': filename,
+                    'folder_path': folder_path
+                }
+
+            entries = ExportService._session_member_entries(session_id, folder_path, layout, bundle)
+            return {'info': info, 'entries': entries}
+        except Exception as e:
+            # Add error log for failed exports
+            error_msg = f"Failed to export session {session_id}: {str(e)}"
+            return {'info': None, 'entries': [ExportEntry(f'ERROR_session_{session_id}.txt', data=error_msg)]}
+
+    @staticmethod
+    def _bulk_session_entries(session_ids: List[str], layout: str = 'nested',
+                              on_progress: Optional[Callable[[int, int], None]] = None) -> Iterator[ExportEntry]:
+        """Each session as a nested ZIP or a flat folder, then the bulk summary (on_progress(done, total) per session)"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            session_info_list = []
-            session1_count = 0
-            session2_count = 0
-            
-            for session_id in session_ids:
-                try:
-                    session_zip = ExportService.export_session(session_id)
-                    # Get session info for the summary
-                    with get_session() as db:
-                        session = db.query(AssessmentSession).filter_by(id=session_id).first()
-                        if session and session.user:
-                            username = session.user.uname
-                            user_id = session.user_id
-                            session_number = session.session_number
-                            # Create a clean filename-safe version of the username
-                            clean_username = "".join(c for c in username if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                            clean_username = clean_username.replace(' ', '_')
-                            filename = f'user_{user_id}_{clean_username}_session{session_number}_{session_id}.zip'
-                            
-                            # Organize by session number into folders
-                            if session_number == 1:
-                                folder_path = f'session_1/{filename}'
-                                session1_count += 1
-                            elif session_number == 2:
-                                folder_path = f'session_2/{filename}'
-                                session2_count += 1
-                            else:
-                                folder_path = f'unknown_session/{filename}'  # Fallback
-                                
-                            session_info_list.append({
-                                'user_id': user_id,
-                                'username': username,
-                                'session_id': session_id,
-                                'session_number': session_number,
-                                'filename': filename,
-                                'folder_path': folder_path
-                            })
-                        else:
-                            filename = f'session_{session_id}_{timestamp}.zip'
-                            folder_path = f'unknown_user/{filename}'
-                            session_info_list.append({
-                                'user_id': 'Unknown',
-                                'username': 'Unknown',
-                                'session_id': session_id,
-                                'session_number': 'Unknown',
-                                'filename': filename,
-                                'folder_path': folder_path
-                            })
-                    
-                    zip_file.writestr(folder_path, session_zip.getvalue())
-                except Exception as e:
-                    # Add error log for failed exports
-                    error_msg = f"Failed to export session {session_id}: {str(e)}"
-                    zip_file.writestr(f'ERROR_session_{session_id}.txt', error_msg)
-            
-            # Add bulk summary with session separation info
-            summary = f"Bulk Export Summary\n==================\nExported: {len(session_ids)} sessions\nGenerated: {datetime.now().isoformat()}\n\nSession 1: {session1_count} sessions\nSession 2: {session2_count} sessions\n\nSession Details:\n"
-            for info in session_info_list:
-                summary += f"- User {info['user_id']} ({info['username']}) - Session {info['session_number']} - File: {info['folder_path']}\n"
-            
-            zip_file.writestr('bulk_summary.txt', summary)
-        
-        zip_buffer.seek(0)
-        return zip_buffer
+        session_info_list = []
+        session1_count = 0
+        session2_count = 0
+
+        # Bundles are loaded in set-based chunks as the pipeline pulls work
+        prepared = ExportService._pipeline(
+            lambda item: ExportService._prepare_bulk_session(item[0], item[1], layout, timestamp),
+            ExportDataLoader.iter_bundles(session_ids)
+        )
+        for index, result in enumerate(prepared, start=1):
+            info = result['info']
+            if info:
+                session_info_list.append(info)
+                if info['session_number'] == 1:
+                    session1_count += 1
+                elif info['session_number'] == 2:
+                    session2_count += 1
+
+            # Session is written (or spliced from the cache) straight into the outer archive
+            yield from result['entries']
+            if on_progress:
+                on_progress(index, len(session_ids))
+
+        # Add bulk summary with session separation info
+        summary = f"Bulk Export Summary\n==================\nExported: {len(session_ids)} sessions\nGenerated: {datetime.now().isoformat()}\n\nSession 1: {session1_count} sessions\nSession 2: {session2_count} sessions\n\nSession Details:\n"
+        for info in session_info_list:
+            summary += f"- User {info['user_id']} ({info['username']}) - Session {info['session_number']} - File: {info['folder_path']}\n"
+
+        yield ExportEntry('bulk_summary.txt', data=summary)
+
+    @staticmethod
+    def export_sessions_by_session_number(layout: str = 'nested') -> BytesIO:
+        """Export all sessions organized by completion status (buffered - routes use stream_sessions_by_session_number)"""
+        return ZipStreamWriter.to_buffer(ExportService.stream_sessions_by_session_number(layout))
 
     @staticmethod
-    def export_sessions_by_session_number() -> BytesIO:
-        """Export all sessions organized by completion status (completed/incomplete users)"""
-        zip_buffer = BytesIO()
+    def stream_sessions_by_session_number(layout: str = 'nested',
+                                          on_progress: Optional[Callable[[int, int], None]] = None) -> Iterator[bytes]:
+        """Export all sessions organized by completion status (completed/incomplete users) as a streamed ZIP"""
+        return ExportService._stream_archive(ExportService._sessions_by_completion_entries(layout, on_progress),
+                                             'ALL_SESSIONS', {'layout': layout})
+
+    @staticmethod
+    def _sessions_by_completion_entries(layout: str = 'nested',
+                                        on_progress: Optional[Callable[[int, int], None]] = None) -> Iterator[ExportEntry]:
+        """Session ZIPs (or flat folders) grouped into completed/ and incomplete/, then the summary (on_progress(done, total) per session)"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Use StatsService to get organized user data
-            from .statsService import StatsService
-            user_data = StatsService.get_all_user_sessions_for_export()
-            
-            session_info_list = []
-            completed_count = 0
-            incomplete_count = 0
-            
-            # Process completed users (both sessions completed)
-            for user_info in user_data['completed']:
+
+        # Use StatsService to get organized user data
+        from .statsService import StatsService
+        user_data = StatsService.get_all_user_sessions_for_export()
+
+        session_info_list = []
+        completed_count = 0
+        incomplete_count = 0
+
+        # Plan every member first (no I/O), then prepare them on the export pipeline
+        for completion_status in ('completed', 'incomplete'):
+            for user_info in user_data[completion_status]:
                 user = user_info['user']
-                sessions = user_info['sessions']
-                
-                try:
-                    username = user.uname
-                    user_id = user.id
-                    clean_username = "".join(c for c in username if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                    clean_username = clean_username.replace(' ', '_')
-                    
-                    # Export each session for this completed user
-                    for session in sessions:
-                        session_zip = ExportService.export_session(session.id)
-                        filename = f'user_{user_id}_{clean_username}_session{session.session_number}_{session.id}_{timestamp}.zip'
-                        folder_path = f'completed/{filename}'
-                        
-                        session_info_list.append({
-                            'user_id': user_id,
-                            'username': username,
-                            'session_id': session.id,
-                            'session_number': session.session_number,
-                            'filename': filename,
-                            'folder_path': folder_path,
-                            'completion_status': 'completed'
-                        })
-                        
-                        zip_file.writestr(folder_path, session_zip.getvalue())
-                    
+                username = user.uname
+                user_id = user.id
+                clean_username = "".join(c for c in username if c.isalnum() or c in (' ', '-', '_')).rstrip()
+                clean_username = clean_username.replace(' ', '_')
+
+                for session in user_info['sessions']:
+                    # Incomplete users (only session 1 completed): only export completed sessions
+                    if completion_status == 'incomplete' and session.status != 'COMPLETED':
+                        continue
+                    filename = f'user_{user_id}_{clean_username}_session{session.session_number}_{session.id}_{timestamp}.zip'
+                    session_info_list.append({
+                        'user_id': user_id,
+                        'username': username,
+                        'session_id': session.id,
+                        'session_number': session.session_number,
+                        'filename': filename,
+                        'folder_path': ExportService._bulk_member_path(f'{completion_status}/{filename}', layout),
+                        'completion_status': completion_status
+                    })
+
+                if completion_status == 'completed':
                     completed_count += 1
-                    
-                except Exception as e:
-                    error_msg = f"Failed to export completed user {user.id} sessions: {str(e)}"
-                    zip_file.writestr(f'completed/ERROR_user_{user.id}.txt', error_msg)
-            
-            # Process incomplete users (only session 1 completed)
-            for user_info in user_data['incomplete']:
-                user = user_info['user']
-                sessions = user_info['sessions']
-                
-                try:
-                    username = user.uname
-                    user_id = user.id
-                    clean_username = "".join(c for c in username if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                    clean_username = clean_username.replace(' ', '_')
-                    
-                    # Export session 1 for this incomplete user
-                    for session in sessions:
-                        if session.status == 'COMPLETED':  # Only export completed sessions
-                            session_zip = ExportService.export_session(session.id)
-                            filename = f'user_{user_id}_{clean_username}_session{session.session_number}_{session.id}_{timestamp}.zip'
-                            folder_path = f'incomplete/{filename}'
-                            
-                            session_info_list.append({
-                                'user_id': user_id,
-                                'username': username,
-                                'session_id': session.id,
-                                'session_number': session.session_number,
-                                'filename': filename,
-                                'folder_path': folder_path,
-                                'completion_status': 'incomplete'
-                            })
-                            
-                            zip_file.writestr(folder_path, session_zip.getvalue())
-                    
+                else:
                     incomplete_count += 1
-                    
-                except Exception as e:
-                    error_msg = f"Failed to export incomplete user {user.id} sessions: {str(e)}"
-                    zip_file.writestr(f'incomplete/ERROR_user_{user.id}.txt', error_msg)
-            
-            # Add comprehensive summary
-            summary = f"""All Sessions Export Summary (Completion-Based)
+
+        def prepare(item) -> List[ExportEntry]:
+            info, (_session_id, bundle) = item
+            try:
+                if bundle is None:
+                    raise ValueError(f"Session {info['session_id']} not found")
+                return ExportService._session_member_entries(info['session_id'], info['folder_path'], layout, bundle)
+            except Exception as e:
+                error_msg = f"Failed to export {info['completion_status']} user {info['user_id']} session {info['session_id']}: {str(e)}"
+                return [ExportEntry(f"{info['completion_status']}/ERROR_session_{info['session_id']}.txt", data=error_msg)]
+
+        bundles = ExportDataLoader.iter_bundles(info['session_id'] for info in session_info_list)
+        for index, entries in enumerate(ExportService._pipeline(prepare, zip(session_info_list, bundles)), start=1):
+            yield from entries
+            if on_progress:
+                on_progress(index, len(session_info_list))
+
+        # Add comprehensive summary
+        summary = f"""All Sessions Export Summary (Completion-Based)
 =============================================
 Exported: {len(session_info_list)} sessions from {completed_count + incomplete_count} users
 Generated: {datetime.now().isoformat()}
@@ -564,25 +688,192 @@ Total Sessions by Number:
 
 Session Details:
 """
-            
-            # Group by completion status for better readability
-            completed_sessions = [s for s in session_info_list if s['completion_status'] == 'completed']
-            incomplete_sessions = [s for s in session_info_list if s['completion_status'] == 'incomplete']
-            
-            if completed_sessions:
-                summary += "\nCOMPLETED USERS (Both Sessions):\n" + "-" * 35 + "\n"
-                for info in completed_sessions:
-                    summary += f"- User {info['user_id']} ({info['username']}) - Session {info['session_number']} - {info['filename']}\n"
-            
-            if incomplete_sessions:
-                summary += "\nINCOMPLETE USERS (Session 1 Only):\n" + "-" * 36 + "\n"
-                for info in incomplete_sessions:
-                    summary += f"- User {info['user_id']} ({info['username']}) - Session {info['session_number']} - {info['filename']}\n"
-            
-            zip_file.writestr('export_summary.txt', summary)
-        
-        zip_buffer.seek(0)
-        return zip_buffer
+
+        # Group by completion status for better readability
+        completed_sessions = [s for s in session_info_list if s['completion_status'] == 'completed']
+        incomplete_sessions = [s for s in session_info_list if s['completion_status'] == 'incomplete']
+
+        if completed_sessions:
+            summary += "\nCOMPLETED USERS (Both Sessions):\n" + "-" * 35 + "\n"
+            for info in completed_sessions:
+                summary += f"- User {info['user_id']} ({info['username']}) - Session {info['session_number']} - {info['filename']}\n"
+
+        if incomplete_sessions:
+            summary += "\nINCOMPLETE USERS (Session 1 Only):\n" + "-" * 36 + "\n"
+            for info in incomplete_sessions:
+                summary += f"- User {info['user_id']} ({info['username']}) - Session {info['session_number']} - {info['filename']}\n"
+
+        yield ExportEntry('export_summary.txt', data=summary)
+
+    # ============= DELTA (INCREMENTAL) EXPORT =============
+
+    @staticmethod
+    def resolve_delta_watermark(since: Optional[str] = None, since_export: Optional[str] = None) -> datetime:
+        """Naive-UTC watermark from an ISO timestamp or a previous export job (its build start time)"""
+        if since_export:
+            with get_session() as db:
+                previous = db.query(SessionExport).filter_by(id=since_export).first()
+                if not previous:
+                    raise ValueError(f"Export {since_export} not found")
+                watermark = (previous.export_data or {}).get('watermark')
+                if watermark:
+                    return datetime.fromisoformat(watermark)
+                return previous.created_at
+
+        if not since:
+            raise ValueError("Provide 'since' (ISO timestamp) or 'since_export' (previous export id)")
+        try:
+            watermark = datetime.fromisoformat(since)
+        except ValueError:
+            raise ValueError(f"Invalid 'since' timestamp: {since}")
+        if watermark.tzinfo is not None:
+            watermark = watermark.astimezone(timezone.utc).replace(tzinfo=None)
+        return watermark
+
+    @staticmethod
+    def find_changed_sessions(since: datetime) -> Dict[str, Dict]:
+        """
+        Sessions with rows created/modified at or after `since`
+
+        Returns:
+            {session_id: {'images': set of new image filenames, 'facial_analysis': set of 'PHQ'/'LLM'}}
+        """
+        from ...model.assessment.facial_analysis import SessionFacialAnalysis
+
+        # Most columns are naive UTC; TimestampMixin columns (frames, capture updated_at) are timezone-aware
+        since_aware = since.replace(tzinfo=timezone.utc)
+        changes: Dict[str, Dict] = {}
+
+        def touch(session_id: str) -> Dict:
+            return changes.setdefault(session_id, {'images': set(), 'facial_analysis': set()})
+
+        with get_session() as db:
+            for (session_id,) in db.query(AssessmentSession.id).filter(
+                    (AssessmentSession.created_at >= since) | (AssessmentSession.updated_at >= since)):
+                touch(session_id)
+            for (session_id,) in db.query(PHQResponse.session_id).filter(PHQResponse.updated_at >= since):
+                touch(session_id)
+            for (session_id,) in db.query(LLMConversation.session_id).filter(LLMConversation.updated_at >= since):
+                touch(session_id)
+
+            # Legacy captures keep filenames in a JSON array that was appended to in place
+            for capture in db.query(CameraCapture).filter(
+                    (CameraCapture.created_at >= since) | (CameraCapture.updated_at >= since_aware)):
+                touch(capture.session_id)['images'].update(f for f in (capture.stored_filenames or []) if f)
+
+            # Frames written since (updated_at moves when the writer marks the file on disk), plus every
+            # frame of a capture modified since - a frame uploaded before the watermark but linked after
+            # it was still UNKNOWN (and skipped) in the previous export
+            for session_id, filename in db.query(CaptureFrame.session_id, CaptureFrame.filename).join(
+                    CameraCapture, CaptureFrame.capture_id == CameraCapture.id).filter(
+                    CaptureFrame.file_status == 'WRITTEN',
+                    (CaptureFrame.updated_at >= since_aware) | (CameraCapture.updated_at >= since_aware)):
+                touch(session_id)['images'].add(filename)
+
+            for session_id, assessment_type in db.query(
+                    SessionFacialAnalysis.session_id, SessionFacialAnalysis.assessment_type).filter(
+                    SessionFacialAnalysis.status == 'completed', SessionFacialAnalysis.completed_at >= since):
+                touch(session_id)['facial_analysis'].add(assessment_type)
+
+        return changes
+
+    @staticmethod
+    def stream_delta_sessions(since: datetime, watermark: Optional[datetime] = None,
+                              on_progress: Optional[Callable[[int, int], None]] = None) -> Iterator[bytes]:
+        """
+        Streamed ZIP of everything changed since `since`, plus manifest.json with a hash per file
+
+        Layout matches the flat bulk export (session_N/<user folder>/...), so a client can unpack
+        it over a previous export. Pass the manifest's 'watermark' as the next 'since'.
+        Deleted sessions are not reported.
+        """
+        # Taken before the change queries so rows written during the export land in the next delta
+        watermark = watermark or datetime.utcnow()
+        changes = ExportService.find_changed_sessions(since)
+        manifest_fields = {
+            'since': since.isoformat(),
+            'watermark': watermark.isoformat(),
+            'sessions': sorted(changes)
+        }
+        return ExportService._stream_archive(ExportService._delta_entries(changes, since, on_progress), 'DELTA',
+                                             manifest_fields)
+
+    @staticmethod
+    def _delta_folder(bundle: SessionBundle) -> str:
+        """Same per-session folder name the flat bulk export uses"""
+        session = bundle.session
+        if not session.user:
+            return f'unknown_user/session_{session.id}'
+        clean_username = "".join(c for c in session.user.uname if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        clean_username = clean_username.replace(' ', '_')
+        number_folder = f'session_{session.session_number}' if session.session_number in (1, 2) else 'unknown_session'
+        return f'{number_folder}/user_{session.user_id}_{clean_username}_session{session.session_number}_{session.id}'
+
+    @staticmethod
+    def _delta_facial_analysis_entries(bundle: SessionBundle, assessment_types: Set[str], folder: str,
+                                       upload_path: str) -> List[ExportEntry]:
+        entries = []
+        for assessment_type in sorted(assessment_types):
+            analysis = bundle.facial_analyses.get(assessment_type)
+            if not analysis:
+                continue
+            jsonl_path = os.path.join(upload_path, analysis.jsonl_file_path)
+            if os.path.exists(jsonl_path):
+                entries.append(ExportEntry(
+                    f'{folder}/facial_analysis/{assessment_type.lower()}_analysis.jsonl', path=jsonl_path
+                ))
+        return entries
+
+    @staticmethod
+    def _delta_entries(changes: Dict[str, Dict], since: datetime,
+                       on_progress: Optional[Callable[[int, int], None]] = None) -> Iterator[ExportEntry]:
+        """Changed sessions (metadata always, only new images/analysis files), then the delta summary"""
+        upload_path = current_app.media_save
+        session_ids = sorted(changes)
+        image_count = sum(len(c['images']) for c in changes.values())
+
+        def prepare(item) -> List[ExportEntry]:
+            session_id, bundle = item
+            change = changes[session_id]
+            try:
+                if bundle is None:
+                    raise ValueError(f"Session {session_id} not found")
+                folder = ExportService._delta_folder(bundle)
+                session_entries = ExportService._session_entries(session_id, only_filenames=change['images'], bundle=bundle)
+                entries = list(ExportService._bulk_member_entries(session_entries, folder, 'flat'))
+                if change['facial_analysis']:
+                    entries.extend(ExportService._delta_facial_analysis_entries(
+                        bundle, change['facial_analysis'], folder, upload_path
+                    ))
+                return entries
+            except Exception as e:
+                return [ExportEntry(f'ERROR_session_{session_id}.txt', data=f"Failed to export session {session_id}: {str(e)}")]
+
+        prepared = ExportService._pipeline(prepare, ExportDataLoader.iter_bundles(session_ids))
+        for index, entries in enumerate(prepared, start=1):
+            yield from entries
+            if on_progress:
+                on_progress(index, len(session_ids))
+
+        summary = f"""Delta Export Summary
+====================
+Changes since: {since.isoformat()} (UTC)
+Generated: {datetime.now().isoformat()}
+
+Sessions changed: {len(session_ids)}
+New images: {image_count}
+Facial analysis results: {sum(len(c['facial_analysis']) for c in changes.values())}
+
+Changed sessions include all metadata JSON; only images and analysis files added since the
+watermark are included. manifest.json lists every file with its size and hash for merging.
+"""
+        yield ExportEntry('delta_summary.txt', data=summary)
+
+    @staticmethod
+    def get_delta_export_filename(since: datetime) -> str:
+        """Generate filename for a delta export"""
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f'sessions_delta_since_{since.strftime("%Y%m%d_%H%M%S")}_{timestamp}.zip'
 
     @staticmethod
     def get_export_filename(session_id: str) -> str:
@@ -618,100 +909,87 @@ Session Details:
 
     @staticmethod
     def export_session_with_facial_analysis(session_id: str) -> BytesIO:
-        """Export session with PHQ data, LLM data, and JSONL files (NO images)"""
-        from ...model.assessment.facial_analysis import SessionFacialAnalysis
+        """Export session with facial analysis (buffered - routes use stream_session_with_facial_analysis)"""
+        return ZipStreamWriter.to_buffer(ExportService.stream_session_with_facial_analysis(session_id))
 
-        with get_session() as db:
-            session = db.query(AssessmentSession).filter_by(id=session_id).first()
-            if not session:
-                raise ValueError(f"Session {session_id} not found")
-
-            # Get facial analysis records
-            phq_analysis = db.query(SessionFacialAnalysis).filter_by(
-                session_id=session_id,
-                assessment_type='PHQ'
-            ).first()
-
-            llm_analysis = db.query(SessionFacialAnalysis).filter_by(
-                session_id=session_id,
-                assessment_type='LLM'
-            ).first()
-
-            # Check if both are completed
-            if not (phq_analysis and phq_analysis.status == 'completed' and
-                    llm_analysis and llm_analysis.status == 'completed'):
-                raise ValueError("Both PHQ and LLM facial analysis must be completed")
+    @staticmethod
+    def stream_session_with_facial_analysis(session_id: str) -> Iterator[bytes]:
+        """Export session with PHQ data, LLM data, and JSONL files (NO images) as a streamed ZIP"""
+        bundle = ExportDataLoader.load_one(session_id)
+        session = bundle.session
+
+        # Facial analysis records come with the bundle
+        phq_analysis = bundle.facial_analyses.get('PHQ')
+        llm_analysis = bundle.facial_analyses.get('LLM')
+
+        # Check if both are completed
+        if not (phq_analysis and phq_analysis.status == 'completed' and
+                llm_analysis and llm_analysis.status == 'completed'):
+            raise ValueError("Both PHQ and LLM facial analysis must be completed")
+
+        # 1. Session info
+        session_info = ExportService._get_session_info(session)
+        entries = [ExportEntry('session_info.json', data=session_info.model_dump_json(indent=2))]
+
+        # 2. PHQ responses
+        if session.phq_completed_at:
+            phq_data = ExportService._get_phq_data(session_id, bundle)
+            entries.append(ExportEntry('phq_responses.json', data=phq_data.model_dump_json(indent=2)))
+
+        # 3. LLM conversation
+        if session.llm_completed_at:
+            llm_data = ExportService._get_llm_data(session_id, bundle)
+            entries.append(ExportEntry('llm_conversation.json', data=llm_data.model_dump_json(indent=2)))
+
+        # 4. Add JSONL files
+        upload_path = current_app.media_save
 
-            # Create ZIP in memory
-            zip_buffer = BytesIO()
-
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                # 1. Session info
-                session_info = ExportService._get_session_info(session)
-                zip_file.writestr('session_info.json', session_info.model_dump_json(indent=2))
-
-                # 2. PHQ responses
-                if session.phq_completed_at:
-                    phq_data = ExportService._get_phq_data(session_id)
-                    zip_file.writestr('phq_responses.json', phq_data.model_dump_json(indent=2))
-
-                # 3. LLM conversation
-                if session.llm_completed_at:
-                    llm_data = ExportService._get_llm_data(session_id)
-                    zip_file.writestr('llm_conversation.json', llm_data.model_dump_json(indent=2))
-
-                # 4. Add JSONL files
-                upload_path = current_app.media_save
-
-                # Add PHQ JSONL
-                phq_jsonl_path = os.path.join(upload_path, phq_analysis.jsonl_file_path)
-                if os.path.exists(phq_jsonl_path):
-                    with open(phq_jsonl_path, 'r') as f:
-                        zip_file.writestr('facial_analysis/phq_analysis.jsonl', f.read())
-
-                # Add LLM JSONL
-                llm_jsonl_path = os.path.join(upload_path, llm_analysis.jsonl_file_path)
-                if os.path.exists(llm_jsonl_path):
-                    with open(llm_jsonl_path, 'r') as f:
-                        zip_file.writestr('facial_analysis/llm_analysis.jsonl', f.read())
-
-                # 5. Add facial analysis metadata
-                facial_metadata = {
-                    'phq_analysis': {
-                        'status': phq_analysis.status,
-                        'total_images_processed': phq_analysis.total_images_processed,
-                        'images_with_faces_detected': phq_analysis.images_with_faces_detected,
-                        'images_failed': phq_analysis.images_failed,
-                        'processing_time_seconds': phq_analysis.processing_time_seconds,
-                        'avg_time_per_image_ms': phq_analysis.avg_time_per_image_ms,
-                        'summary_stats': phq_analysis.summary_stats,
-                        'started_at': phq_analysis.started_at.isoformat() if phq_analysis.started_at else None,
-                        'completed_at': phq_analysis.completed_at.isoformat() if phq_analysis.completed_at else None
-                    },
-                    'llm_analysis': {
-                        'status': llm_analysis.status,
-                        'total_images_processed': llm_analysis.total_images_processed,
-                        'images_with_faces_detected': llm_analysis.images_with_faces_detected,
-                        'images_failed': llm_analysis.images_failed,
-                        'processing_time_seconds': llm_analysis.processing_time_seconds,
-                        'avg_time_per_image_ms': llm_analysis.avg_time_per_image_ms,
-                        'summary_stats': llm_analysis.summary_stats,
-                        'started_at': llm_analysis.started_at.isoformat() if llm_analysis.started_at else None,
-                        'completed_at': llm_analysis.completed_at.isoformat() if llm_analysis.completed_at else None
-                    }
-                }
-                import json
-                zip_file.writestr('facial_analysis/metadata.json', json.dumps(facial_metadata, indent=2))
+        # Add PHQ JSONL
+        phq_jsonl_path = os.path.join(upload_path, phq_analysis.jsonl_file_path)
+        if os.path.exists(phq_jsonl_path):
+            entries.append(ExportEntry('facial_analysis/phq_analysis.jsonl', path=phq_jsonl_path))
+
+        # Add LLM JSONL
+        llm_jsonl_path = os.path.join(upload_path, llm_analysis.jsonl_file_path)
+        if os.path.exists(llm_jsonl_path):
+            entries.append(ExportEntry('facial_analysis/llm_analysis.jsonl', path=llm_jsonl_path))
+
+        # 5. Add facial analysis metadata
+        facial_metadata = {
+            'phq_analysis': {
+                'status': phq_analysis.status,
+                'total_images_processed': phq_analysis.total_images_processed,
+                'images_with_faces_detected': phq_analysis.images_with_faces_detected,
+                'images_failed': phq_analysis.images_failed,
+                'processing_time_seconds': phq_analysis.processing_time_seconds,
+                'avg_time_per_image_ms': phq_analysis.avg_time_per_image_ms,
+                'summary_stats': phq_analysis.summary_stats,
+                'started_at': phq_analysis.started_at.isoformat() if phq_analysis.started_at else None,
+                'completed_at': phq_analysis.completed_at.isoformat() if phq_analysis.completed_at else None
+            },
+            'llm_analysis': {
+                'status': llm_analysis.status,
+                'total_images_processed': llm_analysis.total_images_processed,
+                'images_with_faces_detected': llm_analysis.images_with_faces_detected,
+                'images_failed': llm_analysis.images_failed,
+                'processing_time_seconds': llm_analysis.processing_time_seconds,
+                'avg_time_per_image_ms': llm_analysis.avg_time_per_image_ms,
+                'summary_stats': llm_analysis.summary_stats,
+                'started_at': llm_analysis.started_at.isoformat() if llm_analysis.started_at else None,
+                'completed_at': llm_analysis.completed_at.isoformat() if llm_analysis.completed_at else None
+            }
+        }
+        import json
+        entries.append(ExportEntry('facial_analysis/metadata.json', data=json.dumps(facial_metadata, indent=2)))
 
-                # 6. Generate summary
-                phq_model = phq_data if session.phq_completed_at else None
-                summary = ExportService._generate_facial_analysis_summary(
-                    session, phq_analysis, llm_analysis, phq_model
-                )
-                zip_file.writestr('summary.txt', summary)
+        # 6. Generate summary
+        phq_model = phq_data if session.phq_completed_at else None
+        summary = ExportService._generate_facial_analysis_summary(
+            session, phq_analysis, llm_analysis, phq_model
+        )
+        entries.append(ExportEntry('summary.txt', data=summary))
 
-            zip_buffer.seek(0)
-            return zip_buffer
+        return ExportService._stream_archive(entries, 'FACIAL_ANALYSIS', {'session_id': session_id})
 
     @staticmethod
     def _generate_facial_analysis_summary(session: AssessmentSession,
@@ -782,120 +1060,110 @@ Note: This export contains sensitive mental health data. Handle with appropriate
         return summary.strip()
 
     @staticmethod
-    def _export_single_session_data(session_id: str, upload_path: str):
+    def _export_single_session_data(session_id: str, upload_path: str, bundle: Optional[SessionBundle] = None):
         """Helper function to export a single session's data (for parallelization)"""
-        from ...model.assessment.facial_analysis import SessionFacialAnalysis
         import json
 
         try:
-            with get_session() as db:
-                session = db.query(AssessmentSession).filter_by(id=session_id).first()
-                if not session:
-                    raise ValueError(f"Session {session_id} not found")
+            if bundle is None:
+                raise ValueError(f"Session {session_id} not found")
+            session = bundle.session
 
-                # Get facial analysis records
-                phq_analysis = db.query(SessionFacialAnalysis).filter_by(
-                    session_id=session_id,
-                    assessment_type='PHQ'
-                ).first()
-                llm_analysis = db.query(SessionFacialAnalysis).filter_by(
-                    session_id=session_id,
-                    assessment_type='LLM'
-                ).first()
-
-                # Check if both are completed
-                if not (phq_analysis and phq_analysis.status == 'completed' and
-                        llm_analysis and llm_analysis.status == 'completed'):
-                    raise ValueError("Both PHQ and LLM facial analysis must be completed")
-
-                # Build folder name
-                username = session.user.uname if session.user else 'unknown'
-                user_id = session.user_id
-                session_number = session.session_number
-                is_first = session.is_first  # 'phq' or 'llm'
+            # Facial analysis records come with the bundle
+            phq_analysis = bundle.facial_analyses.get('PHQ')
+            llm_analysis = bundle.facial_analyses.get('LLM')
 
-                clean_username = "".join(c for c in username if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                clean_username = clean_username.replace(' ', '_')
+            # Check if both are completed
+            if not (phq_analysis and phq_analysis.status == 'completed' and
+                    llm_analysis and llm_analysis.status == 'completed'):
+                raise ValueError("Both PHQ and LLM facial analysis must be completed")
 
-                folder_name = f'user_{user_id}_{clean_username}_session{session_number}'
-
-                # Collect all files to add to zip
-                files_to_add = {}
-
-                # 1. Session info
-                session_info = ExportService._get_session_info(session)
-                files_to_add[f'{folder_name}/session_info.json'] = session_info.model_dump_json(indent=2)
-
-                # 2. PHQ responses
-                phq_data = None
-                if session.phq_completed_at:
-                    phq_data = ExportService._get_phq_data(session_id)
-                    files_to_add[f'{folder_name}/phq_responses.json'] = phq_data.model_dump_json(indent=2)
-
-                # 3. LLM conversation
-                if session.llm_completed_at:
-                    llm_data = ExportService._get_llm_data(session_id)
-                    files_to_add[f'{folder_name}/llm_conversation.json'] = llm_data.model_dump_json(indent=2)
-
-                # 4. Add JSONL files
-                # Add PHQ JSONL
-                phq_jsonl_path = os.path.join(upload_path, phq_analysis.jsonl_file_path)
-                if os.path.exists(phq_jsonl_path):
-                    with open(phq_jsonl_path, 'r') as f:
-                        files_to_add[f'{folder_name}/phq_analysis.jsonl'] = f.read()
-
-                # Add LLM JSONL
-                llm_jsonl_path = os.path.join(upload_path, llm_analysis.jsonl_file_path)
-                if os.path.exists(llm_jsonl_path):
-                    with open(llm_jsonl_path, 'r') as f:
-                        files_to_add[f'{folder_name}/llm_analysis.jsonl'] = f.read()
-
-                # 5. Add facial analysis metadata
-                facial_metadata = {
-                    'phq_analysis': {
-                        'status': phq_analysis.status,
-                        'total_images_processed': phq_analysis.total_images_processed,
-                        'images_with_faces_detected': phq_analysis.images_with_faces_detected,
-                        'images_failed': phq_analysis.images_failed,
-                        'processing_time_seconds': phq_analysis.processing_time_seconds,
-                        'avg_time_per_image_ms': phq_analysis.avg_time_per_image_ms,
-                        'summary_stats': phq_analysis.summary_stats,
-                        'started_at': phq_analysis.started_at.isoformat() if phq_analysis.started_at else None,
-                        'completed_at': phq_analysis.completed_at.isoformat() if phq_analysis.completed_at else None
-                    },
-                    'llm_analysis': {
-                        'status': llm_analysis.status,
-                        'total_images_processed': llm_analysis.total_images_processed,
-                        'images_with_faces_detected': llm_analysis.images_with_faces_detected,
-                        'images_failed': llm_analysis.images_failed,
-                        'processing_time_seconds': llm_analysis.processing_time_seconds,
-                        'avg_time_per_image_ms': llm_analysis.avg_time_per_image_ms,
-                        'summary_stats': llm_analysis.summary_stats,
-                        'started_at': llm_analysis.started_at.isoformat() if llm_analysis.started_at else None,
-                        'completed_at': llm_analysis.completed_at.isoformat() if llm_analysis.completed_at else None
-                    }
+            # Build folder name
+            username = session.user.uname if session.user else 'unknown'
+            user_id = session.user_id
+            session_number = session.session_number
+            is_first = session.is_first  # 'phq' or 'llm'
+
+            clean_username = "".join(c for c in username if c.isalnum() or c in (' ', '-', '_')).rstrip()
+            clean_username = clean_username.replace(' ', '_')
+
+            folder_name = f'user_{user_id}_{clean_username}_session{session_number}'
+
+            # Collect all entries to add to zip (JSONL files stay on disk until streamed)
+            files_to_add: List[ExportEntry] = []
+
+            # 1. Session info
+            session_info = ExportService._get_session_info(session)
+            files_to_add.append(ExportEntry(f'{folder_name}/session_info.json', data=session_info.model_dump_json(indent=2)))
+
+            # 2. PHQ responses
+            phq_data = None
+            if session.phq_completed_at:
+                phq_data = ExportService._get_phq_data(session_id, bundle)
+                files_to_add.append(ExportEntry(f'{folder_name}/phq_responses.json', data=phq_data.model_dump_json(indent=2)))
+
+            # 3. LLM conversation
+            if session.llm_completed_at:
+                llm_data = ExportService._get_llm_data(session_id, bundle)
+                files_to_add.append(ExportEntry(f'{folder_name}/llm_conversation.json', data=llm_data.model_dump_json(indent=2)))
+
+            # 4. Add JSONL files
+            # Add PHQ JSONL
+            phq_jsonl_path = os.path.join(upload_path, phq_analysis.jsonl_file_path)
+            if os.path.exists(phq_jsonl_path):
+                files_to_add.append(ExportEntry(f'{folder_name}/phq_analysis.jsonl', path=phq_jsonl_path))
+
+            # Add LLM JSONL
+            llm_jsonl_path = os.path.join(upload_path, llm_analysis.jsonl_file_path)
+            if os.path.exists(llm_jsonl_path):
+                files_to_add.append(ExportEntry(f'{folder_name}/llm_analysis.jsonl', path=llm_jsonl_path))
+
+            # 5. Add facial analysis metadata
+            facial_metadata = {
+                'phq_analysis': {
+                    'status': phq_analysis.status,
+                    'total_images_processed': phq_analysis.total_images_processed,
+                    'images_with_faces_detected': phq_analysis.images_with_faces_detected,
+                    'images_failed': phq_analysis.images_failed,
+                    'processing_time_seconds': phq_analysis.processing_time_seconds,
+                    'avg_time_per_image_ms': phq_analysis.avg_time_per_image_ms,
+                    'summary_stats': phq_analysis.summary_stats,
+                    'started_at': phq_analysis.started_at.isoformat() if phq_analysis.started_at else None,
+                    'completed_at': phq_analysis.completed_at.isoformat() if phq_analysis.completed_at else None
+                },
+                'llm_analysis': {
+                    'status': llm_analysis.status,
+                    'total_images_processed': llm_analysis.total_images_processed,
+                    'images_with_faces_detected': llm_analysis.images_with_faces_detected,
+                    'images_failed': llm_analysis.images_failed,
+                    'processing_time_seconds': llm_analysis.processing_time_seconds,
+                    'avg_time_per_image_ms': llm_analysis.avg_time_per_image_ms,
+                    'summary_stats': llm_analysis.summary_stats,
+                    'started_at': llm_analysis.started_at.isoformat() if llm_analysis.started_at else None,
+                    'completed_at': llm_analysis.completed_at.isoformat() if llm_analysis.completed_at else None
                 }
-                files_to_add[f'{folder_name}/metadata.json'] = json.dumps(facial_metadata, indent=2)
+            }
+            files_to_add.append(ExportEntry(f'{folder_name}/metadata.json', data=json.dumps(facial_metadata, indent=2)))
 
-                # 6. Generate summary
-                summary = ExportService._generate_facial_analysis_summary(
-                    session, phq_analysis, llm_analysis, phq_data
-                )
-                files_to_add[f'{folder_name}/summary.txt'] = summary
+            # 6. Generate summary
+            summary = ExportService._generate_facial_analysis_summary(
+                session, phq_analysis, llm_analysis, phq_data
+            )
+            files_to_add.append(ExportEntry(f'{folder_name}/summary.txt', data=summary))
 
-                # Return data to be added to zip
-                return {
-                    'success': True,
-                    'files': files_to_add,
-                    'session_info': {
-                        'user_id': user_id,
-                        'username': username,
-                        'session_id': session_id,
-                        'session_number': session_number,
-                        'is_first': is_first,
-                        'folder_name': folder_name
-                    }
+            # Return data to be added to zip
+            return {
+                'success': True,
+                'files': files_to_add,
+                'session_info': {
+                    'user_id': user_id,
+                    'username': username,
+                    'session_id': session_id,
+                    'session_number': session_number,
+                    'is_first': is_first,
+                    'folder_name': folder_name
                 }
+            }
 
         except Exception as e:
             # Return error info
@@ -911,57 +1179,47 @@ Note: This export contains sensitive mental health data. Handle with appropriate
 
     @staticmethod
     def export_bulk_facial_analysis(session_ids: List[str]) -> BytesIO:
-        """Export multiple sessions with facial analysis - flat structure with JSONL files (parallelized)"""
-        from ...model.assessment.facial_analysis import SessionFacialAnalysis
+        """Export multiple sessions with facial analysis (buffered - routes use stream_bulk_facial_analysis)"""
+        return ZipStreamWriter.to_buffer(ExportService.stream_bulk_facial_analysis(session_ids))
 
-        zip_buffer = BytesIO()
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    @staticmethod
+    def stream_bulk_facial_analysis(session_ids: List[str]) -> Iterator[bytes]:
+        """Export multiple sessions with facial analysis - flat structure with JSONL files, streamed ZIP"""
         upload_path = current_app.media_save
+        return ExportService._stream_archive(ExportService._bulk_facial_analysis_entries(session_ids, upload_path),
+                                             'BULK_FACIAL_ANALYSIS')
 
-        # Process sessions in parallel
+    @staticmethod
+    def _bulk_facial_analysis_entries(session_ids: List[str], upload_path: str) -> Iterator[ExportEntry]:
+        """Per-session entries prepared on the export pipeline (DB work only), then the bulk summary"""
         session_info_list = []
         session1_count = 0
         session2_count = 0
-        all_files_to_add = {}
-
-        # Use ThreadPoolExecutor for parallel processing
-        max_workers = min(10, len(session_ids))  # Limit to 10 concurrent threads
-
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_session = {
-                executor.submit(ExportService._export_single_session_data, session_id, upload_path): session_id
-                for session_id in session_ids
-            }
-
-            # Collect results as they complete
-            for future in as_completed(future_to_session):
-                result = future.result()
-
-                if result['success']:
-                    # Add all files from this session
-                    all_files_to_add.update(result['files'])
 
-                    # Track session info
-                    session_info_list.append(result['session_info'])
-
-                    # Count sessions
-                    if result['session_info']['session_number'] == 1:
-                        session1_count += 1
-                    elif result['session_info']['session_number'] == 2:
-                        session2_count += 1
-                else:
-                    # Add error file
-                    all_files_to_add[result['error_file']] = result['error_content']
-
-        # Now write everything to the zip file (single-threaded to avoid conflicts)
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Write all collected files
-            for file_path, content in all_files_to_add.items():
-                zip_file.writestr(file_path, content)
+        # Bounded and in request order - only a few sessions' data are held at once
+        prepared = ExportService._pipeline(
+            lambda item: ExportService._export_single_session_data(item[0], upload_path, item[1]),
+            ExportDataLoader.iter_bundles(session_ids)
+        )
+        for result in prepared:
+            if result['success']:
+                # Add all files from this session
+                yield from result['files']
+
+                # Track session info
+                session_info_list.append(result['session_info'])
+
+                # Count sessions
+                if result['session_info']['session_number'] == 1:
+                    session1_count += 1
+                elif result['session_info']['session_number'] == 2:
+                    session2_count += 1
+            else:
+                # Add error file
+                yield ExportEntry(result['error_file'], data=result['error_content'])
 
-            # Add bulk summary
-            summary = f"""Bulk Facial Analysis Export Summary
+        # Add bulk summary
+        summary = f"""Bulk Facial Analysis Export Summary
 ====================================
 Exported: {len(session_info_list)} sessions successfully (out of {len(session_ids)} requested)
 Generated: {datetime.now().isoformat()}
@@ -971,13 +1229,10 @@ Session 2: {session2_count} sessions
 
 Session Details:
 """
-            for info in session_info_list:
-                summary += f"- User {info['user_id']} ({info['username']}) - Session {info['session_number']} - Assessment Order: {info['is_first'].upper()} first - Folder: {info['folder_name']}/\n"
-
-            zip_file.writestr('bulk_summary.txt', summary)
+        for info in session_info_list:
+            summary += f"- User {info['user_id']} ({info['username']}) - Session {info['session_number']} - Assessment Order: {info['is_first'].upper()} first - Folder: {info['folder_name']}/\n"
 
-        zip_buffer.seek(0)
-        return zip_buffer
+        yield ExportEntry('bulk_summary.txt', data=summary)
 
     @staticmethod
     def get_facial_analysis_export_filename(session_id: str) -> str:
@@ -0,0 +1,103 @@
+# app/services/admin/instrumentationService.py
+"""
+Instrumentation settings shared across gunicorn workers
+
+The instrumentation singleton is per process. POST /admin/instrumentation stores the settings in
+the instrumentation_settings row, and every worker applies that row on its first request after
+INSTRUMENTATION_SETTINGS_TTL seconds, so a toggle reaches all workers within the TTL.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from ...config import Config
+from ...db import get_session
+from ...model.admin.instrumentation import InstrumentationSettings
+from ...utils.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+_refresh_lock = threading.Lock()
+_last_refresh = 0.0
+
+
+class InstrumentationService:
+    """Read/write the shared settings row and apply it to this worker's instrumentation"""
+
+    @staticmethod
+    def _serialize(settings: InstrumentationSettings) -> Dict[str, Any]:
+        return {
+            'enabled': settings.enabled,
+            'debug_sample_rate': settings.debug_sample_rate,
+            'log_level': settings.log_level,
+            'reset_at': settings.reset_at.isoformat() if settings.reset_at else None,
+            'updated_at': settings.updated_at.isoformat() if settings.updated_at else None
+        }
+
+    @staticmethod
+    def _apply(settings: Dict[str, Any]) -> None:
+        instrumentation.configure(
+            enabled=settings['enabled'],
+            debug_sample_rate=settings['debug_sample_rate'],
+            log_level=settings['log_level']
+        )
+        # Counters started before the shared reset belong to the old window
+        if settings['reset_at'] and datetime.fromisoformat(settings['reset_at']).timestamp() > instrumentation.started_at:
+            instrumentation.reset()
+
+    @staticmethod
+    def get_settings() -> Optional[Dict[str, Any]]:
+        """Shared settings, or None when nothing was saved yet (workers keep the Config defaults)"""
+        with get_session() as db:
+            settings = db.query(InstrumentationSettings).order_by(InstrumentationSettings.id).first()
+            return InstrumentationService._serialize(settings) if settings else None
+
+    @staticmethod
+    def refresh(force: bool = False) -> None:
+        """Apply the shared settings if this worker has not checked them within the TTL (cheap otherwise)"""
+        global _last_refresh
+        now = time.monotonic()
+        if not force and now - _last_refresh < Config.INSTRUMENTATION_SETTINGS_TTL:
+            return
+        if not _refresh_lock.acquire(blocking=False):
+            return  # Another thread of this worker is already refreshing
+        try:
+            _last_refresh = now
+            settings = InstrumentationService.get_settings()
+            if settings:
+                InstrumentationService._apply(settings)
+        except Exception as e:
+            # Table missing before `flask migrate-instrumentation`, or DB hiccup - keep current settings
+            logger.debug(f"Instrumentation settings not refreshed: {e}")
+        finally:
+            _refresh_lock.release()
+
+    @staticmethod
+    def save_settings(enabled: Optional[bool] = None, debug_sample_rate: Optional[float] = None,
+                      log_level: Optional[str] = None, reset: bool = False) -> Dict[str, Any]:
+        """Update the shared row (created on first save) and apply it to this worker right away"""
+        with get_session() as db:
+            settings = db.query(InstrumentationSettings).order_by(InstrumentationSettings.id).first()
+            if not settings:
+                settings = InstrumentationSettings(
+                    enabled=instrumentation.enabled,
+                    debug_sample_rate=instrumentation.debug_sample_rate
+                )
+                db.add(settings)
+            if enabled is not None:
+                settings.enabled = bool(enabled)
+            if debug_sample_rate is not None:
+                settings.debug_sample_rate = min(1.0, max(0.0, float(debug_sample_rate)))
+            if log_level is not None:
+                settings.log_level = log_level.upper()
+            if reset:
+                settings.reset_at = datetime.now(timezone.utc)
+            db.commit()
+            db.refresh(settings)
+            serialized = InstrumentationService._serialize(settings)
+
+        InstrumentationService._apply(serialized)
+        return serialized
@@ -3,14 +3,23 @@ import os
 from typing import List, Optional, Dict, Any
 from flask import current_app
 from sqlalchemy import and_
-import requests
+from ...config import Config
 from ...model.admin.llm import LLMSettings
 from ...db import get_session
+from ...utils.ttl_cache import TTLCache
+from ..llm.openaiClient import get_http_client, get_openai_client, openai_url
 
+import threading
 import time
 import hashlib
 import hmac
 
+# Active settings snapshot (decrypted key included) shared by every chat request in this process.
+# Create/update/delete bump the version and clear it; the TTL bounds staleness in other worker processes.
+_active_settings_cache = TTLCache(maxsize=1, ttl=Config.LLM_SETTINGS_CACHE_TTL)
+_settings_version = 0
+_settings_version_lock = threading.Lock()
+
 class LLMService:
     """LLM service for managing LLM settings and OpenAI integration"""
             # {"name": "Alexithymia", "description": "Apakah pengguna mengalami kesulitan mengenali dan mengungkapkan emosi mereka?"},
@@ -116,24 +125,64 @@ dengan fokus pada aspek-aspek psikologis berikut: {aspects}
     
     INTIAL_ADMIN_RESPONSE="Selanjutnya, kamu akan berhadapan dengan seseorang mahasiswa secara langsung. Silahkan memulai percakapan terlebih dahulu dengan menyapa mahasiswa tersebut."
     GREETING = "Halo aku Sindi, bagaimana kabar kamu ?"
+    MAX_CONVERSATION_TURNS = 30
+
+    @staticmethod
+    def _serialize_settings(setting: LLMSettings) -> Dict[str, Any]:
+        return {
+            'id': setting.id,
+            'instructions': setting.instructions,
+            'llm_instructions': setting.llm_instructions,
+            'openai_api_key': setting.get_masked_api_key(),  # Return masked API key for security
+            'openai_api_key_unmasked': setting.get_api_key(),  # Return unmasked API key for frontend use
+            'chat_model': setting.chat_model,
+            'analysis_model': setting.analysis_model,
+            'depression_aspects': setting.depression_aspects.get('aspects', []) if setting.depression_aspects else [],
+            'analysis_scale': setting.analysis_scale.get('scale', []) if setting.analysis_scale else [],
+            'is_default': setting.is_default
+        }
 
     @staticmethod
     def get_settings() -> List[Dict[str, Any]]:
         """Get all LLM settings"""
         with get_session() as db:
             settings = db.query(LLMSettings).filter(LLMSettings.is_active == True).all()
-            return [{
-                'id': setting.id,
-                'instructions': setting.instructions,
-                'llm_instructions': setting.llm_instructions,
-                'openai_api_key': setting.get_masked_api_key(),  # Return masked API key for security
-                'openai_api_key_unmasked': setting.get_api_key(),  # Return unmasked API key for frontend use
-                'chat_model': setting.chat_model,
-                'analysis_model': setting.analysis_model,
-                'depression_aspects': setting.depression_aspects.get('aspects', []) if setting.depression_aspects else [],
-                'analysis_scale': setting.analysis_scale.get('scale', []) if setting.analysis_scale else [],
-                'is_default': setting.is_default
-            } for setting in settings]
+            return [LLMService._serialize_settings(setting) for setting in settings]
+
+    @staticmethod
+    def get_active_settings() -> Optional[Dict[str, Any]]:
+        """
+        First active settings, cached per process (None when nothing is configured).
+
+        The snapshot carries 'settings_version' - changes whenever the settings row changes -
+        so callers can key compiled objects on it. Treat the returned dict as read-only.
+        """
+        snapshot = _active_settings_cache.get('active')
+        if snapshot is not None:
+            return snapshot
+
+        version = _settings_version
+        with get_session() as db:
+            setting = db.query(LLMSettings).filter(LLMSettings.is_active == True).first()
+            if not setting:
+                return None
+            snapshot = LLMService._serialize_settings(setting)
+            snapshot['settings_version'] = f"{version}:{setting.id}:{setting.updated_at}"
+
+        # Don't publish a snapshot read while an invalidation was happening
+        with _settings_version_lock:
+            if version == _settings_version:
+                _active_settings_cache.set('active', snapshot)
+        return snapshot
+
+    @staticmethod
+    def invalidate_settings_cache() -> int:
+        """Bump the settings version and drop this process's snapshot. Returns the new version."""
+        global _settings_version
+        with _settings_version_lock:
+            _settings_version += 1
+            _active_settings_cache.clear()
+            return _settings_version
 
     @staticmethod
     def create_settings(openai_api_key: Optional[str] = None, chat_model: str = "gpt-4.1-mini-2025-04-14", 
@@ -239,6 +288,7 @@ dengan fokus pada aspek-aspek psikologis berikut: {aspects}
                 db.add(settings)
             
             db.commit()
+            LLMService.invalidate_settings_cache()
             
             return {
                 "status": "OLKORECT",
@@ -321,6 +371,7 @@ dengan fokus pada aspek-aspek psikologis berikut: {aspects}
             settings.is_active = aspects_valid and models_valid  # API key not required for is_active
 
             db.commit()
+            LLMService.invalidate_settings_cache()
 
             return {
                 'id': settings.id,
@@ -338,6 +389,7 @@ dengan fokus pada aspek-aspek psikologis berikut: {aspects}
                 raise ValueError(f"LLM settings with ID {settings_id} not found")
 
             db.commit()
+            LLMService.invalidate_settings_cache()
 
             return {'id': settings_id, 'deleted': True}
 
@@ -359,8 +411,15 @@ dengan fokus pada aspek-aspek psikologis berikut: {aspects}
     
     @staticmethod
     def build_langchain_prompt_template(aspects: List[dict], custom_instructions: str = None):
-        """Build LangChain ChatPromptTemplate with 4-part structure"""
+        """
+        Build LangChain ChatPromptTemplate with 4-part structure.
+
+        Everything before the conversation history is literal messages, byte-identical for every
+        user and turn, so provider prompt caching can reuse the prefix. Per-turn data (the user
+        input, then the turn marker from build_turn_context) comes last.
+        """
         try:
+            from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
             from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
         except ImportError:
             raise ImportError("LangChain not installed. Please install langchain-core.")
@@ -378,28 +437,37 @@ dengan fokus pada aspek-aspek psikologis berikut: {aspects}
         # Format instructions with aspects
         formatted_instructions = instructions.format(aspects=aspects_text)
         
-        # Create 3-part ChatPromptTemplate + dynamic conversation
+        # Static prefix as message objects - not re-templated per request, braces in the text are safe
         template = ChatPromptTemplate.from_messages([
-            ("system", LLMService.SYSTEM_PROMPT_FIXED),
-            ("human", formatted_instructions),
-            ("assistant", LLMService.INITIAL_ASSISTANT_RESPONSE),
-            ("human", LLMService.INTIAL_ADMIN_RESPONSE),
-            ("assistant", LLMService.GREETING),
+            SystemMessage(content=LLMService.SYSTEM_PROMPT_FIXED),
+            HumanMessage(content=formatted_instructions),
+            AIMessage(content=LLMService.INITIAL_ASSISTANT_RESPONSE),
+            HumanMessage(content=LLMService.INTIAL_ADMIN_RESPONSE),
+            AIMessage(content=LLMService.GREETING),
             MessagesPlaceholder("conversation_history", optional=True),
-            ("human", "{user_input}")
+            ("human", "{user_input}"),
+            MessagesPlaceholder("turn_context", optional=True)
         ])
         return template
+
+    @staticmethod
+    def build_turn_context(turn_number: int) -> List[Any]:
+        """Turn indicator sent after the user input (stored turns keep the plain message, so replayed history matches)"""
+        from langchain_core.messages import SystemMessage
+        return [SystemMessage(content=f"[Turn: {turn_number}/{LLMService.MAX_CONVERSATION_TURNS}]")]
    
     @staticmethod
     def invoke_langchain_prompt(aspects: List[dict], 
                               custom_instructions: str = None,
                               conversation_history: List = None, 
-                              user_input: str = ""):
+                              user_input: str = "",
+                              turn_number: Optional[int] = None):
         """Invoke the LangChain prompt template with parameters"""
         template = LLMService.build_langchain_prompt_template(aspects, custom_instructions)
         prompt_value = template.invoke({
             "conversation_history": conversation_history or [],
-            "user_input": user_input
+            "user_input": user_input,
+            "turn_context": LLMService.build_turn_context(turn_number) if turn_number else []
         })
         
         return prompt_value
@@ -424,8 +492,7 @@ dengan fokus pada aspek-aspek psikologis berikut: {aspects}
             return []
         
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=api_key)
+            client = get_openai_client(api_key)
             
             # Get all models using OpenAI client
             models_response = client.models.list()
@@ -447,8 +514,7 @@ dengan fokus pada aspek-aspek psikologis berikut: {aspects}
         if not api_key or not api_key.strip():
             return False
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=api_key)
+            client = get_openai_client(api_key)
             models = client.models.list()
             return True
             
@@ -479,8 +545,8 @@ dengan fokus pada aspek-aspek psikologis berikut: {aspects}
                 'messages': [{'role': 'user', 'content': 'test'}],
                 'max_tokens': 1
             }
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions', 
+            response = get_http_client().post(
+                openai_url('chat/completions'), 
                 headers=headers, 
                 json=payload, 
                 timeout=None
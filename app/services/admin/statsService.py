@@ -262,34 +262,42 @@ class StatsService:
         """Get ALL user sessions for bulk export (no pagination)"""
         try:
             with get_session() as db:
+                from sqlalchemy import and_
+
                 # Get regular users only
                 users = db.query(User).join(UserType).filter(UserType.name == 'user').all()
-                
+                regular_user_ids = db.query(User.id).join(UserType).filter(UserType.name == 'user').subquery()
+
+                # Get the LATEST session for each (user, session_number) in one query instead of two per user
+                subquery = db.query(
+                    AssessmentSession.user_id,
+                    AssessmentSession.session_number,
+                    func.max(AssessmentSession.created_at).label('latest_created_at')
+                ).filter(
+                    AssessmentSession.user_id.in_(regular_user_ids)
+                ).group_by(
+                    AssessmentSession.user_id,
+                    AssessmentSession.session_number
+                ).subquery()
+
+                latest_sessions = db.query(AssessmentSession).join(
+                    subquery,
+                    and_(
+                        AssessmentSession.user_id == subquery.c.user_id,
+                        AssessmentSession.session_number == subquery.c.session_number,
+                        AssessmentSession.created_at == subquery.c.latest_created_at
+                    )
+                ).order_by(AssessmentSession.user_id, AssessmentSession.session_number).all()
+
+                sessions_by_user = {}
+                for session in latest_sessions:
+                    sessions_by_user.setdefault(session.user_id, []).append(session)
+
                 completed_users = []  # Both sessions completed
                 incomplete_users = []  # Only session 1 completed
                 
                 for user in users:
-                    # Get the LATEST session for each session_number for this user
-                    from sqlalchemy import and_
-
-                    subquery = db.query(
-                        AssessmentSession.session_number,
-                        func.max(AssessmentSession.created_at).label('latest_created_at')
-                    ).filter(
-                        AssessmentSession.user_id == user.id
-                    ).group_by(
-                        AssessmentSession.session_number
-                    ).subquery()
-
-                    sessions = db.query(AssessmentSession).join(
-                        subquery,
-                        and_(
-                            AssessmentSession.session_number == subquery.c.session_number,
-                            AssessmentSession.created_at == subquery.c.latest_created_at
-                        )
-                    ).filter(
-                        AssessmentSession.user_id == user.id
-                    ).order_by(AssessmentSession.session_number).all()
+                    sessions = sessions_by_user.get(user.id, [])
 
                     # Organize by session_number to get latest attempt for each
                     sessions_by_number = {s.session_number: s for s in sessions}
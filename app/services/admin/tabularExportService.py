@@ -0,0 +1,399 @@
+"""
+Tabular Export Service
+
+Flat research tables streamed straight from the database instead of nested per-session archives:
+1. Each table is a generator of row tuples from a column query with yield_per (server-side
+   cursor on PostgreSQL) - no ORM objects, no per-session loading
+2. JSON columns (PHQ responses, LLM turns, analysis aspects) and the facial JSONL files are
+   exploded into one row per item/turn/aspect/frame while the rows stream
+3. Tables are written as CSV (chunked text) or Parquet (row groups of PARQUET_ROW_GROUP rows,
+   needs pyarrow) members of a streamed ZIP, so memory stays bounded over the whole dataset
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import current_app
+
+from ...db import get_session
+from ...model.assessment.facial_analysis import SessionFacialAnalysis
+from ...model.assessment.sessions import AssessmentSession, PHQResponse, LLMConversation, LLMTurn, LLMAnalysisResult
+from ...model.shared.enums import UserType
+from ...model.shared.users import User
+from ...config import Config
+from .zipStreamService import CHUNK_SIZE, MANIFEST_NAME, ExportEntry, ZipStreamWriter
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'parquet')
+
+# Rows fetched per round trip from the server-side cursor
+YIELD_PER = 1000
+
+# Rows per Parquet row group (the only rows held in memory while writing Parquet)
+PARQUET_ROW_GROUP = 10000
+
+# (column name, type) per table - types map to Parquet: str, int, float, bool, datetime
+Columns = List[Tuple[str, str]]
+
+SESSION_COLUMNS: Columns = [
+    ('session_id', 'str'), ('user_id', 'int'), ('username', 'str'), ('session_number', 'int'),
+    ('session_attempt', 'int'), ('status', 'str'), ('is_first', 'str'), ('created_at', 'datetime'),
+    ('completed_at', 'datetime'), ('consent_completed_at', 'datetime'), ('phq_completed_at', 'datetime'),
+    ('llm_completed_at', 'datetime'), ('camera_completed', 'bool'), ('failure_reason', 'str')
+]
+
+PHQ_ITEM_COLUMNS: Columns = [
+    ('session_id', 'str'), ('user_id', 'int'), ('session_number', 'int'), ('question_id', 'str'),
+    ('question_number', 'int'), ('category_name', 'str'), ('question_text', 'str'), ('response_value', 'int'),
+    ('response_text', 'str'), ('response_time_ms', 'int'), ('timing_start', 'int'), ('timing_end', 'int'),
+    ('timing_duration', 'int')
+]
+
+LLM_TURN_COLUMNS: Columns = [
+    ('session_id', 'str'), ('user_id', 'int'), ('session_number', 'int'), ('turn_number', 'int'),
+    ('created_at', 'str'), ('ai_message', 'str'), ('user_message', 'str'), ('user_message_length', 'int'),
+    ('has_end_conversation', 'bool'), ('ai_model_used', 'str'), ('user_timing_start', 'int'),
+    ('user_timing_end', 'int'), ('user_timing_duration', 'int'), ('ai_timing_start', 'int'),
+    ('ai_timing_end', 'int'), ('ai_timing_duration', 'int')
+]
+
+LLM_ANALYSIS_COLUMNS: Columns = [
+    ('session_id', 'str'), ('user_id', 'int'), ('session_number', 'int'), ('analysis_id', 'str'),
+    ('analysis_model_used', 'str'), ('analyzed_at', 'datetime'), ('aspect', 'str'), ('score', 'float'),
+    ('explanation', 'str')
+]
+
+FACIAL_FRAME_COLUMNS: Columns = [
+    ('session_id', 'str'), ('user_id', 'int'), ('session_number', 'int'), ('assessment_type', 'str'),
+    ('filename', 'str'), ('timestamp', 'str'), ('timing_start', 'int'), ('timing_end', 'int'),
+    ('timing_duration', 'int'), ('facial_expression', 'str'), ('head_yaw', 'float'), ('head_pitch', 'float'),
+    ('head_roll', 'float'), ('inference_time_ms', 'int')
+]
+
+# Long format - the AU set depends on the model, so AUs are rows rather than columns
+FACIAL_AU_COLUMNS: Columns = [
+    ('session_id', 'str'), ('assessment_type', 'str'), ('filename', 'str'), ('action_unit', 'str'),
+    ('active', 'int'), ('intensity', 'float')
+]
+
+
+class TabularExportService:
+    """Streams research tables (CSV/Parquet) from SQL with bounded memory"""
+
+    @staticmethod
+    def _regular_session_ids(db):
+        """Sessions of participant accounts (same population as the all-sessions export)"""
+        return db.query(AssessmentSession.id).join(User, AssessmentSession.user_id == User.id).join(
+            UserType
+        ).filter(UserType.name == 'user').subquery()
+
+    @staticmethod
+    def _timing(timing: Optional[Dict[str, Any]]) -> Tuple[Any, Any, Any]:
+        timing = timing or {}
+        return timing.get('start'), timing.get('end'), timing.get('duration')
+
+    # ----- Row generators (one per table) -----
+
+    @staticmethod
+    def iter_session_rows() -> Iterator[tuple]:
+        with get_session() as db:
+            query = db.query(
+                AssessmentSession.id, AssessmentSession.user_id, User.uname, AssessmentSession.session_number,
+                AssessmentSession.session_attempt, AssessmentSession.status, AssessmentSession.is_first,
+                AssessmentSession.created_at, AssessmentSession.end_time, AssessmentSession.consent_completed_at,
+                AssessmentSession.phq_completed_at, AssessmentSession.llm_completed_at,
+                AssessmentSession.session_metadata, AssessmentSession.failure_reason
+            ).join(User, AssessmentSession.user_id == User.id).filter(
+                AssessmentSession.id.in_(TabularExportService._regular_session_ids(db))
+            ).order_by(AssessmentSession.user_id, AssessmentSession.session_number, AssessmentSession.created_at)
+
+            for row in query.yield_per(YIELD_PER):
+                # camera_completed is derived from session_metadata, like AssessmentSession.camera_completed
+                metadata = row[12] or {}
+                yield (*row[:12], metadata.get('camera_completed_at') is not None, row[13])
+
+    @staticmethod
+    def iter_phq_item_rows() -> Iterator[tuple]:
+        with get_session() as db:
+            query = db.query(
+                PHQResponse.session_id, AssessmentSession.user_id, AssessmentSession.session_number,
+                PHQResponse.responses
+            ).join(AssessmentSession, PHQResponse.session_id == AssessmentSession.id).filter(
+                AssessmentSession.id.in_(TabularExportService._regular_session_ids(db))
+            ).order_by(PHQResponse.session_id)
+
+            for session_id, user_id, session_number, responses in query.yield_per(YIELD_PER):
+                items = sorted((responses or {}).items(), key=lambda item: item[1].get('question_number') or 0)
+                for question_id, response in items:
+                    yield (
+                        session_id, user_id, session_number, question_id, response.get('question_number'),
+                        response.get('category_name'), response.get('question_text'), response.get('response_value'),
+                        response.get('response_text'), response.get('response_time_ms'),
+                        *TabularExportService._timing(response.get('timing'))
+                    )
+
+    @staticmethod
+    def iter_llm_turn_rows() -> Iterator[tuple]:
+        """Turns still in unmigrated JSON documents first, then the llm_turns rows"""
+        with get_session() as db:
+            legacy_query = db.query(
+                LLMConversation.session_id, AssessmentSession.user_id, AssessmentSession.session_number,
+                LLMConversation.stored_history
+            ).join(AssessmentSession, LLMConversation.session_id == AssessmentSession.id).filter(
+                AssessmentSession.id.in_(TabularExportService._regular_session_ids(db))
+            ).order_by(LLMConversation.session_id)
+
+            for session_id, user_id, session_number, history in legacy_query.yield_per(YIELD_PER):
+                for turn in (history or {}).get('turns', []):
+                    yield TabularExportService._llm_turn_row(session_id, user_id, session_number, turn)
+
+        with get_session() as db:
+            rows_query = db.query(
+                LLMTurn.session_id, AssessmentSession.user_id, AssessmentSession.session_number,
+                LLMTurn.turn_number, LLMTurn.created_at, LLMTurn.ai_message, LLMTurn.user_message,
+                LLMTurn.has_end_conversation, LLMTurn.ai_model_used, LLMTurn.user_timing, LLMTurn.ai_timing
+            ).join(AssessmentSession, LLMTurn.session_id == AssessmentSession.id).filter(
+                AssessmentSession.id.in_(TabularExportService._regular_session_ids(db))
+            ).order_by(LLMTurn.session_id, LLMTurn.turn_number)
+
+            for (session_id, user_id, session_number, turn_number, created_at, ai_message, user_message,
+                 has_end, model, user_timing, ai_timing) in rows_query.yield_per(YIELD_PER):
+                yield TabularExportService._llm_turn_row(session_id, user_id, session_number, {
+                    'turn_number': turn_number, 'created_at': created_at.isoformat() if created_at else None,
+                    'ai_message': ai_message,
+                    'user_message': user_message, 'user_message_length': len(user_message or ''),
+                    'has_end_conversation': has_end, 'ai_model_used': model,
+                    'user_timing': user_timing, 'ai_timing': ai_timing
+                })
+
+    @staticmethod
+    def _llm_turn_row(session_id: str, user_id: int, session_number: int, turn: Dict[str, Any]) -> tuple:
+        return (
+            session_id, user_id, session_number, turn.get('turn_number'), turn.get('created_at'),
+            turn.get('ai_message'), turn.get('user_message'), turn.get('user_message_length'),
+            turn.get('has_end_conversation'), turn.get('ai_model_used'),
+            *TabularExportService._timing(turn.get('user_timing')),
+            *TabularExportService._timing(turn.get('ai_timing'))
+        )
+
+    @staticmethod
+    def iter_llm_analysis_rows() -> Iterator[tuple]:
+        with get_session() as db:
+            query = db.query(
+                LLMAnalysisResult.session_id, AssessmentSession.user_id, AssessmentSession.session_number,
+                LLMAnalysisResult.id, LLMAnalysisResult.analysis_model_used, LLMAnalysisResult.created_at,
+                LLMAnalysisResult.aspect_scores
+            ).join(AssessmentSession, LLMAnalysisResult.session_id == AssessmentSession.id).filter(
+                AssessmentSession.id.in_(TabularExportService._regular_session_ids(db))
+            ).order_by(LLMAnalysisResult.session_id, LLMAnalysisResult.created_at)
+
+            for session_id, user_id, session_number, analysis_id, model, created_at, aspects in query.yield_per(YIELD_PER):
+                for aspect, result in (aspects or {}).items():
+                    result = result if isinstance(result, dict) else {'score': result}
+                    yield (
+                        session_id, user_id, session_number, analysis_id, model, created_at, aspect,
+                        result.get('score'), result.get('explanation')
+                    )
+
+    @staticmethod
+    def _iter_facial_results() -> Iterator[Tuple[str, int, int, Dict[str, Any]]]:
+        """(session_id, user_id, session_number, result line) for every analysed frame, one JSONL line at a time"""
+        upload_path = current_app.media_save
+        with get_session() as db:
+            query = db.query(
+                SessionFacialAnalysis.session_id, AssessmentSession.user_id, AssessmentSession.session_number,
+                SessionFacialAnalysis.jsonl_file_path
+            ).join(AssessmentSession, SessionFacialAnalysis.session_id == AssessmentSession.id).filter(
+                AssessmentSession.id.in_(TabularExportService._regular_session_ids(db)),
+                SessionFacialAnalysis.status == 'completed'
+            ).order_by(SessionFacialAnalysis.session_id, SessionFacialAnalysis.assessment_type)
+
+            for session_id, user_id, session_number, jsonl_file_path in query.yield_per(YIELD_PER):
+                jsonl_path = os.path.join(upload_path, jsonl_file_path)
+                try:
+                    jsonl_file = open(jsonl_path, 'r')
+                except OSError as e:
+                    logger.warning(f"Skipping missing facial analysis file {jsonl_path}: {e}")
+                    continue
+                with jsonl_file:
+                    for line in jsonl_file:
+                        if not line.strip():
+                            continue
+                        result = json.loads(line)
+                        if result.get('type') == 'result':
+                            yield session_id, user_id, session_number, result
+
+    @staticmethod
+    def iter_facial_frame_rows() -> Iterator[tuple]:
+        for session_id, user_id, session_number, result in TabularExportService._iter_facial_results():
+            analysis = result.get('analysis') or {}
+            head_pose = analysis.get('head_pose') or {}
+            yield (
+                session_id, user_id, session_number, result.get('assessment_type'), result.get('filename'),
+                result.get('timestamp'), *TabularExportService._timing(result.get('timing')),
+                analysis.get('facial_expression'), head_pose.get('yaw'), head_pose.get('pitch'),
+                head_pose.get('roll'), result.get('inference_time_ms')
+            )
+
+    @staticmethod
+    def iter_facial_au_rows() -> Iterator[tuple]:
+        for session_id, _user_id, _session_number, result in TabularExportService._iter_facial_results():
+            analysis = result.get('analysis') or {}
+            activations = analysis.get('action_units') or {}
+            intensities = analysis.get('au_intensities') or {}
+            for action_unit in sorted(set(activations) | set(intensities)):
+                yield (
+                    session_id, result.get('assessment_type'), result.get('filename'), action_unit,
+                    activations.get(action_unit), intensities.get(action_unit)
+                )
+
+    # table name -> (columns, row generator)
+    TABLES: Dict[str, Tuple[Columns, Callable[[], Iterator[tuple]]]] = {}
+
+    @classmethod
+    def resolve_tables(cls, tables: Optional[Iterable[str]] = None) -> List[str]:
+        """Requested table names in canonical order (all tables when none are given)"""
+        requested = [t.strip() for t in (tables or []) if t and t.strip()]
+        if not requested:
+            return list(cls.TABLES)
+        unknown = [t for t in requested if t not in cls.TABLES]
+        if unknown:
+            raise ValueError(f"Unknown tables: {', '.join(unknown)} (available: {', '.join(cls.TABLES)})")
+        return [t for t in cls.TABLES if t in requested]
+
+    # ----- Writers -----
+
+    @staticmethod
+    def _csv_value(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+
+    @staticmethod
+    def _csv_chunks(columns: Columns, rows: Iterator[tuple]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _type in columns])
+        for row in rows:
+            writer.writerow([TabularExportService._csv_value(value) for value in row])
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def _require_pyarrow():
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError("Parquet export needs pyarrow installed (pip install pyarrow) - use format=csv")
+        return pyarrow, pyarrow.parquet
+
+    @staticmethod
+    def _parquet_chunks(columns: Columns, rows: Iterator[tuple]) -> Iterator[bytes]:
+        """Write row groups to a temp file (Parquet needs its footer last), then stream the file"""
+        pa, pq = TabularExportService._require_pyarrow()
+        arrow_types = {'str': pa.string(), 'int': pa.int64(), 'float': pa.float64(),
+                       'bool': pa.bool_(), 'datetime': pa.timestamp('us')}
+        schema = pa.schema([(name, arrow_types[kind]) for name, kind in columns])
+
+        def cast(value: Any, kind: str) -> Any:
+            if value is None or value == '':
+                return None
+            if kind == 'int':
+                return int(value)
+            if kind == 'float':
+                return float(value)
+            if kind == 'bool':
+                return bool(value)
+            if kind == 'str' and not isinstance(value, str):
+                return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+            return value
+
+        def flush(writer, batch: List[tuple]):
+            arrays = [
+                pa.array([cast(row[index], kind) for row in batch], type=arrow_types[kind])
+                for index, (_name, kind) in enumerate(columns)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+        with tempfile.TemporaryFile() as spool:
+            writer = pq.ParquetWriter(spool, schema, compression='snappy')
+            batch: List[tuple] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= PARQUET_ROW_GROUP:
+                    flush(writer, batch)
+                    batch = []
+            if batch:
+                flush(writer, batch)
+            writer.close()
+
+            spool.seek(0)
+            while True:
+                chunk = spool.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    @classmethod
+    def _table_entries(cls, table_names: List[str], export_format: str) -> Iterator[ExportEntry]:
+        for name in table_names:
+            columns, row_generator = cls.TABLES[name]
+            if export_format == 'parquet':
+                yield ExportEntry(f'{name}.parquet', chunks=cls._parquet_chunks(columns, row_generator()))
+            else:
+                yield ExportEntry(f'{name}.csv', chunks=cls._csv_chunks(columns, row_generator()))
+
+        readme = {
+            'generated_at': datetime.utcnow().isoformat(),
+            'format': export_format,
+            'tables': {name: [column for column, _kind in cls.TABLES[name][0]] for name in table_names}
+        }
+        yield ExportEntry('tables.json', data=json.dumps(readme, indent=2))
+
+    @classmethod
+    def stream_tables(cls, export_format: str = 'csv', tables: Optional[Iterable[str]] = None) -> Iterator[bytes]:
+        """
+        Stream the requested tables as a ZIP of CSV or Parquet files
+
+        Raises ValueError (before any output) for an unknown format/table or missing pyarrow.
+        """
+        if export_format not in FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+        if export_format == 'parquet':
+            cls._require_pyarrow()
+        table_names = cls.resolve_tables(tables)
+        return ZipStreamWriter.stream(
+            cls._table_entries(table_names, export_format),
+            manifest_name=MANIFEST_NAME,
+            manifest_fields={'export_type': 'TABULAR', 'format': export_format},
+            hash_algorithm=Config.EXPORT_MANIFEST_HASH
+        )
+
+    @staticmethod
+    def get_export_filename(export_format: str) -> str:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"research_tables_{export_format}_{timestamp}.zip"
+
+
+TabularExportService.TABLES = {
+    'sessions': (SESSION_COLUMNS, TabularExportService.iter_session_rows),
+    'phq_items': (PHQ_ITEM_COLUMNS, TabularExportService.iter_phq_item_rows),
+    'llm_turns': (LLM_TURN_COLUMNS, TabularExportService.iter_llm_turn_rows),
+    'llm_analysis_aspects': (LLM_ANALYSIS_COLUMNS, TabularExportService.iter_llm_analysis_rows),
+    'facial_frames': (FACIAL_FRAME_COLUMNS, TabularExportService.iter_facial_frame_rows),
+    'facial_action_units': (FACIAL_AU_COLUMNS, TabularExportService.iter_facial_au_rows),
+}
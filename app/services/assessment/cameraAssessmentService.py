@@ -1,11 +1,18 @@
 # app/services/assessment/cameraAssessmentService.py
-from typing import Dict, Any, List
+import json
+import logging
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from flask import request
 from ..camera.cameraCaptureService import CameraCaptureService
 from ..camera.cameraStorageService import CameraStorageService
+from ..camera.frameIngestService import frame_ingest_writer
+from ..camera.frameTranscodeService import frame_transcoder
 from ...db import get_session
 from ...model.assessment.sessions import CameraCapture, PHQResponse, LLMConversation
+from ...utils.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
 
 
 class CameraAssessmentService:
@@ -56,9 +63,10 @@ class CameraAssessmentService:
 
     @staticmethod
     def process_single_upload(session_id: str, request) -> Dict[str, Any]:
-        """Process single image upload - STORE FILE ONLY, NO DB RECORD"""
-        camera_settings = CameraCaptureService.get_camera_settings_for_session(session_id)
-        if not camera_settings:
+        """Process single image upload - row committed, file QUEUED on the background writer"""
+        # Cached per session - avoids the settings/session/user queries on every frame
+        context = CameraStorageService.get_filename_context(session_id)
+        if not context['has_camera_settings']:
             return {"status": "SNAFU", "error": "No camera settings configured"}
         file = request.files.get('image')
         if not file or not file.filename:
@@ -68,32 +76,20 @@ class CameraAssessmentService:
         timing_data = None
         if timing_str:
             try:
-                import json
                 timing_data = json.loads(timing_str)
-            except:
-                pass
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Dropping malformed timing for session {session_id} frame: {e}")
         
         try:
-            # Save file to disk AND incrementally add to database JSON array
-            file_data = file.read()
-            filename = CameraStorageService.save_image_locally(
-                session_id=session_id,
-                file_data=file_data
-            )
-            
-            # INCREMENTAL: Add filename to database JSON array immediately with timing data
-            CameraStorageService.add_filename_to_session_incrementally(
-                session_id=session_id,
-                filename=filename,
-                trigger=trigger,
-                assessment_timing=timing_data
-            )
-            
+            frame = CameraAssessmentService._build_frame(context, file.read(), trigger, timing_data)
+            # Same path as batch frames: row now, file (and any transcode) on the writer thread
+            CameraAssessmentService._accept_frames(session_id, context, [frame])
+
             # Return filename for frontend to track locally
             upload_response = {
                 "status": "OLKORECT",
                 "data": {
-                    "filename": filename,
+                    "filename": frame['filename'],
                     "trigger": trigger,
                     "timestamp": datetime.now().isoformat()
                 }
@@ -105,6 +101,86 @@ class CameraAssessmentService:
         except Exception as e:
             return {"status": "SNAFU", "error": f"Failed to save image: {str(e)}"}
 
+    @staticmethod
+    def _build_frame(context: Dict[str, Any], file_data: bytes, trigger: str,
+                     timing_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Frame dict for add_frames_to_session; the filename already carries the stored file's extension"""
+        extension = frame_transcoder.planned_extension(file_data)
+        return {
+            'filename': CameraStorageService.generate_image_filename(context, extension=extension),
+            'trigger': trigger,
+            'timing': timing_data,
+            'original_size': len(file_data),
+            'captured_at': datetime.now(),
+            'file_data': file_data
+        }
+
+    @staticmethod
+    def _accept_frames(session_id: str, context: Dict[str, Any], frames: List[Dict[str, Any]]) -> bool:
+        """Commit the frames' rows (PENDING), then queue their files; returns False if any was written inline"""
+        # Rows first (one commit): an acknowledged frame is in the DB even if another
+        # worker links the session before this worker's writer has flushed the files
+        CameraStorageService.add_frames_to_session(session_id, frames)
+
+        queued_all = True
+        for frame in frames:
+            queued = frame_ingest_writer.submit(
+                session_id=session_id,
+                storage_path=context['storage_path'],
+                filename=frame['filename'],
+                file_data=frame['file_data']
+            )
+            if not queued:
+                # Writer backlog is full - write this frame on the request thread
+                queued_all = False
+                instrumentation.incr('camera.frames_sync_fallback')
+                frame_ingest_writer.write_now(session_id, context['storage_path'],
+                                              frame['filename'], frame['file_data'])
+        return queued_all
+
+    @staticmethod
+    def process_batch_upload(session_id: str, request) -> Dict[str, Any]:
+        """Accept several frames in one multipart request - QUEUED, written by background writer"""
+        context = CameraStorageService.get_filename_context(session_id)
+        if not context['has_camera_settings']:
+            return {"status": "SNAFU", "error": "No camera settings configured"}
+        files = [f for f in request.files.getlist('images') if f and f.filename]
+        if not files:
+            return {"status": "SNAFU", "error": "No image files provided"}
+        # Per-frame fields are index-aligned with the images list
+        triggers = request.form.getlist('trigger')
+        timings = request.form.getlist('timing')
+
+        try:
+            frames = []
+            for index, file in enumerate(files):
+                trigger = triggers[index] if index < len(triggers) and triggers[index] else 'unknown'
+                timing_data = None
+                if index < len(timings) and timings[index]:
+                    try:
+                        timing_data = json.loads(timings[index])
+                    except (ValueError, TypeError) as e:
+                        logger.warning(f"Dropping malformed timing for session {session_id} frame {index}: {e}")
+
+                frames.append(CameraAssessmentService._build_frame(context, file.read(), trigger, timing_data))
+
+            queued_all = CameraAssessmentService._accept_frames(session_id, context, frames)
+            accepted = [{"filename": frame['filename'], "trigger": frame['trigger']} for frame in frames]
+
+            instrumentation.incr('camera.frames_accepted', len(accepted))
+            return {
+                "status": "OLKORECT",
+                "data": {
+                    "accepted": len(accepted),
+                    "frames": accepted,
+                    "queued": queued_all,
+                    "timestamp": datetime.now().isoformat()
+                }
+            }
+
+        except Exception as e:
+            return {"status": "SNAFU", "error": f"Failed to accept images: {str(e)}"}
+
     @staticmethod
     def validate_assessment_access(assessment_id: str, user_id: str) -> bool:
         """Validate that assessment belongs to current user via session"""
@@ -149,8 +225,6 @@ class CameraAssessmentService:
             if not session_id:
                 raise ValueError(f"Assessment {assessment_id} not found or invalid type {capture_type}")
 
-            # DEBUG: Log what we're passing to storage service
-            print(f"   filenames: {filenames} (type: {type(filenames)}, length: {len(filenames)})")
             capture_record = CameraStorageService.create_batch_capture_with_assessment_id(
                 session_id=session_id,
                 assessment_id=assessment_id,
@@ -158,11 +232,6 @@ class CameraAssessmentService:
                 capture_type=capture_type,
                 capture_metadata=capture_metadata
             )
-            
-            # DEBUG: Log what we got back from database
-            print(f" AFTER DB SAVE:")
-            print(f"   capture_record.id: {capture_record.id}")
-            print(f"   capture_record.assessment_id: {capture_record.assessment_id}")
             return {
                 "status": "OLKORECT",
                 "data": {
@@ -175,7 +244,7 @@ class CameraAssessmentService:
             }
             
         except Exception as e:
-            print(f"Error creating batch capture with assessment_id: {e}")
+            logger.error(f"Error creating batch capture with assessment_id: {e}")
             return {"status": "SNAFU", "error": str(e)}
 
     @staticmethod
@@ -193,22 +262,34 @@ class CameraAssessmentService:
             )
             
             if capture_record:
-                return {
-                    "status": "OLKORECT",
-                    "data": {
-                        "capture_id": capture_record.id,
-                        "assessment_id": capture_record.assessment_id,
-                        "filenames_count": len(capture_record.filenames),
-                        "capture_type": capture_record.capture_type
-                    }
+                # File state is in the DB, so this is right whichever worker's writer holds the frames;
+                # pending frames join filenames (and exports/facial analysis) once the writer marks them
+                frame_counts = CameraStorageService.count_frames_by_status(capture_record.id)
+                frames_pending = frame_counts.get('PENDING', 0)
+                frames_failed = frame_counts.get('FAILED', 0)
+                data = {
+                    "capture_id": capture_record.id,
+                    "assessment_id": capture_record.assessment_id,
+                    "filenames_count": len(capture_record.filenames),
+                    "capture_type": capture_record.capture_type,
+                    "files_pending": frames_pending > 0,
+                    "frames_pending": frames_pending,
+                    "frames_failed": frames_failed
                 }
+                if frames_failed:
+                    return {
+                        "status": "SNAFU",
+                        "error": f"Captures linked, but {frames_failed} frames could not be written",
+                        "data": data
+                    }
+                return {"status": "OLKORECT", "data": data}
             else:
                 return {
                     "status": "SNAFU",
                     "error": "No unlinked captures found for session"
                 }
         except Exception as e:
-            print(f"Error linking captures: {e}")
+            logger.error(f"Error linking captures: {e}")
             return {"status": "SNAFU", "error": str(e)}
 
     @staticmethod
@@ -236,8 +317,6 @@ class CameraAssessmentService:
                     "created_at": capture_record.created_at.isoformat()
                 }
             }
-            
-            print(f" BACKEND RESPONSE: {response_data}")
             return response_data
             
         except Exception as e:
@@ -262,18 +341,6 @@ class CameraAssessmentService:
                 if not assessment_record:
                     return {"status": "SNAFU", "error": f"No {assessment_type} record found for session {session_id}"}
                 
-                # Debug: Log what we're looking for
-                print(f" Auto-link debug - session_id: {session_id}, assessment_type: {assessment_type}")
-                print(f" Auto-link debug - assessment record ID: {assessment_record.id}")
-                
-                # Find ALL captures for this session first (for debugging)
-                all_session_captures = db.query(CameraCapture).filter(
-                    CameraCapture.session_id == session_id
-                ).all()
-                print(f" Auto-link debug - Total captures for session: {len(all_session_captures)}")
-                for capture in all_session_captures:
-                    print(f"  - Capture {capture.id}: type={capture.capture_type}, assessment_id={capture.assessment_id}")
-                
                 # Find unlinked captures for this session and assessment type
                 unlinked_captures = db.query(CameraCapture).filter(
                     CameraCapture.session_id == session_id,
@@ -281,17 +348,16 @@ class CameraAssessmentService:
                     CameraCapture.assessment_id.is_(None)
                 ).all()
                 
-                print(f" Auto-link debug - Unlinked {assessment_type} captures found: {len(unlinked_captures)}")
-                
                 linked_count = 0
                 for capture in unlinked_captures:
-                    print(f"   Linking capture {capture.id} to assessment {assessment_record.id}")
                     capture.assessment_id = assessment_record.id
                     linked_count += 1
                 
                 db.commit()
-                
-                print(f" Auto-linking completed - linked {linked_count} captures")
+
+                instrumentation.incr('camera.captures_auto_linked', linked_count)
+                instrumentation.debug(logger, "Auto-linked %d %s captures for session %s to assessment %s",
+                                      linked_count, assessment_type, session_id, assessment_record.id)
                 
                 return {
                     "status": "OLKORECT",
@@ -304,7 +370,7 @@ class CameraAssessmentService:
                 }
                 
         except Exception as e:
-            print(f" Auto-linking failed: {str(e)}")
+            logger.error(f"Auto-linking failed for session {session_id}: {str(e)}")
             return {"status": "SNAFU", "error": f"Failed to auto-link captures: {str(e)}"}
 
     @staticmethod
@@ -326,7 +392,7 @@ class CameraAssessmentService:
                         db.delete(capture)
                     
                     db.commit()
-                    print(f" Cleaned up {cleaned_count} unlinked camera captures from session {session_id}")
+                    logger.info(f"Cleaned up {cleaned_count} unlinked camera captures from session {session_id}")
                 
                 return {
                     "status": "OLKORECT",
@@ -1,13 +1,13 @@
 # app/services/assessment/llmService.py
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import re
-import requests
 import asyncio
 from datetime import datetime, timezone
-from ...model.assessment.sessions import AssessmentSession, LLMConversation, LLMAnalysisResult
+from ...model.assessment.sessions import AssessmentSession, LLMConversation, LLMTurn, LLMAnalysisResult
 from ...db import get_session
 from ...services.admin.llmService import LLMService as AdminLLMService
 from ...services.llm.analysisPromptBuilder import LLMAnalysisPromptBuilder
+from ...services.llm.openaiClient import get_http_client, openai_url
 from ..session.sessionTimingService import SessionTimingService
 
 
@@ -58,8 +58,8 @@ class LLMConversationService:
         transcription: Optional[str] = None,
         user_timing: Optional[Dict[str, Any]] = None,
         ai_timing: Optional[Dict[str, Any]] = None
-    ) -> LLMConversation:
-        """Create or update conversation turn with clean timing metadata from frontend"""
+    ) -> LLMTurn:
+        """Create or update conversation turn (one llm_turns row) with clean timing metadata from frontend"""
         with get_session() as db:
             # Get session and start LLM assessment timing if needed
             session = db.query(AssessmentSession).filter_by(id=session_id).first()
@@ -71,13 +71,15 @@ class LLMConversationService:
                 SessionTimingService.start_llm_assessment(session_id)
             
             # Get existing LLM conversation record for this session or create new one
-            conversation_record = db.query(LLMConversation).filter_by(session_id=session_id).first()
-            if not conversation_record:
+            conversation_id = db.query(LLMConversation.id).filter_by(session_id=session_id).scalar()
+            if not conversation_id:
                 conversation_record = LLMConversation(
                     session_id=session_id,
                     conversation_history={"turns": []}
                 )
                 db.add(conversation_record)
+                db.flush()
+                conversation_id = conversation_record.id
 
             # Create turn data with more robust end conversation detection
             normalized_ai_message = ai_message.lower().strip()
@@ -86,56 +88,76 @@ class LLMConversationService:
                 "<end_conversation>" in normalized_ai_message or 
                 "\u003c/end_conversation\u003e" in normalized_ai_message
             )
-            
-            turn_data = {
-                "turn_number": turn_number,
-                "user_message": user_message,
-                "ai_message": ai_message,
-                "has_end_conversation": has_end_conversation,
-                "user_message_length": len(user_message),
-                "ai_model_used": ai_model_used,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            
-            # Add separate timing metadata for user and AI actions
-            if user_timing:
-                turn_data['user_timing'] = user_timing
-            if ai_timing:
-                turn_data['ai_timing'] = ai_timing
 
-            turns = conversation_record.conversation_history.get("turns", [])
-            turn_exists = False
-            for i, existing_turn in enumerate(turns):
-                if existing_turn.get("turn_number") == turn_number:
-                    turns[i] = turn_data
-                    turn_exists = True
-                    break
-            
-            if not turn_exists:
-                turns.append(turn_data)
-            
-            # Sort turns by turn number
-            turns.sort(key=lambda x: x.get("turn_number", 0))
-            
-            # Create completely new JSON object to force SQLAlchemy to detect change
-            conversation_record.conversation_history = {
-                "turns": turns,
-                "total_turns": len(turns),
-                "last_updated": datetime.utcnow().isoformat()
-            }
+            # Append a row - only a resent turn number touches an existing one
+            turn = db.query(LLMTurn).filter_by(session_id=session_id, turn_number=turn_number).first()
+            if not turn:
+                turn = LLMTurn(conversation_id=conversation_id, session_id=session_id, turn_number=turn_number)
+                db.add(turn)
+            turn.user_message = user_message
+            turn.ai_message = ai_message
+            turn.has_end_conversation = has_end_conversation
+            turn.ai_model_used = ai_model_used
+            turn.user_timing = user_timing or None
+            turn.ai_timing = ai_timing or None
+            turn.response_audio_path = response_audio_path
+            turn.transcription = transcription
+            turn.created_at = datetime.utcnow()
+
+            # Export caches and change feeds key on the conversation's updated_at
+            db.query(LLMConversation).filter_by(id=conversation_id).update(
+                {'updated_at': datetime.utcnow()}, synchronize_session=False
+            )
 
             db.commit()
-            return conversation_record
+            return turn
     
     @staticmethod
     def get_session_conversations(session_id: str) -> List[Dict[str, Any]]:
-        """Get all conversation turns for a session from single JSON record"""
+        """Get all conversation turns for a session (llm_turns rows plus any unmigrated JSON turns)"""
         with get_session() as db:
-            conversation_record = db.query(LLMConversation).filter_by(session_id=session_id).first()
-            if not conversation_record:
-                return []
-            
-            return conversation_record.conversation_history.get("turns", [])
+            return LLMConversationService._load_turns(db, session_id)
+
+    @staticmethod
+    def get_session_context(session_id: str) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """(turns, rolling context summary or None) for the chat history"""
+        with get_session() as db:
+            return LLMConversationService._load_context(db, session_id)
+
+    @staticmethod
+    def _load_turns(db, session_id: str) -> List[Dict[str, Any]]:
+        return LLMConversationService._load_context(db, session_id)[0]
+
+    @staticmethod
+    def _load_context(db, session_id: str) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        conversation = db.query(LLMConversation.stored_history, LLMConversation.context_summary).filter(
+            LLMConversation.session_id == session_id
+        ).first()
+        legacy_history, summary = conversation if conversation else (None, None)
+        rows = db.query(LLMTurn).filter(LLMTurn.session_id == session_id).order_by(LLMTurn.turn_number).all()
+        return LLMConversation.merge_turns((legacy_history or {}).get('turns', []), rows), summary
+
+    @staticmethod
+    def save_context_summary(session_id: str, summary: Optional[Dict[str, Any]]) -> None:
+        """Store the rolling context summary (only that column is written)"""
+        with get_session() as db:
+            # Keep updated_at as it is: the summary is derived state, and bumping it would
+            # invalidate the session's cached export archive and re-send it in delta exports
+            db.query(LLMConversation).filter(LLMConversation.session_id == session_id).update(
+                {'context_summary': summary, 'updated_at': LLMConversation.updated_at}, synchronize_session=False
+            )
+            db.commit()
+
+    @staticmethod
+    def clear_conversation_turns(session_id: str) -> None:
+        """Delete every turn of a session's conversation (rows and legacy JSON)"""
+        with get_session() as db:
+            db.query(LLMTurn).filter(LLMTurn.session_id == session_id).delete(synchronize_session=False)
+            conversation_record = db.query(LLMConversation).enable_eagerloads(False).filter_by(session_id=session_id).first()
+            if conversation_record:
+                conversation_record.conversation_history = {"turns": []}
+                conversation_record.context_summary = None
+            db.commit()
     
     @staticmethod
     def get_conversation_by_id(session_id: str) -> Optional[LLMConversation]:
@@ -145,66 +167,54 @@ class LLMConversationService:
     
     @staticmethod
     def update_conversation_turn(session_id: str, turn_number: int, updates: Dict[str, Any]) -> LLMConversation:
-        """Update a conversation turn in the single JSON record"""
+        """Update a conversation turn (llm_turns row, or the legacy JSON entry for unmigrated conversations)"""
         with get_session() as db:
             conversation_record = db.query(LLMConversation).filter_by(session_id=session_id).first()
             if not conversation_record:
                 raise ValueError(f"Conversation record for session {session_id} not found")
             
-            turns = conversation_record.conversation_history.get("turns", [])
-            
-            # Find the turn to update
-            turn_found = False
-            for i, turn in enumerate(turns):
-                if turn.get("turn_number") == turn_number:
-                    # Update the turn data
-                    turns[i].update(updates)
-                    
-                    # Update computed fields if relevant fields changed
-                    if 'user_message' in updates:
-                        turns[i]["user_message_length"] = len(updates['user_message'])
-                    
-                    if 'ai_message' in updates:
-                        turns[i]["has_end_conversation"] = "</end_conversation>" in updates['ai_message'].lower()
-                    
-                    turn_found = True
-                    break
-            
-            if not turn_found:
-                raise ValueError(f"Conversation turn {turn_number} not found for session {session_id}")
-            
-            # Update conversation history
-            conversation_record.conversation_history["turns"] = turns
-            # Note: Model doesn't have updated_at field
-            
+            turn = next((row for row in conversation_record.turn_rows if row.turn_number == turn_number), None)
+            if turn:
+                for key in ('ai_message', 'user_message', 'response_audio_path', 'transcription'):
+                    if key in updates:
+                        setattr(turn, key, updates[key])
+                if 'ai_message' in updates:
+                    turn.has_end_conversation = "</end_conversation>" in updates['ai_message'].lower()
+            else:
+                turns = [dict(t) for t in (conversation_record.stored_history or {}).get("turns", [])]
+                legacy_turn = next((t for t in turns if t.get("turn_number") == turn_number), None)
+                if legacy_turn is None:
+                    raise ValueError(f"Conversation turn {turn_number} not found for session {session_id}")
+                
+                legacy_turn.update(updates)
+                # Update computed fields if relevant fields changed
+                if 'user_message' in updates:
+                    legacy_turn["user_message_length"] = len(updates['user_message'])
+                if 'ai_message' in updates:
+                    legacy_turn["has_end_conversation"] = "</end_conversation>" in updates['ai_message'].lower()
+                conversation_record.conversation_history = {**(conversation_record.stored_history or {}), "turns": turns}
+            
+            conversation_record.updated_at = datetime.utcnow()
             db.commit()
             return conversation_record
     
     @staticmethod
     def delete_conversation_turn(session_id: str, turn_number: int) -> bool:
-        """Delete a conversation turn from the single JSON record"""
+        """Delete a conversation turn (llm_turns row, or the legacy JSON entry for unmigrated conversations)"""
         with get_session() as db:
-            conversation_record = db.query(LLMConversation).filter_by(session_id=session_id).first()
+            conversation_record = db.query(LLMConversation).enable_eagerloads(False).filter_by(session_id=session_id).first()
             if not conversation_record:
                 raise ValueError(f"Conversation record for session {session_id} not found")
             
-            turns = conversation_record.conversation_history.get("turns", [])
-            
-            # Find and remove the turn
-            turn_found = False
-            for i, turn in enumerate(turns):
-                if turn.get("turn_number") == turn_number:
-                    turns.pop(i)
-                    turn_found = True
-                    break
-            
-            if not turn_found:
-                raise ValueError(f"Conversation turn {turn_number} not found for session {session_id}")
-            
-            # Update conversation history
-            conversation_record.conversation_history["turns"] = turns
-            # Note: Model doesn't have updated_at field
+            deleted = db.query(LLMTurn).filter_by(session_id=session_id, turn_number=turn_number).delete(synchronize_session=False)
+            if not deleted:
+                turns = (conversation_record.stored_history or {}).get("turns", [])
+                remaining = [t for t in turns if t.get("turn_number") != turn_number]
+                if len(remaining) == len(turns):
+                    raise ValueError(f"Conversation turn {turn_number} not found for session {session_id}")
+                conversation_record.conversation_history = {**(conversation_record.stored_history or {}), "turns": remaining}
             
+            conversation_record.updated_at = datetime.utcnow()
             db.commit()
             return True
     
@@ -336,8 +346,8 @@ class LLMConversationService:
         }
         
         try:
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
+            response = get_http_client().post(
+                openai_url('chat/completions'),
                 headers=headers,
                 json=payload,
                 timeout=30
@@ -398,17 +408,16 @@ class LLMConversationService:
     def check_conversation_complete(session_id: str) -> bool:
         """Check if conversation has ended (contains </end_conversation>)"""
         with get_session() as db:
-            conversation_record = db.query(LLMConversation).filter_by(session_id=session_id).first()
-            if not conversation_record:
-                return False
-            
-            turns = conversation_record.conversation_history.get("turns", [])
-            for i, turn in enumerate(turns):
-                has_end = turn.get("has_end_conversation", False)
-                ai_msg = turn.get("ai_message", "")
-                if has_end:
-                    return True
-            return False
+            ended = db.query(LLMTurn.id).filter(
+                LLMTurn.session_id == session_id, LLMTurn.has_end_conversation == True
+            ).first()
+            if ended:
+                return True
+            
+            legacy_history = db.query(LLMConversation.stored_history).filter(
+                LLMConversation.session_id == session_id
+            ).scalar()
+            return any(turn.get("has_end_conversation", False) for turn in (legacy_history or {}).get("turns", []))
     
     @staticmethod
     def get_conversation_summary(session_id: str) -> Dict[str, Any]:
@@ -463,8 +472,10 @@ class LLMConversationService:
             
             reset_count = 0
             if conversation_record:
-                # REUSE: Keep record, reset content only
+                # REUSE: Keep record, reset content only - turns live in llm_turns, the JSON is legacy
+                db.query(LLMTurn).filter(LLMTurn.session_id == session_id).delete(synchronize_session=False)
                 conversation_record.conversation_history = {"turns": []}
+                conversation_record.context_summary = None
                 conversation_record.updated_at = datetime.now(timezone.utc)
                 reset_count += 1
                 
@@ -491,7 +502,7 @@ class LLMConversationService:
         transcription: Optional[str] = None,
         user_timing: Optional[Dict[str, Any]] = None,
         ai_timing: Optional[Dict[str, Any]] = None
-    ) -> LLMConversation:
+    ) -> LLMTurn:
         """Async wrapper for create_conversation_turn - non-blocking conversation saves"""
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(
@@ -1,4 +1,5 @@
 # app/services/camera/cameraCaptureService.py
+import logging
 import os
 import uuid
 from datetime import datetime
@@ -8,6 +9,9 @@ from ...db import get_session
 from ...model.assessment.sessions import CameraCapture, AssessmentSession
 from ...model.admin.camera import CameraSettings
 from ..session.sessionTimingService import SessionTimingService
+from .capturePathService import CapturePathService
+
+logger = logging.getLogger(__name__)
 
 class CameraCaptureService:
     """Service for handling camera capture operations with settings integration"""
@@ -25,15 +29,11 @@ class CameraCaptureService:
         return upload_path
 
     @staticmethod
-    def delete_capture_file(filename: str) -> bool:
+    def delete_capture_file(filename: str, session_id: Optional[str] = None) -> bool:
         """Delete camera capture file from disk"""
         try:
             upload_path = CameraCaptureService.get_upload_path()
-            file_path = os.path.join(upload_path, filename)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                return True
-            return False
+            return CapturePathService.remove(upload_path, session_id, filename)
         except Exception as e:
             return False
 
@@ -81,7 +81,8 @@ class CameraCaptureService:
         target_id = assessment_id or session_id
         
         filename = CameraCaptureService.generate_filename(timestamp, assessment_type, target_id, username, session_number)
-        full_path = os.path.join(upload_path, filename)
+        full_path = CapturePathService.get_write_path(upload_path, session_id, filename)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
         
         # Save file to disk
         with open(full_path, 'wb') as f:
@@ -134,7 +135,7 @@ class CameraCaptureService:
                 capture_data = {
                     'id': capture.id,
                     'filename': capture.filenames[0] if capture.filenames else '',  # Take first filename for backward compatibility
-                    'full_path': os.path.join(upload_path, capture.filenames[0]) if capture.filenames else '',
+                    'full_path': CapturePathService.resolve(upload_path, session_id, capture.filenames[0]) if capture.filenames else '',
                     'url': f"/assessment/camera/file/{capture.filenames[0]}" if capture.filenames else '',
                     'timestamp': capture.created_at,
                     'capture_type': capture.capture_type.lower(),
@@ -237,12 +238,10 @@ class CameraCaptureService:
             for capture in old_captures:
                 # Delete physical files with error handling (new model uses JSON array)
                 for filename in capture.filenames:
-                    file_path = os.path.join(upload_path, filename)
                     try:
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
+                        CapturePathService.remove(upload_path, capture.session_id, filename)
                     except Exception as e:
-                        print(f"Failed to delete camera capture file {filename}: {e}")
+                        logger.warning(f"Failed to delete camera capture file {filename}: {e}")
                 db.delete(capture)
             db.commit()
             return len(old_captures)
@@ -261,13 +260,11 @@ class CameraCaptureService:
             for capture in session_captures:
                 # Delete physical files with error handling (new model uses JSON array)
                 for filename in capture.filenames:
-                    file_path = os.path.join(upload_path, filename)
                     try:
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
+                        if CapturePathService.remove(upload_path, capture.session_id, filename):
                             deleted_count += 1
                     except Exception as e:
-                        print(f"Failed to delete camera capture file {filename}: {e}")
+                        logger.warning(f"Failed to delete camera capture file {filename}: {e}")
                 
                 # DB record will be auto-deleted by CASCADE foreign key
             
@@ -287,12 +284,10 @@ class CameraCaptureService:
             for capture in phq_captures:
                 # Delete physical files with error handling (new model uses JSON array)
                 for filename in capture.filenames:
-                    file_path = os.path.join(upload_path, filename)
                     try:
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
+                        CapturePathService.remove(upload_path, capture.session_id, filename)
                     except Exception as e:
-                        print(f"Failed to delete camera capture file {filename}: {e}")
+                        logger.warning(f"Failed to delete camera capture file {filename}: {e}")
             
             return len(phq_captures)
 
@@ -310,12 +305,10 @@ class CameraCaptureService:
             for capture in llm_captures:
                 # Delete physical files with error handling (new model uses JSON array)
                 for filename in capture.filenames:
-                    file_path = os.path.join(upload_path, filename)
                     try:
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
+                        CapturePathService.remove(upload_path, capture.session_id, filename)
                     except Exception as e:
-                        print(f"Failed to delete camera capture file {filename}: {e}")
+                        logger.warning(f"Failed to delete camera capture file {filename}: {e}")
             
             return len(llm_captures)
 
@@ -1,10 +1,26 @@
+import logging
 import os
 import uuid
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Dict, Any
 from flask import current_app
+from sqlalchemy import func
 from ...db import get_session
-from ...model.assessment.sessions import CameraCapture
+from ...model.assessment.sessions import CameraCapture, CaptureFrame
+from ...utils.instrumentation import instrumentation
+from ...utils.ttl_cache import TTLCache
+from .capturePathService import CapturePathService
+from .frameTranscodeService import source_extension
+
+logger = logging.getLogger(__name__)
+
+# Per-session storage path + filename parts, so frame uploads skip the settings/session/user queries.
+# Cleared by CameraService on settings changes; the TTL bounds staleness in other worker processes.
+_filename_context_cache = TTLCache(maxsize=2048, ttl=300)
+
+# A frame still PENDING this long after its row was committed lost its writer (worker restart)
+STALE_FRAME_MINUTES = 10
 
 
 class CameraStorageService:
@@ -28,45 +44,76 @@ class CameraStorageService:
         return settings.storage_path if settings else None
 
     @staticmethod
-    def save_image_locally(
-        session_id: str, 
-        file_data: bytes, 
-        timestamp: Optional[str] = None
-    ) -> str:
-        """Save image file locally and return filename - NO DATABASE WRITES"""
-        
+    def get_filename_context(session_id: str) -> Dict[str, Any]:
+        """Storage path and filename parts (clean username, session number) for a session - cached per session"""
+        context = _filename_context_cache.get(session_id)
+        if context is not None:
+            return context
+
         # Get storage path from camera settings
-        storage_path = CameraStorageService.get_storage_path_for_session(session_id)
+        from ..camera.cameraCaptureService import CameraCaptureService
+        settings = CameraCaptureService.get_camera_settings_for_session(session_id)
+        storage_path = settings.storage_path if settings else None
         if not storage_path:
             # Fallback to current_app.media_save if no settings found
             storage_path = current_app.media_save
-        
-        # Ensure directory exists
-        os.makedirs(storage_path, exist_ok=True)
-        
+
         # Get session info for filename
-        username = None
+        clean_username = None
         session_number = None
         with get_session() as db:
             from ...model.assessment.sessions import AssessmentSession
             session = db.query(AssessmentSession).filter_by(id=session_id).first()
             if session and session.user:
-                username = session.user.uname
+                # Clean username (remove spaces, special chars)
+                clean_username = "".join(c for c in session.user.uname if c.isalnum() or c in ('_', '-')).lower()
                 session_number = session.session_number
-        
-        # Generate filename with username and session info
+
+        context = {
+            'storage_path': storage_path,
+            'clean_username': clean_username,
+            'session_number': session_number,
+            'has_camera_settings': settings is not None
+        }
+        _filename_context_cache.set(session_id, context)
+        return context
+
+    @staticmethod
+    def invalidate_filename_context(session_id: Optional[str] = None) -> None:
+        """Drop cached filename context for one session, or all sessions (camera settings changed)"""
+        if session_id:
+            _filename_context_cache.invalidate(session_id)
+        else:
+            _filename_context_cache.clear()
+
+    @staticmethod
+    def generate_image_filename(context: Dict[str, Any], timestamp: Optional[str] = None,
+                                extension: str = '.jpg') -> str:
+        """Generate {user}_s{n}_{timestamp}_{uuid}{extension} from a get_filename_context() result"""
         if not timestamp:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]
         short_uuid = uuid.uuid4().hex[:8]
-        
-        if username and session_number:
-            # Clean username (remove spaces, special chars)
-            clean_username = "".join(c for c in username if c.isalnum() or c in ('_', '-')).lower()
-            filename = f"{clean_username}_s{session_number}_{timestamp}_{short_uuid}.jpg"
-        else:
-            # Fallback to old format
-            filename = f"{uuid.uuid4().hex}_{timestamp}.jpg"
-        file_path = os.path.join(storage_path, filename)
+
+        if context['clean_username'] is not None and context['session_number']:
+            return f"{context['clean_username']}_s{context['session_number']}_{timestamp}_{short_uuid}{extension}"
+        # Fallback to old format
+        return f"{uuid.uuid4().hex}_{timestamp}{extension}"
+
+    @staticmethod
+    def save_image_locally(
+        session_id: str, 
+        file_data: bytes, 
+        timestamp: Optional[str] = None
+    ) -> str:
+        """Save image file locally as uploaded (no transcoding) and return filename - NO DATABASE WRITES"""
+        context = CameraStorageService.get_filename_context(session_id)
+        storage_path = context['storage_path']
+
+        filename = CameraStorageService.generate_image_filename(context, timestamp, source_extension(file_data))
+        file_path = CapturePathService.get_write_path(storage_path, session_id, filename)
+
+        # Ensure session shard directory exists
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
         
         # Save file
         with open(file_path, 'wb') as f:
@@ -79,109 +126,117 @@ class CameraStorageService:
         session_id: str,
         filename: str,
         trigger: str,
-        assessment_timing: Optional[Dict[str, int]] = None
-    ) -> CameraCapture:
-        """Add filename to existing session capture record JSON array, or create new one"""
-        # print(f"INCREMENTAL DEBUG - Called with session_id: {session_id}, filename: {filename}, trigger: {trigger}")
-        
+        assessment_timing: Optional[Dict[str, int]] = None,
+        original_size: Optional[int] = None
+    ) -> CaptureFrame:
+        """Append one capture_frames row to the session's unlinked capture (created on first frame)"""
+        return CameraStorageService.add_frames_to_session(session_id, [{
+            'filename': filename,
+            'trigger': trigger,
+            'timing': assessment_timing,
+            'original_size': original_size,
+            'file_status': 'WRITTEN'  # save_image_locally already wrote it
+        }])[0]
+
+    @staticmethod
+    def add_frames_to_session(session_id: str, frames: List[Dict[str, Any]]) -> List[CaptureFrame]:
+        """Append capture_frames rows (filename, trigger, timing, original_size, captured_at) in a single commit
+
+        Rows start PENDING (file queued on the ingest writer) unless a frame says otherwise.
+        """
         with get_session() as db:
-            # Find existing capture record for this session (without assessment_id yet)
-            capture = db.query(CameraCapture).filter_by(
+            # Only fetch the id - loading the capture entity would pull every frame so far
+            capture_id = db.query(CameraCapture.id).filter_by(
                 session_id=session_id,
                 assessment_id=None  # Unlinked captures
-            ).first()
-            
-            # print(f"INCREMENTAL DEBUG - Found existing unlinked capture: {capture.id if capture else 'None'}")
-            
-            # Get current timestamp for this specific capture
+            ).scalar()
+
             current_time = datetime.now()
-            timestamp_iso = current_time.isoformat()
-            
-            if not capture:
-                # Create new capture record with first filename
-                capture_entry = {
-                    'filename': filename, 
-                    'trigger': trigger, 
-                    'timestamp': timestamp_iso
-                }
-                
-                # Add assessment timing if provided
-                if assessment_timing:
-                    capture_entry['timing'] = assessment_timing
-                
+
+            if not capture_id:
+                # Header record only - per-image data lives in capture_frames
+                started_at = min((frame.get('captured_at') or current_time) for frame in frames)
                 capture = CameraCapture(
                     session_id=session_id,
                     assessment_id=None,  # Will be linked later
-                    filenames=[filename],  # JSON array with first file
+                    filenames=[],
                     capture_type='UNKNOWN',  # Will be set when linked
-                    capture_metadata={
-                        'triggers': [{'trigger': trigger, 'timestamp': timestamp_iso}],
-                        'capture_count': 1,
-                        'started_at': timestamp_iso,
-                        'last_updated': timestamp_iso,
-                        'capture_history': [capture_entry]
-                    },
-                    created_at=current_time
+                    capture_metadata={'started_at': started_at.isoformat()},
+                    created_at=started_at
                 )
                 db.add(capture)
-                # print(f"INCREMENTAL DEBUG - Creating new capture record with filename: {filename} at {timestamp_iso}")
-            else:
-                # Append to existing JSON array with proper timing
-                current_filenames = capture.filenames or []
-                # print(f"INCREMENTAL DEBUG - Current filenames before append: {current_filenames}")
-                current_filenames.append(filename)
-                capture.filenames = current_filenames
-                
-                # Update metadata with proper timestamps
-                current_metadata = capture.capture_metadata or {}
-                
-                # Add trigger with timestamp
-                triggers = current_metadata.get('triggers', [])
-                triggers.append({'trigger': trigger, 'timestamp': timestamp_iso})
-                
-                # Add to capture history
-                capture_history = current_metadata.get('capture_history', [])
-                capture_entry = {
-                    'filename': filename, 
-                    'trigger': trigger, 
-                    'timestamp': timestamp_iso
-                }
-                
-                # Add assessment timing if provided
-                if assessment_timing:
-                    capture_entry['timing'] = assessment_timing
-                    
-                capture_history.append(capture_entry)
-                
-                # Update metadata
-                capture.capture_metadata = {
-                    **current_metadata,
-                    'triggers': triggers,
-                    'capture_count': len(current_filenames),
-                    'last_updated': timestamp_iso,
-                    'capture_history': capture_history,
-                    'total_duration_seconds': (current_time - datetime.fromisoformat(current_metadata.get('started_at', timestamp_iso))).total_seconds()
-                }
-                
-                # Force SQLAlchemy to detect JSON column changes
-                from sqlalchemy.orm.attributes import flag_modified
-                flag_modified(capture, 'filenames')
-                flag_modified(capture, 'capture_metadata')
-                
-                # print(f"INCREMENTAL DEBUG - After append, filenames: {current_filenames}")
-                # print(f"INCREMENTAL DEBUG - Total files now: {len(current_filenames)}")
-                # print(f"INCREMENTAL DEBUG - Updated at: {timestamp_iso}")
-            
+                db.flush()
+                capture_id = capture.id
+
+            rows = [
+                CaptureFrame(
+                    capture_id=capture_id,
+                    session_id=session_id,
+                    filename=frame['filename'],
+                    trigger=frame['trigger'],
+                    timing=frame.get('timing'),
+                    original_size=frame.get('original_size'),
+                    captured_at=frame.get('captured_at') or current_time,
+                    file_status=frame.get('file_status', 'PENDING')
+                )
+                for frame in frames
+            ]
+            db.add_all(rows)
             db.commit()
-            db.refresh(capture)
-            
-            # Final debug check
-            # print(f"INCREMENTAL DEBUG - Final capture record:")
-            # print(f"  ID: {capture.id}")
-            # print(f"  Filenames: {capture.filenames}")
-            # print(f"  Count: {len(capture.filenames) if capture.filenames else 0}")
-            
-            return capture
+            return rows
+
+    @staticmethod
+    def set_frame_status(session_id: str, filenames: List[str], file_status: str) -> int:
+        """Mark capture_frames rows WRITTEN or FAILED once the writer knows what happened to their files"""
+        with get_session() as db:
+            updated = db.query(CaptureFrame).filter(
+                CaptureFrame.session_id == session_id,
+                CaptureFrame.filename.in_(filenames)
+            ).update({'file_status': file_status}, synchronize_session=False)
+            db.commit()
+            return updated
+
+    @staticmethod
+    def count_frames_by_status(capture_id: str) -> Dict[str, int]:
+        """{file_status: frames} for a capture's capture_frames rows"""
+        with get_session() as db:
+            rows = db.query(CaptureFrame.file_status, func.count(CaptureFrame.id)).filter(
+                CaptureFrame.capture_id == capture_id
+            ).group_by(CaptureFrame.file_status).all()
+            return {file_status: count for file_status, count in rows}
+
+    @staticmethod
+    def reconcile_pending_frames(older_than_minutes: int = STALE_FRAME_MINUTES) -> Dict[str, int]:
+        """
+        Settle PENDING frames whose writer died (deploy, OOM, timeout kill) with the file still queued:
+        WRITTEN if the file made it to disk, FAILED otherwise.
+
+        Returns:
+            {'written': int, 'failed': int}
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=older_than_minutes)
+        with get_session() as db:
+            stale = db.query(CaptureFrame.session_id, CaptureFrame.filename).filter(
+                CaptureFrame.file_status == 'PENDING',
+                CaptureFrame.created_at < cutoff
+            ).all()
+
+        outcome: Dict[str, Dict[str, List[str]]] = defaultdict(lambda: defaultdict(list))
+        for session_id, filename in stale:
+            storage_path = CameraStorageService.get_filename_context(session_id)['storage_path']
+            file_path = CapturePathService.get_write_path(storage_path, session_id, filename)
+            outcome['WRITTEN' if os.path.isfile(file_path) else 'FAILED'][session_id].append(filename)
+
+        for file_status, by_session in outcome.items():
+            for session_id, filenames in by_session.items():
+                CameraStorageService.set_frame_status(session_id, filenames, file_status)
+
+        counts = {file_status.lower(): sum(len(filenames) for filenames in by_session.values())
+                  for file_status, by_session in outcome.items()}
+        if stale:
+            logger.warning(f"Settled {len(stale)} stale pending frames: {counts.get('written', 0)} on disk, "
+                           f"{counts.get('failed', 0)} missing")
+        return {'written': counts.get('written', 0), 'failed': counts.get('failed', 0)}
 
     @staticmethod
     def create_batch_capture_with_assessment_id(
@@ -206,8 +261,10 @@ class CameraStorageService:
             db.add(capture)
             db.commit()
             db.refresh(capture)
-            
-            print(f"Created batch capture with assessment_id {assessment_id}: {filenames} files")
+
+            instrumentation.incr('camera.batch_captures')
+            instrumentation.debug(logger, "Created batch capture %s with assessment_id %s: %d files",
+                                  capture.id, assessment_id, len(filenames or []))
             return capture
 
     @staticmethod
@@ -218,18 +275,7 @@ class CameraStorageService:
         capture_metadata: Optional[Dict[str, Any]] = None
     ) -> CameraCapture:
         """Create single CameraCapture record with all filenames and metadata - BATCH APPROACH"""
-        # Log to file for debugging
-        import logging
-        logging.basicConfig(filename='/tmp/camera_debug.log', level=logging.DEBUG, 
-                          format='%(asctime)s - %(message)s')
-        
-        logging.debug(f"CREATE BATCH DEBUG:")
-        logging.debug(f"   session_id: {session_id}")
-        logging.debug(f"   filenames: {filenames} (type: {type(filenames)}, length: {len(filenames) if filenames else 0})")
-        logging.debug(f"   capture_type: {capture_type}")
-        logging.debug(f"   capture_metadata: {capture_metadata}")
-        
-        with get_session() as db:
+        with instrumentation.stage('camera.create_batch_capture'), get_session() as db:
             # Create new batch record
             capture = CameraCapture(
                 session_id=session_id,
@@ -243,15 +289,10 @@ class CameraStorageService:
             db.add(capture)
             db.commit()
             db.refresh(capture)
-            
-            logging.debug(f"AFTER DB SAVE:")
-            logging.debug(f"   capture.id: {capture.id}")
-            logging.debug(f"   capture.filenames: {capture.filenames} (type: {type(capture.filenames)})")
-            logging.debug(f"   capture.capture_type: {capture.capture_type}")
-            
-            # Also print to console for immediate feedback
-            print(f"DEBUG: Created camera batch {capture.id} with {capture.filenames} files")
-            
+
+            instrumentation.incr('camera.batch_captures')
+            instrumentation.debug(logger, "Created %s camera batch %s for session %s: %d files",
+                                  capture.capture_type, capture.id, session_id, len(filenames or []))
             return capture
 
     @staticmethod
@@ -273,19 +314,18 @@ class CameraStorageService:
                 capture.assessment_id = assessment_id
                 capture.capture_type = assessment_type.upper()
                 
-                # Update metadata
-                capture.capture_metadata = capture.capture_metadata or {}
-                capture.capture_metadata['linked_at'] = datetime.now().isoformat()
-                capture.capture_metadata['linked_to'] = f"{assessment_type}_{assessment_id}"
-                
-                # Force SQLAlchemy to detect JSON column changes
-                from sqlalchemy.orm.attributes import flag_modified
-                flag_modified(capture, 'capture_metadata')
+                # Update stored metadata (capture_metadata is a merged read-only view)
+                capture.stored_metadata = {
+                    **(capture.stored_metadata or {}),
+                    'linked_at': datetime.now().isoformat(),
+                    'linked_to': f"{assessment_type}_{assessment_id}"
+                }
                 
                 db.commit()
                 db.refresh(capture)
                 
-                print(f"Linked capture {capture.id} to {assessment_type} assessment {assessment_id}: {capture.filenames} files")
+                instrumentation.debug(logger, "Linked capture %s to %s assessment %s: %d files",
+                                      capture.id, assessment_type, assessment_id, len(capture.filenames))
                 return capture
             return None
 
@@ -333,10 +373,10 @@ class CameraStorageService:
             ).order_by(CameraCapture.created_at).all()
 
     @staticmethod
-    def get_capture_file_path(filename: str) -> str:
-        """Get full path for a capture file"""
+    def get_capture_file_path(filename: str, session_id: Optional[str] = None) -> str:
+        """Get full path for a capture file (sharded layout, falling back to legacy flat files)"""
         static_path = CameraStorageService.get_uploads_path()
-        return os.path.join(static_path, filename)
+        return CapturePathService.resolve(static_path, session_id, filename)
 
     @staticmethod
     def cleanup_session_captures(session_id: str) -> int:
@@ -344,33 +384,32 @@ class CameraStorageService:
         static_path = CameraStorageService.get_uploads_path()
         deleted_count = 0
         
-        with get_session() as db:
+        missing_count = 0
+        failed_count = 0
+
+        with instrumentation.stage('camera.cleanup_session_captures'), get_session() as db:
             captures = db.query(CameraCapture).filter_by(
                 session_id=session_id
             ).all()
             
             for capture in captures:
-                import logging
-                logging.debug(f"CLEANUP - Processing capture {capture.id}: filenames={capture.filenames}, type={type(capture.filenames)}")
-                print(f"CLEANUP: Processing capture {capture.id} with {capture.filenames} files")
-                if capture.filenames and isinstance(capture.filenames, list):
-                    for filename in capture.filenames:
-                        if not filename:  # Skip null/empty filenames
-                            continue
-                        file_path = os.path.join(static_path, filename)
-                        logging.debug(f"   Trying to delete: {file_path}, exists: {os.path.exists(file_path)}")
-                        if os.path.exists(file_path):
-                            try:
-                                os.remove(file_path)
-                                deleted_count += 1
-                                logging.debug(f"   Successfully deleted: {filename}")
-                            except Exception as e:
-                                logging.debug(f"   Warning: Failed to delete file {filename}: {e}")
-                        else:
-                            logging.debug(f"   File not found: {file_path}")
-                else:
-                    logging.debug(f"   No valid filenames found for capture {capture.id}: {capture.filenames}")
+                filenames = [filename for filename in capture.all_filenames if filename]  # Skip null/empty filenames
+                for filename in filenames:
+                    file_path = CapturePathService.resolve(static_path, session_id, filename)
+                    try:
+                        os.remove(file_path)
+                        deleted_count += 1
+                    except FileNotFoundError:
+                        missing_count += 1
+                    except OSError as e:
+                        failed_count += 1
+                        logger.warning(f"Failed to delete capture file {filename}: {e}")
                 db.delete(capture)
             db.commit()
-            return deleted_count
+
+        # One summary line per session instead of one per file
+        instrumentation.incr('camera.files_deleted', deleted_count)
+        logger.info(f"Cleaned up {len(captures)} captures for session {session_id}: {deleted_count} files deleted, "
+                    f"{missing_count} already missing, {failed_count} failed")
+        return deleted_count
         
\ No newline at end of file
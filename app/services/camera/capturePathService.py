@@ -0,0 +1,77 @@
+"""
+Capture Path Service
+
+Single place that maps a capture filename to its location on disk:
+- New layout: {storage_path}/{session_id[:2]}/{session_id}/{filename}
+- Legacy flat layout: {storage_path}/{filename} (still readable until migrate-capture-layout moves it)
+
+Filenames stored in the database stay bare basenames; only the directory is derived.
+"""
+
+import os
+from typing import Optional
+
+
+class CapturePathService:
+    """Resolve capture image paths for sharded and legacy flat layouts"""
+
+    @staticmethod
+    def get_session_relative_dir(session_id: str) -> str:
+        """Shard directory relative to storage root: {session_id[:2]}/{session_id}"""
+        return os.path.join(session_id[:2], session_id)
+
+    @staticmethod
+    def get_session_dir(storage_path: str, session_id: str) -> str:
+        """Absolute shard directory for a session"""
+        return os.path.join(storage_path, CapturePathService.get_session_relative_dir(session_id))
+
+    @staticmethod
+    def get_write_path(storage_path: str, session_id: str, filename: str) -> str:
+        """Path new files are written to (always the sharded layout)"""
+        return os.path.join(CapturePathService.get_session_dir(storage_path, session_id), filename)
+
+    @staticmethod
+    def get_legacy_path(storage_path: str, filename: str) -> str:
+        """Path of a file in the old flat layout"""
+        return os.path.join(storage_path, filename)
+
+    @staticmethod
+    def resolve(storage_path: str, session_id: Optional[str], filename: str) -> str:
+        """
+        Existing path for a capture file
+
+        Checks the sharded location first, then the legacy flat one. When neither exists
+        the sharded path is returned so callers report the file as missing.
+        """
+        if not session_id:
+            return CapturePathService.get_legacy_path(storage_path, filename)
+
+        sharded_path = CapturePathService.get_write_path(storage_path, session_id, filename)
+        if os.path.exists(sharded_path):
+            return sharded_path
+
+        legacy_path = CapturePathService.get_legacy_path(storage_path, filename)
+        if os.path.exists(legacy_path):
+            return legacy_path
+        return sharded_path
+
+    @staticmethod
+    def remove(storage_path: str, session_id: Optional[str], filename: str) -> bool:
+        """Delete a capture file from whichever layout holds it"""
+        file_path = CapturePathService.resolve(storage_path, session_id, filename)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            return True
+        return False
+
+    @staticmethod
+    def move_to_sharded(storage_path: str, session_id: str, filename: str) -> bool:
+        """Move a legacy flat file into its session shard. Returns True if a file was moved."""
+        legacy_path = CapturePathService.get_legacy_path(storage_path, filename)
+        if not os.path.isfile(legacy_path):
+            return False
+        target_path = CapturePathService.get_write_path(storage_path, session_id, filename)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        # Same filesystem - atomic rename, readers see either the old or the new path
+        os.replace(legacy_path, target_path)
+        return True
@@ -0,0 +1,156 @@
+"""
+Frame Ingest Service
+
+Background writer for batched camera uploads:
+1. Upload requests commit the batch's capture_frames rows as PENDING (one commit), then enqueue
+   the files and return - an acknowledged frame is always in the DB, whichever worker links it
+2. A single writer thread per process writes the image files (transcoded on the pool when enabled)
+   and marks each row WRITTEN or FAILED, so every worker sees the same state
+3. Rows left PENDING by a writer that died with frames queued are settled by the scheduler
+   (CameraStorageService.reconcile_pending_frames)
+4. Filenames are final when the request names the frame (FrameTranscoder.planned_extension),
+   so the writer never renames a row
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from queue import Queue, Empty, Full
+from typing import Dict, List, Any
+
+from ...utils.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+class FrameIngestWriter:
+    """Queue + daemon thread that writes uploaded frame files off the request path"""
+
+    def __init__(self, batch_size: int = 50, flush_interval: float = 0.5, max_queue_size: int = 2000):
+        """
+        Args:
+            batch_size: Max frames written per DB round trip
+            flush_interval: Seconds to wait for more frames before writing a partial batch
+            max_queue_size: Frames held in memory before submit() refuses new work
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.frame_queue = Queue(maxsize=max_queue_size)
+        self.writer_thread = None
+        self.is_running = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the writer thread (lazily, once per worker process)"""
+        with self._start_lock:
+            if self.is_running:
+                return
+            self.is_running = True
+            self.writer_thread = threading.Thread(
+                target=self._writer_loop,
+                daemon=True,
+                name="FrameIngestWriter"
+            )
+            self.writer_thread.start()
+            atexit.register(self.stop)
+            logger.info("Frame ingest writer started")
+
+    def stop(self, timeout: float = 30.0):
+        """Stop accepting frames and drain what is already queued"""
+        self.is_running = False
+        if self.writer_thread:
+            self.writer_thread.join(timeout=timeout)
+            logger.info("Frame ingest writer stopped")
+
+    def submit(self, session_id: str, storage_path: str, filename: str, file_data: bytes) -> bool:
+        """
+        Queue one frame file for writing (non-blocking) - its capture_frames row must already be committed
+
+        Returns:
+            True if queued, False if the queue is full (caller should write synchronously)
+        """
+        self.start()
+        frame = {
+            'session_id': session_id,
+            'storage_path': storage_path,
+            'filename': filename,
+            'file_data': file_data
+        }
+        try:
+            self.frame_queue.put(frame, block=False)
+            return True
+        except Full:
+            logger.warning(f"Frame ingest queue full, rejecting frame for session {session_id}")
+            return False
+
+    def write_now(self, session_id: str, storage_path: str, filename: str, file_data: bytes) -> None:
+        """Write one frame on the calling thread (queue full) - same handling as queued frames"""
+        self._write_batch([{
+            'session_id': session_id,
+            'storage_path': storage_path,
+            'filename': filename,
+            'file_data': file_data
+        }])
+
+    def _writer_loop(self):
+        """Collect frames until batch_size or flush_interval, then persist them"""
+        while self.is_running or not self.frame_queue.empty():
+            batch = []
+            try:
+                batch.append(self.frame_queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self.frame_queue.get_nowait())
+            except Empty:
+                pass
+
+            if batch:
+                self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """Write files, then mark their capture_frames rows WRITTEN or FAILED per session"""
+        from .cameraStorageService import CameraStorageService
+        from .capturePathService import CapturePathService
+        from .frameTranscodeService import frame_transcoder
+
+        written_by_session: Dict[str, List[str]] = defaultdict(list)
+        failed_by_session: Dict[str, List[str]] = defaultdict(list)
+        created_dirs = set()
+
+        instrumentation.incr('camera.ingest.frames', len(batch))
+
+        # Re-encode the whole batch in parallel before touching disk (no-op when disabled)
+        with instrumentation.stage('camera.ingest.transcode'):
+            encoded_frames = frame_transcoder.transcode_many([frame['file_data'] for frame in batch])
+
+        write_started = time.perf_counter()
+        for frame, file_data in zip(batch, encoded_frames):
+            try:
+                file_path = CapturePathService.get_write_path(frame['storage_path'], frame['session_id'],
+                                                              frame['filename'])
+                session_dir = os.path.dirname(file_path)
+                if session_dir not in created_dirs:
+                    os.makedirs(session_dir, exist_ok=True)
+                    created_dirs.add(session_dir)
+                with open(file_path, 'wb') as f:
+                    f.write(file_data)
+                written_by_session[frame['session_id']].append(frame['filename'])
+            except Exception as e:
+                logger.error(f"Failed to write frame {frame['filename']}: {e}")
+                instrumentation.incr('camera.ingest.write_errors')
+                failed_by_session[frame['session_id']].append(frame['filename'])
+        instrumentation.record('camera.ingest.write_files', time.perf_counter() - write_started)
+
+        for file_status, by_session in (('WRITTEN', written_by_session), ('FAILED', failed_by_session)):
+            for session_id, filenames in by_session.items():
+                try:
+                    CameraStorageService.set_frame_status(session_id, filenames, file_status)
+                except Exception as e:
+                    # Left PENDING - reconcile_pending_frames settles it from the file on disk
+                    logger.error(f"Failed to mark {len(filenames)} frames {file_status} for session {session_id}: {e}")
+
+
+# Process-wide writer shared by all upload requests in this worker
+frame_ingest_writer = FrameIngestWriter()
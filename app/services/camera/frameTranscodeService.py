@@ -0,0 +1,116 @@
+"""
+Frame Transcode Service
+
+Optional ingest stage that re-encodes uploaded frames before they stay on disk:
+1. Downscale to FRAME_TRANSCODE_MAX_DIMENSION (longest side, aspect kept)
+2. Re-encode as JPEG or WebP at FRAME_TRANSCODE_QUALITY
+3. Runs on a small thread pool (Pillow releases the GIL while decoding/encoding)
+
+Disabled unless FRAME_TRANSCODE_FORMAT is set. planned_extension() names a frame before it is
+transcoded, so upload responses can return the final filename: the original bytes are only kept
+when they are already in the target format (or cannot be decoded at all).
+"""
+
+import atexit
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from ...config import Config
+
+logger = logging.getLogger(__name__)
+
+_EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+
+
+def source_extension(file_data: bytes) -> str:
+    """Extension of an uploaded frame from its magic bytes (.jpg unless it is clearly PNG/WebP)"""
+    if file_data[:8] == b'\x89PNG\r\n\x1a\n':
+        return '.png'
+    if file_data[:4] == b'RIFF' and file_data[8:12] == b'WEBP':
+        return '.webp'
+    return '.jpg'
+
+
+class FrameTranscoder:
+    """Re-encode frames to a compact format on a worker pool"""
+
+    def __init__(self, target_format: Optional[str] = None, max_dimension: int = 0,
+                 quality: int = 80, max_workers: int = 2):
+        """
+        Args:
+            target_format: 'JPEG' or 'WEBP'; None/empty disables transcoding
+            max_dimension: Longest side in pixels after downscaling (0 keeps resolution)
+            quality: Encoder quality (1-100)
+            max_workers: Transcode threads per worker process
+        """
+        target_format = (target_format or '').upper()
+        self.target_format = target_format if target_format in _EXTENSIONS else None
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.target_format is not None
+
+    @property
+    def file_extension(self) -> str:
+        """Extension for newly generated filenames (.jpg when disabled - uploads are JPEG)"""
+        return _EXTENSIONS.get(self.target_format, '.jpg')
+
+    def planned_extension(self, file_data: bytes) -> str:
+        """Extension the stored file will have: the target format's, or the source's when disabled"""
+        return self.file_extension if self.enabled else source_extension(file_data)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="FrameTranscode")
+                atexit.register(self._executor.shutdown, wait=True)
+            return self._executor
+
+    def transcode(self, file_data: bytes) -> bytes:
+        """Re-encode one frame; returns the original bytes if disabled, undecodable, or already
+        in the target format and not larger than the re-encode"""
+        if not self.enabled:
+            return file_data
+        try:
+            from PIL import Image
+
+            with Image.open(io.BytesIO(file_data)) as image:
+                if self.max_dimension and max(image.size) > self.max_dimension:
+                    image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+                if image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                output = io.BytesIO()
+                image.save(output, format=self.target_format, quality=self.quality)
+
+            encoded = output.getvalue()
+            # Re-encoding an already small frame can grow it - keep the original only when it is
+            # in the target format, so the name from planned_extension() stays right
+            if len(encoded) >= len(file_data) and source_extension(file_data) == self.file_extension:
+                return file_data
+            return encoded
+        except Exception as e:
+            logger.warning(f"Frame transcode failed, keeping original bytes: {e}")
+            return file_data
+
+    def transcode_many(self, frames: List[bytes]) -> List[bytes]:
+        """Transcode several frames in parallel on the pool, order preserved"""
+        if not self.enabled or not frames:
+            return frames
+        return list(self._get_executor().map(self.transcode, frames))
+
+
+# Process-wide transcoder configured from environment (see Config.FRAME_TRANSCODE_*)
+frame_transcoder = FrameTranscoder(
+    target_format=Config.FRAME_TRANSCODE_FORMAT,
+    max_dimension=Config.FRAME_TRANSCODE_MAX_DIMENSION,
+    quality=Config.FRAME_TRANSCODE_QUALITY,
+    max_workers=Config.FRAME_TRANSCODE_WORKERS
+)
@@ -117,6 +117,12 @@ class FacialAnalysisProcessingService:
             if not captures:
                 return ProcessingResult(success=False, message=f'No images found for {assessment_type} assessment')
 
+            # Only WRITTEN frames are in capture.filenames - don't analyze a set the writer is still filling
+            pending_frames = sum(1 for capture in captures for frame in capture.frames if frame.file_status == 'PENDING')
+            if pending_frames:
+                return ProcessingResult(success=False,
+                                        message=f'{pending_frames} frames are still being written - retry shortly')
+
             # Create or update SessionFacialAnalysis record
             if existing:
                 analysis_record = existing
@@ -229,19 +235,16 @@ class FacialAnalysisProcessingService:
 
 
                 # Iterate through filenames array (match export service)
+                capture_history = capture.history_by_filename()
                 for filename in capture.filenames:
                     # Extract timing data if available
                     timing_dict = None
                     timestamp = None
 
-                    if capture.capture_metadata and 'capture_history' in capture.capture_metadata:
-                        capture_history = capture.capture_metadata['capture_history']
-                        # Find the entry for this filename
-                        for entry in capture_history:
-                            if entry.get('filename') == filename:
-                                timing_dict = entry.get('timing', {})
-                                timestamp = entry.get('timestamp', '')
-                                break
+                    entry = capture_history.get(filename)
+                    if entry:
+                        timing_dict = entry.get('timing', {})
+                        timestamp = entry.get('timestamp', '')
 
                     # For old captures without timing, use the capture timestamp
                     if not timing_dict:
@@ -286,14 +289,15 @@ class FacialAnalysisProcessingService:
         if not storage_path:
             storage_path = media_save_path or ''
 
+        # Ensure path is absolute - if relative, prepend media_save_path
+        if not os.path.isabs(storage_path) and media_save_path:
+            storage_path = os.path.join(media_save_path, storage_path)
+
+        from ...services.camera.capturePathService import CapturePathService
         for idx, img_data in enumerate(image_data):
             # Build full image path (same way it was saved)
-            # Images are saved to storage_path (absolute path from camera settings)
-            image_path = os.path.join(storage_path, img_data.filename)
-
-            # Ensure path is absolute - if relative, prepend media_save_path
-            if not os.path.isabs(image_path) and media_save_path:
-                image_path = os.path.join(media_save_path, image_path)
+            # Images are saved under storage_path in the session shard (or flat for legacy captures)
+            image_path = CapturePathService.resolve(storage_path, session_id, img_data.filename)
 
             image_cache[idx] = {
                 'index': idx,
@@ -0,0 +1,326 @@
+# app/services/llm/analysisBatchService.py
+"""
+LLM Analysis Batch Service
+
+Runs conversation analysis for many sessions as a background job tracked in llm_analysis_batches:
+1. The batch-run route queues a PENDING batch and returns its id right away
+2. The scheduler claims one batch and analyzes its sessions with LLM_ANALYSIS_CONCURRENCY
+   asyncio workers sharing one AsyncOpenAI client (DB work runs in worker threads, so the
+   workers are capped at the engine's pool size)
+3. Only one batch runs at a time across all worker processes, so the limiter in that run owns
+   the whole budget: every call first reserves a request and its estimated tokens from a
+   limiter sized to the provider's RPM/TPM; 429s, timeouts, connection errors and 5xx are retried with
+   exponential backoff and full jitter (Retry-After wins when the provider sends it)
+4. Sessions whose input digest matches a stored analysis reuse it unless the batch is forced
+5. Each result is stored as soon as it arrives and per-session outcomes are written to the
+   batch with its progress, so a batch that lost its worker resumes where it stopped
+"""
+
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import openai
+from sqlalchemy import exists
+from sqlalchemy.orm import aliased
+
+from ...config import Config
+from ...db import get_pool_size, get_session
+from ...model.assessment.sessions import LLMAnalysisBatch
+from ...utils.instrumentation import instrumentation
+from ...utils.rate_limiter import AsyncRateLimiter
+from .analysisService import LLMAnalysisService
+from .contextWindowService import ContextWindowService
+from .openaiClient import new_async_http_client, openai_base_url
+from .usageRecorder import record_usage
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress writes (also the heartbeat that keeps a batch from looking stale)
+PROGRESS_INTERVAL = 5
+
+# A RUNNING batch without a heartbeat for this long lost its worker (restart/deploy) and is re-queued
+STALE_BATCH_MINUTES = 15
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                    openai.InternalServerError)
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+
+class LLMAnalysisBatchService:
+    """Service for queuing and running background batches of conversation analyses"""
+
+    @classmethod
+    def queue_batch(cls, session_ids: List[str], requested_by_user: int, force: bool = False) -> Dict[str, Any]:
+        """Create a PENDING batch (duplicate ids are dropped); the scheduler runs it. force re-analyzes unchanged input."""
+        session_ids = list(dict.fromkeys(session_ids))
+        with get_session() as db:
+            batch = LLMAnalysisBatch(
+                session_ids=session_ids,
+                progress={'total': len(session_ids), 'done': 0, 'succeeded': 0, 'failed': 0, 'reused': 0, 'retries': 0},
+                results={},
+                force=force,
+                requested_by_user=requested_by_user,
+                status='PENDING'
+            )
+            db.add(batch)
+            db.commit()
+            batch_id = batch.id
+
+        logger.info(f"[ANALYSIS-BATCH] Queued batch {batch_id} ({len(session_ids)} sessions)")
+        return {'batch_id': batch_id, 'status': 'PENDING', 'total_sessions': len(session_ids)}
+
+    @classmethod
+    def get_batch_status(cls, batch_id: str, include_results: bool = True) -> Optional[Dict[str, Any]]:
+        """Batch state, progress and (optionally) per-session outcomes, or None if no batch has that id"""
+        with get_session() as db:
+            batch = db.query(LLMAnalysisBatch).filter_by(id=batch_id).first()
+            if not batch:
+                return None
+
+            progress = dict(batch.progress or {})
+            if batch.status == 'COMPLETED':
+                progress['percent'] = 100
+            elif progress.get('total'):
+                progress['percent'] = min(99, int(progress.get('done', 0) * 100 / progress['total']))
+            else:
+                progress['percent'] = 0
+
+            status = {
+                'batch_id': batch.id,
+                'status': batch.status,
+                'force': batch.force,
+                'progress': progress,
+                'created_at': batch.created_at.isoformat() if batch.created_at else None,
+                'completed_at': batch.completed_at.isoformat() if batch.completed_at else None,
+                'error': batch.error
+            }
+            if include_results:
+                status['results'] = batch.results or {}
+            return status
+
+    @classmethod
+    def _requeue_stale_batches(cls, db):
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=STALE_BATCH_MINUTES)
+        requeued = db.query(LLMAnalysisBatch).filter(
+            LLMAnalysisBatch.status == 'RUNNING',
+            LLMAnalysisBatch.updated_at < cutoff
+        ).update({'status': 'PENDING'}, synchronize_session=False)
+        if requeued:
+            logger.warning(f"[ANALYSIS-BATCH] Re-queued {requeued} stale batch(es)")
+
+    @classmethod
+    def _update_batch(cls, batch_id: str, progress: Dict[str, Any], results: Dict[str, Any], **fields):
+        with get_session() as db:
+            # JSON columns are not mutable-tracked - always write fresh dicts
+            db.query(LLMAnalysisBatch).filter_by(id=batch_id).update(
+                {'progress': dict(progress), 'results': dict(results), **fields}, synchronize_session=False
+            )
+            db.commit()
+
+    @classmethod
+    def process_queue(cls) -> Dict[str, Any]:
+        """
+        Run ONE pending batch (called by the scheduler).
+
+        Every worker process runs the scheduler, so the batch is claimed with a conditional
+        UPDATE - only the worker whose UPDATE matched a PENDING row runs it, and only while no
+        other batch is RUNNING. The rate limiter lives in the running process, so one batch at
+        a time is what keeps the whole deployment within LLM_ANALYSIS_RPM/TPM.
+
+        Returns:
+            {'processed': 0|1, 'batch_id': str|None, 'error': str (on failure)}
+        """
+        with get_session() as db:
+            cls._requeue_stale_batches(db)
+            db.commit()
+
+            batch = db.query(LLMAnalysisBatch).filter(
+                LLMAnalysisBatch.status == 'PENDING'
+            ).order_by(LLMAnalysisBatch.created_at).first()
+            if not batch:
+                return {'processed': 0, 'batch_id': None}
+
+            # Every worker picks the oldest PENDING batch, so racing claims meet on the same row
+            running = aliased(LLMAnalysisBatch)
+            claimed = db.query(LLMAnalysisBatch).filter(
+                LLMAnalysisBatch.id == batch.id,
+                LLMAnalysisBatch.status == 'PENDING',
+                ~exists().where(running.status == 'RUNNING')
+            ).update({'status': 'RUNNING'}, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                # Another worker got it first, or a batch is already running
+                return {'processed': 0, 'batch_id': None}
+
+            batch_id = batch.id
+            session_ids = list(batch.session_ids or [])
+            progress = dict(batch.progress or {})
+            results = dict(batch.results or {})
+            force = bool(batch.force)
+
+        # Resumed batches skip sessions that already have an outcome
+        pending_ids = [session_id for session_id in session_ids if session_id not in results]
+        logger.info(f"[ANALYSIS-BATCH] Starting batch {batch_id} ({len(pending_ids)}/{len(session_ids)} sessions left)")
+
+        started = time.monotonic()
+        try:
+            asyncio.run(cls._run_batch(batch_id, pending_ids, progress, results, force))
+            cls._update_batch(batch_id, progress, results, status='COMPLETED', completed_at=datetime.utcnow())
+            logger.info(f"[ANALYSIS-BATCH] Completed batch {batch_id}: {progress['succeeded']} succeeded, "
+                        f"{progress['failed']} failed in {time.monotonic() - started:.1f}s")
+            return {'processed': 1, 'batch_id': batch_id}
+
+        except Exception as e:
+            logger.error(f"[ANALYSIS-BATCH] Failed batch {batch_id}: {str(e)}")
+            cls._update_batch(batch_id, progress, results, status='FAILED', error=str(e),
+                              completed_at=datetime.utcnow())
+            return {'processed': 0, 'batch_id': batch_id, 'error': str(e)}
+
+    @classmethod
+    async def _run_batch(cls, batch_id: str, session_ids: List[str],
+                         progress: Dict[str, Any], results: Dict[str, Any], force: bool = False) -> None:
+        """Analyze session_ids on a bounded worker pool, recording outcomes into progress/results"""
+        if not session_ids:
+            return
+
+        # Settings are read once per batch - every session is analyzed with the same configuration
+        llm_settings = await asyncio.to_thread(LLMAnalysisService.get_llm_settings)
+        if not llm_settings:
+            raise ValueError("No active LLM settings found")
+        api_key = llm_settings.get_api_key()
+        if not api_key:
+            raise ValueError("No valid API key in LLM settings")
+
+        # Retries are ours (rate limiter + jitter), not the SDK's. The pool belongs to this run's
+        # event loop (asyncio.run per batch), so it is created here and closed with the client
+        client = openai.AsyncOpenAI(api_key=api_key, base_url=openai_base_url(), max_retries=0,
+                                    timeout=Config.LLM_ANALYSIS_TIMEOUT, http_client=new_async_http_client())
+        limiter = AsyncRateLimiter(Config.LLM_ANALYSIS_RPM, Config.LLM_ANALYSIS_TPM)
+        work: asyncio.Queue = asyncio.Queue()
+        for session_id in session_ids:
+            work.put_nowait(session_id)
+
+        write_lock = asyncio.Lock()
+        last_write = time.monotonic()
+
+        async def write_progress():
+            nonlocal last_write
+            async with write_lock:
+                if time.monotonic() - last_write < PROGRESS_INTERVAL:
+                    return
+                last_write = time.monotonic()
+                await asyncio.to_thread(cls._update_batch, batch_id, dict(progress), dict(results))
+
+        async def worker():
+            while True:
+                try:
+                    session_id = work.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                outcome = await cls._analyze_session(session_id, llm_settings, client, limiter, progress, force)
+                results[session_id] = outcome
+                progress['done'] += 1
+                progress['succeeded' if outcome['status'] == 'success' else 'failed'] += 1
+                if outcome.get('reused'):
+                    progress['reused'] = progress.get('reused', 0) + 1
+                instrumentation.incr(f"llm.analysis.batch.{outcome['status']}")
+                await write_progress()
+
+        try:
+            # Each worker holds at most one connection at a time (to_thread DB calls), so staying
+            # within the pool size keeps the batch from exhausting the pool for web requests
+            workers = min(max(1, Config.LLM_ANALYSIS_CONCURRENCY), get_pool_size(), len(session_ids))
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        finally:
+            await client.close()
+
+    @classmethod
+    async def _analyze_session(cls, session_id: str, llm_settings, client: openai.AsyncOpenAI,
+                               limiter: AsyncRateLimiter, progress: Dict[str, Any], force: bool = False) -> Dict[str, Any]:
+        """Outcome for one session: {'status': 'success', 'analysis_id', ...} or {'status': 'failed'|'error', 'error'}"""
+        try:
+            prepared = await asyncio.to_thread(LLMAnalysisService.prepare_analysis, session_id, llm_settings)
+            if not prepared:
+                return {'status': 'failed', 'error': 'Session cannot be analyzed (not completed, or no conversation)'}
+
+            if not force:
+                existing = await asyncio.to_thread(LLMAnalysisService.find_memoized_result, session_id, prepared['digest'])
+                if existing:
+                    instrumentation.incr('llm.analysis.memo.hit')
+                    return {
+                        'status': 'success',
+                        'reused': True,
+                        'analysis_id': existing.id,
+                        'total_aspects_detected': existing.total_aspects_detected,
+                        'average_severity_score': existing.average_severity_score
+                    }
+                instrumentation.incr('llm.analysis.memo.miss')
+
+            request = LLMAnalysisService.build_completion_request(prepared['prompt'], prepared['model'])
+            estimate = (ContextWindowService.count_tokens(LLMAnalysisService.SYSTEM_PROMPT + prepared['prompt'],
+                                                          prepared['model'])
+                        + LLMAnalysisService.MAX_TOKENS)
+            with instrumentation.stage('llm.analysis.call'):
+                response = await cls._create_with_retry(client, limiter, request, estimate, progress)
+
+            content = response.choices[0].message.content if response.choices else None
+            if not content:
+                return {'status': 'failed', 'error': 'Empty response from OpenAI'}
+
+            result = await asyncio.to_thread(LLMAnalysisService.store_analysis, prepared, content)
+            if not result:
+                return {'status': 'failed', 'error': 'Analysis response failed validation'}
+            return {
+                'status': 'success',
+                'analysis_id': result.id,
+                'total_aspects_detected': result.total_aspects_detected,
+                'average_severity_score': result.average_severity_score
+            }
+        except Exception as e:
+            logger.warning(f"[ANALYSIS-BATCH] Session {session_id} failed: {e}")
+            return {'status': 'error', 'error': str(e)}
+
+    @classmethod
+    async def _create_with_retry(cls, client: openai.AsyncOpenAI, limiter: AsyncRateLimiter,
+                                 request: Dict[str, Any], estimate: int, progress: Dict[str, Any]):
+        """chat.completions.create within the rate limits, retrying transient errors with jittered backoff"""
+        for attempt in range(Config.LLM_ANALYSIS_MAX_RETRIES + 1):
+            waited = await limiter.acquire(estimate)
+            if waited:
+                instrumentation.record('llm.analysis.rate_limit_wait', waited)
+            try:
+                response = await client.chat.completions.create(**request)
+            except RETRYABLE_ERRORS as e:
+                # Out of quota is not transient - retrying only burns the remaining attempts
+                if attempt == Config.LLM_ANALYSIS_MAX_RETRIES or getattr(e, 'code', None) == 'insufficient_quota':
+                    raise
+                limiter.refund(estimate)
+                delay = cls._backoff_delay(attempt, e)
+                if isinstance(e, openai.RateLimitError):
+                    limiter.penalize(delay)
+                progress['retries'] = progress.get('retries', 0) + 1
+                instrumentation.incr('llm.analysis.retries')
+                await asyncio.sleep(delay)
+                continue
+
+            if response.usage:
+                # Signed: long conversations can use more than the estimate, which is debited
+                limiter.refund(estimate - response.usage.total_tokens)
+                record_usage(response.usage, 'analysis')
+            return response
+
+    @staticmethod
+    def _backoff_delay(attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, never shorter than the provider's Retry-After"""
+        delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        try:
+            return max(delay, float(retry_after)) if retry_after else delay
+        except ValueError:
+            return delay
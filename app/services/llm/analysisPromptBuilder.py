@@ -7,6 +7,9 @@ class LLMAnalysisPromptBuilder:
     Builds analysis prompts for LLM conversation analysis.
     Separates prompt construction logic from analysis execution.
     """
+    # Bump whenever the prompt text or structure changes - stored analyses keyed on the old version are re-run
+    PROMPT_VERSION = "1"
+
     PSYCHOLOGIST_INTRO = """Anda adalah seorang psikolog. Kemudian terdapat 2 orang yang sedang melakukan percakapan, yaitu Anisa seorang mahasiswa psikologi yang supportive dan senang hati mendengarkan curhatan orang lain, dan temannya, dimana Anisa bertindak sebagai orang yang sedang mendengarkan curhat temannya yang kemungkinan mengalami gejala depresi, atau bisa jadi tidak. 
     Berikut adalah hasil percakapan untuk mengeksplorasi bagaimana kondisi psikologis mereka terutama yang berkaitan dengan gejala depresi:"""
 
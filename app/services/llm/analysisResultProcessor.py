@@ -127,7 +127,8 @@ class LLMAnalysisResultProcessor:
         conversation_turns_analyzed: int,
         raw_llm_response: str,
         parsed_result: Dict[str, Any],
-        depression_aspects: List[Dict[str, Any]]
+        depression_aspects: List[Dict[str, Any]],
+        input_digest: Optional[str] = None
     ) -> Optional[LLMAnalysisResult]:
         """
         Store analysis result in database.
@@ -139,6 +140,7 @@ class LLMAnalysisResultProcessor:
             raw_llm_response: Raw response from LLM
             parsed_result: Parsed and validated JSON result
             depression_aspects: Original aspects configuration
+            input_digest: LLMAnalysisService.compute_input_digest() of the analyzed input
             
         Returns:
             Created LLMAnalysisResult or None if storage fails
@@ -163,7 +165,8 @@ class LLMAnalysisResultProcessor:
                     aspect_scores=parsed_result,
                     total_aspects_detected=metrics['total_aspects_detected'],
                     average_severity_score=metrics['average_severity_score'],
-                    analysis_confidence=metrics['analysis_confidence']
+                    analysis_confidence=metrics['analysis_confidence'],
+                    input_digest=input_digest
                 )
                 
                 db.add(analysis_result)
@@ -187,7 +190,8 @@ class LLMAnalysisResultProcessor:
         raw_llm_response: str,
         analysis_model_used: str,
         conversation_turns_analyzed: int,
-        depression_aspects: List[Dict[str, Any]]
+        depression_aspects: List[Dict[str, Any]],
+        input_digest: Optional[str] = None
     ) -> Optional[LLMAnalysisResult]:
         """
         Complete processing pipeline for LLM analysis response.
@@ -198,6 +202,7 @@ class LLMAnalysisResultProcessor:
             analysis_model_used: Model used for analysis
             conversation_turns_analyzed: Number of turns analyzed
             depression_aspects: Aspects configuration used
+            input_digest: Digest of the analyzed input (for reuse)
             
         Returns:
             LLMAnalysisResult if successful, None if processing failed
@@ -227,5 +232,6 @@ class LLMAnalysisResultProcessor:
             conversation_turns_analyzed=conversation_turns_analyzed,
             raw_llm_response=raw_llm_response,
             parsed_result=parsed_result,
-            depression_aspects=depression_aspects
+            depression_aspects=depression_aspects,
+            input_digest=input_digest
         )
\ No newline at end of file
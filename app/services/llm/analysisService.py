@@ -1,12 +1,18 @@
 # app/services/llm/analysisService.py
-from typing import List, Dict, Any, Optional
-import openai
+import hashlib
+import json
+import logging
+from typing import List, Dict, Any, Optional, Tuple
 from flask import current_app
 from ...model.assessment.sessions import AssessmentSession, LLMConversation, LLMAnalysisResult
 from ...model.admin.llm import LLMSettings
 from ...db import get_session
+from ...utils.instrumentation import instrumentation
 from .analysisPromptBuilder import LLMAnalysisPromptBuilder
 from .analysisResultProcessor import LLMAnalysisResultProcessor
+from .openaiClient import get_openai_client
+
+logger = logging.getLogger(__name__)
 
 
 class LLMAnalysisService:
@@ -19,6 +25,7 @@ class LLMAnalysisService:
     ANALYSIS_SEED = 42
     ANALYSIS_TEMPERATURE = 0.0
     MAX_TOKENS = 2000
+    SYSTEM_PROMPT = "You are a professional psychologist analyzing conversation transcripts. Respond only with the requested JSON format."
     
     @staticmethod
     def get_llm_settings() -> Optional[LLMSettings]:
@@ -38,28 +45,45 @@ class LLMAnalysisService:
             List of conversation messages in format [{"role": "user|assistant", "message": "content"}]
         """
         with get_session() as db:
-            conversations = db.query(LLMConversation).filter(
+            conversation = db.query(LLMConversation).filter(
                 LLMConversation.session_id == session_id
-            ).order_by(LLMConversation.created_at.asc()).all()
-            
+            ).order_by(LLMConversation.created_at.asc()).first()
+            if not conversation:
+                return []
+
             messages = []
-            for conv in conversations:
+            for turn in conversation.turns:
                 # Add user message
-                if conv.user_message:
+                if turn.get('user_message'):
                     messages.append({
                         "role": "user",
-                        "message": conv.user_message
+                        "message": turn['user_message']
                     })
                 
                 # Add assistant message
-                if conv.assistant_message:
+                if turn.get('ai_message'):
                     messages.append({
                         "role": "assistant", 
-                        "message": conv.assistant_message
+                        "message": turn['ai_message']
                     })
             
             return messages
     
+    @staticmethod
+    def build_completion_request(analysis_prompt: str, model: str) -> Dict[str, Any]:
+        """chat.completions.create arguments for one analysis (shared by the single and batch paths)"""
+        return {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": LLMAnalysisService.SYSTEM_PROMPT},
+                {"role": "user", "content": analysis_prompt}
+            ],
+            "temperature": LLMAnalysisService.ANALYSIS_TEMPERATURE,
+            "seed": LLMAnalysisService.ANALYSIS_SEED,
+            "max_tokens": LLMAnalysisService.MAX_TOKENS,
+            "response_format": {"type": "json_object"}  # Force JSON response
+        }
+    
     @staticmethod
     def call_openai_analysis(
         analysis_prompt: str, 
@@ -78,18 +102,10 @@ class LLMAnalysisService:
             Raw response text or None if API call fails
         """
         try:
-            client = openai.OpenAI(api_key=api_key)
+            client = get_openai_client(api_key)
             
             response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "You are a professional psychologist analyzing conversation transcripts. Respond only with the requested JSON format."},
-                    {"role": "user", "content": analysis_prompt}
-                ],
-                temperature=LLMAnalysisService.ANALYSIS_TEMPERATURE,
-                seed=LLMAnalysisService.ANALYSIS_SEED,
-                max_tokens=LLMAnalysisService.MAX_TOKENS,
-                response_format={"type": "json_object"}  # Force JSON response
+                **LLMAnalysisService.build_completion_request(analysis_prompt, model)
             )
             
             if response.choices and len(response.choices) > 0:
@@ -136,26 +152,45 @@ class LLMAnalysisService:
             
             return session
     
+    @staticmethod
+    def get_analysis_config(llm_settings: LLMSettings) -> Tuple[List[Dict[str, Any]], Optional[List[Dict[str, Any]]]]:
+        """(depression aspects, analysis scale) from LLM settings - either may be empty"""
+        depression_aspects = []
+        analysis_scale = None
+        if llm_settings.depression_aspects:
+            if isinstance(llm_settings.depression_aspects, dict) and 'aspects' in llm_settings.depression_aspects:
+                depression_aspects = llm_settings.depression_aspects['aspects']
+            elif isinstance(llm_settings.depression_aspects, list):
+                depression_aspects = llm_settings.depression_aspects
+        
+        # Get analysis scale - REQUIRED
+        if llm_settings.analysis_scale:
+            if isinstance(llm_settings.analysis_scale, dict) and 'scale' in llm_settings.analysis_scale:
+                analysis_scale = llm_settings.analysis_scale['scale']
+            elif isinstance(llm_settings.analysis_scale, list):
+                analysis_scale = llm_settings.analysis_scale
+        return depression_aspects, analysis_scale
+    
     @classmethod
-    def run_conversation_analysis(cls, session_id: str) -> Optional[LLMAnalysisResult]:
+    def prepare_analysis(cls, session_id: str, llm_settings: Optional[LLMSettings] = None) -> Optional[Dict[str, Any]]:
         """
-        Run complete conversation analysis for a session.
+        Everything needed to call the model for one session (no API call yet).
         
         Args:
             session_id: Assessment session ID to analyze
+            llm_settings: Active settings, when the caller already loaded them (batch runs)
             
         Returns:
-            LLMAnalysisResult if successful, None if analysis failed
+            {'session_id', 'api_key', 'model', 'prompt', 'depression_aspects', 'message_count'}
+            or None if the session cannot be analyzed
         """
-        print(f"🚀 Starting conversation analysis for session {session_id}")
-        
         # 1. Validate session
         session = cls.validate_session_for_analysis(session_id)
         if not session:
             return None
         
         # 2. Get LLM settings
-        llm_settings = cls.get_llm_settings()
+        llm_settings = llm_settings or cls.get_llm_settings()
         if not llm_settings:
             print(" No active LLM settings found")
             return None
@@ -166,20 +201,7 @@ class LLMAnalysisService:
             return None
         
         # 3. Get depression aspects configuration
-        depression_aspects = []
-        analysis_scale = None
-        if llm_settings.depression_aspects:
-            if isinstance(llm_settings.depression_aspects, dict) and 'aspects' in llm_settings.depression_aspects:
-                depression_aspects = llm_settings.depression_aspects['aspects']
-            elif isinstance(llm_settings.depression_aspects, list):
-                depression_aspects = llm_settings.depression_aspects
-        
-        # Get analysis scale - REQUIRED
-        if llm_settings.analysis_scale:
-            if isinstance(llm_settings.analysis_scale, dict) and 'scale' in llm_settings.analysis_scale:
-                analysis_scale = llm_settings.analysis_scale['scale']
-            elif isinstance(llm_settings.analysis_scale, list):
-                analysis_scale = llm_settings.analysis_scale
+        depression_aspects, analysis_scale = cls.get_analysis_config(llm_settings)
         
         if not depression_aspects:
             print(" No depression aspects configured in LLM settings")
@@ -203,21 +225,61 @@ class LLMAnalysisService:
         )
         print(f" Built analysis prompt ({len(analysis_prompt)} characters)")
         analysis_model = llm_settings.analysis_model or "gpt-4o-mini"
-        raw_response = cls.call_openai_analysis(
-            analysis_prompt=analysis_prompt,
-            api_key=api_key,
-            model=analysis_model
-        )
-        if not raw_response:
-            print(" Failed to get response from OpenAI")
-            return None
+        return {
+            'session_id': session_id,
+            'api_key': api_key,
+            'model': analysis_model,
+            'prompt': analysis_prompt,
+            'depression_aspects': depression_aspects,
+            'message_count': len(conversation_messages),
+            'digest': cls.compute_input_digest(conversation_messages, depression_aspects, analysis_scale, analysis_model)
+        }
+    
+    @staticmethod
+    def compute_input_digest(
+        conversation_messages: List[Dict[str, str]],
+        depression_aspects: List[Dict[str, Any]],
+        analysis_scale: List[Dict[str, Any]],
+        model: str
+    ) -> str:
+        """
+        sha256 over everything that decides an analysis: the formatted chat history, aspects, scale,
+        model, prompt template version and the fixed call parameters.
+        """
+        payload = {
+            'chat_history': LLMAnalysisPromptBuilder.format_chat_history(conversation_messages),
+            'depression_aspects': depression_aspects,
+            'analysis_scale': analysis_scale,
+            'model': model,
+            'prompt_version': LLMAnalysisPromptBuilder.PROMPT_VERSION,
+            'system_prompt': LLMAnalysisService.SYSTEM_PROMPT,
+            'params': [LLMAnalysisService.ANALYSIS_TEMPERATURE, LLMAnalysisService.ANALYSIS_SEED,
+                       LLMAnalysisService.MAX_TOKENS]
+        }
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def find_memoized_result(session_id: str, digest: str) -> Optional[LLMAnalysisResult]:
+        """Newest stored analysis of this session with the same input digest, if any"""
+        with get_session() as db:
+            return db.query(LLMAnalysisResult).filter(
+                LLMAnalysisResult.session_id == session_id,
+                LLMAnalysisResult.input_digest == digest
+            ).order_by(LLMAnalysisResult.created_at.desc()).first()
+    
+    @staticmethod
+    def store_analysis(prepared: Dict[str, Any], raw_response: str) -> Optional[LLMAnalysisResult]:
+        """Validate and store the model's answer for a prepare_analysis() result"""
+        session_id = prepared['session_id']
         print(f" Got response from OpenAI ({len(raw_response)} characters)")
         result = LLMAnalysisResultProcessor.process_llm_analysis_response(
             session_id=session_id,
             raw_llm_response=raw_response,
-            analysis_model_used=analysis_model,
-            conversation_turns_analyzed=len(conversation_messages),
-            depression_aspects=depression_aspects
+            analysis_model_used=prepared['model'],
+            conversation_turns_analyzed=prepared['message_count'],
+            depression_aspects=prepared['depression_aspects'],
+            input_digest=prepared.get('digest')
         )
         
         if result:
@@ -229,6 +291,43 @@ class LLMAnalysisService:
             print(f" Failed to process analysis results for session {session_id}")
         return result
     
+    @classmethod
+    def run_conversation_analysis(cls, session_id: str, force: bool = False) -> Optional[LLMAnalysisResult]:
+        """
+        Run complete conversation analysis for a session.
+        
+        Args:
+            session_id: Assessment session ID to analyze
+            force: Call the model even if an analysis of the same input is already stored
+            
+        Returns:
+            LLMAnalysisResult if successful (the stored one when the input is unchanged), None if analysis failed
+        """
+        print(f"🚀 Starting conversation analysis for session {session_id}")
+        
+        prepared = cls.prepare_analysis(session_id)
+        if not prepared:
+            return None
+        
+        if not force:
+            existing = cls.find_memoized_result(session_id, prepared['digest'])
+            if existing:
+                instrumentation.incr('llm.analysis.memo.hit')
+                logger.info(f"[ANALYSIS] Reusing analysis {existing.id} for session {session_id} "
+                            f"(conversation and settings unchanged)")
+                return existing
+            instrumentation.incr('llm.analysis.memo.miss')
+        
+        raw_response = cls.call_openai_analysis(
+            analysis_prompt=prepared['prompt'],
+            api_key=prepared['api_key'],
+            model=prepared['model']
+        )
+        if not raw_response:
+            print(" Failed to get response from OpenAI")
+            return None
+        return cls.store_analysis(prepared, raw_response)
+    
     @staticmethod
     def get_analysis_result(session_id: str) -> Optional[LLMAnalysisResult]:
         """
@@ -259,18 +358,7 @@ class LLMAnalysisService:
             api_key = llm_settings.get_api_key()
             if not api_key:
                 return {"status": "error", "message": "No valid API key in LLM settings"}
-            depression_aspects = []
-            analysis_scale = None
-            if llm_settings.depression_aspects:
-                if isinstance(llm_settings.depression_aspects, dict) and 'aspects' in llm_settings.depression_aspects:
-                    depression_aspects = llm_settings.depression_aspects['aspects']
-                elif isinstance(llm_settings.depression_aspects, list):
-                    depression_aspects = llm_settings.depression_aspects
-            if llm_settings.analysis_scale:
-                if isinstance(llm_settings.analysis_scale, dict) and 'scale' in llm_settings.analysis_scale:
-                    analysis_scale = llm_settings.analysis_scale['scale']
-                elif isinstance(llm_settings.analysis_scale, list):
-                    analysis_scale = llm_settings.analysis_scale
+            depression_aspects, analysis_scale = LLMAnalysisService.get_analysis_config(llm_settings)
             if not depression_aspects:
                 return {"status": "error", "message": "No depression aspects configured"}
             if not analysis_scale:
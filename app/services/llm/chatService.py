@@ -1,11 +1,15 @@
 # app/services/llm/chatService.py
+import threading
 from typing import Generator, Dict, Any, List, AsyncGenerator
 from datetime import datetime
 from ...services.session.sessionManager import SessionManager
 from ...services.admin.llmService import LLMService
 from ...services.assessment.llmService import LLMConversationService
 from ...model.assessment.sessions import AssessmentSession
+from ...config import Config
 from ...db import get_session
+from ...utils.instrumentation import instrumentation
+from ...utils.ttl_cache import TTLCache
 
 # Async support
 from asgiref.sync import sync_to_async, async_to_sync
@@ -19,7 +23,10 @@ from langchain_openai import ChatOpenAI
 from langchain_openai.chat_models.base import ChatOpenAI
 
 # PostgreSQL-based history implementation (replaces in-memory store)
-from .postgreSQLHistory import get_postgresql_history_by_session_id
+from .contextWindowService import ContextWindowService
+from .postgreSQLHistory import PostgreSQLHistory, get_postgresql_history_by_session_id
+from .openaiClient import attach_shared_clients, openai_base_url
+from .usageRecorder import STREAM_USAGE_KWARGS, track_usage
 
 
 def get_by_session_id(session_id: str) -> BaseChatMessageHistory:
@@ -27,6 +34,13 @@ def get_by_session_id(session_id: str) -> BaseChatMessageHistory:
     return get_postgresql_history_by_session_id(session_id)
 
 
+# Compiled chains keyed by settings_version. The client, prompt and history wrapper hold no
+# per-request state (history is resolved from the session_id in the run config), so one set
+# serves every request until the settings change.
+_chain_cache = TTLCache(maxsize=4, ttl=3600)
+_chain_build_lock = threading.Lock()
+
+
 class LLMChatService:
     """
     LLM Chat Service for streaming conversations
@@ -39,14 +53,11 @@ class LLMChatService:
         self.chain_with_history = None
     
     def _load_llm_settings(self) -> Dict[str, Any]:
-        """Load active LLM settings from database - NO fallbacks"""
-        settings_list = LLMService.get_settings()
-        if not settings_list:
+        """Load active LLM settings (cached snapshot, see LLMService.get_active_settings) - NO fallbacks"""
+        settings = LLMService.get_active_settings()
+        if not settings:
             raise ValueError("No active LLM settings found. Please configure LLM settings first.")
         
-        # Get first active settings
-        settings = settings_list[0]
-        
         # Validate required fields (use unmasked API key)
         if not settings.get('openai_api_key_unmasked') or not settings['openai_api_key_unmasked'].strip():
             raise ValueError("OpenAI API key not configured in LLM settings")
@@ -60,43 +71,85 @@ class LLMChatService:
         return settings
     
     def _init_langchain(self, settings: Dict[str, Any]) -> None:
-        """Initialize Langchain components with settings from database"""
-        try:
-            self.chat_model = ChatOpenAI(
-                model=settings['chat_model'],
-                openai_api_key=settings['openai_api_key_unmasked'],
-                # temperature=0,
-                streaming=True
-            )
-            # Build system prompt from settings using the new approach
-            aspects = settings['depression_aspects']
-            custom_instructions = settings.get('llm_instructions')
-            # Use the new build_langchain_prompt_template method for proper structure
-            self.prompt = LLMService.build_langchain_prompt_template(aspects, custom_instructions)
-            
-            # For streaming, we need to adjust how we pass parameters to match the new template
-            # The new template expects "user_input" and "conversation_history" instead of "input" and "history"
-            self.chain = self.prompt | self.chat_model
-            # Adjust the history handling to match the new template structure
-            self.chain_with_history = RunnableWithMessageHistory(
-                self.chain,
-                get_by_session_id,
-                input_messages_key="user_input",  # Changed to match new template
-                history_messages_key="conversation_history",  # Changed to match new template
-                history_factory_config=[
-                    ConfigurableFieldSpec(
-                        id="session_id",
-                        annotation=str,
-                        name="Session ID",
-                        description="Unique identifier for the chat session",
-                        default="",
-                        is_shared=True,
-                    ),
-                ],
-            )
-        except Exception as e:
-            # Don't hide the error - show the raw error message
-            raise e
+        """Attach the compiled chain for these settings, building it once per settings version"""
+        components = LLMChatService.get_chain_components(settings)
+        self.chat_model = components['chat_model']
+        self.prompt = components['prompt']
+        self.chain = components['chain']
+        self.chain_with_history = components['chain_with_history']
+    
+    @staticmethod
+    def get_chain_components(settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Cached client/prompt/chain set for the settings' settings_version"""
+        version = settings.get('settings_version')
+        components = _chain_cache.get(version) if version else None
+        if components is None:
+            with _chain_build_lock:
+                components = _chain_cache.get(version) if version else None
+                if components is None:
+                    instrumentation.incr('llm.chain_cache.miss')
+                    components = LLMChatService._build_chain(settings)
+                    if version:
+                        _chain_cache.set(version, components)
+        else:
+            instrumentation.incr('llm.chain_cache.hit')
+        return components
+    
+    @staticmethod
+    def _build_chain(settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the ChatOpenAI client, prompt and history-wrapped chain from settings"""
+        chat_model = ChatOpenAI(
+            model=settings['chat_model'],
+            openai_api_key=settings['openai_api_key_unmasked'],
+            openai_api_base=openai_base_url(),
+            # temperature=0,
+            streaming=True,
+            # Final usage chunk carries cached prompt tokens (recorded by usageRecorder)
+            model_kwargs=STREAM_USAGE_KWARGS
+        )
+        attach_shared_clients(chat_model, settings['openai_api_key_unmasked'])
+        track_usage(chat_model, 'chat')
+        # Build system prompt from settings using the new approach
+        aspects = settings['depression_aspects']
+        custom_instructions = settings.get('llm_instructions')
+        # Use the new build_langchain_prompt_template method for proper structure
+        prompt = LLMService.build_langchain_prompt_template(aspects, custom_instructions)
+        
+        # The template expects "user_input" and "conversation_history" instead of "input" and "history"
+        chain = prompt | chat_model
+        chain_with_history = RunnableWithMessageHistory(
+            chain,
+            get_by_session_id,
+            input_messages_key="user_input",  # Changed to match new template
+            history_messages_key="conversation_history",  # Changed to match new template
+            history_factory_config=[
+                ConfigurableFieldSpec(
+                    id="session_id",
+                    annotation=str,
+                    name="Session ID",
+                    description="Unique identifier for the chat session",
+                    default="",
+                    is_shared=True,
+                ),
+            ],
+        )
+        # Non-streaming client for rolling context summaries (see ContextWindowService)
+        summary_model = ChatOpenAI(
+            model=settings['chat_model'],
+            openai_api_key=settings['openai_api_key_unmasked'],
+            openai_api_base=openai_base_url(),
+            temperature=0,
+            max_tokens=Config.LLM_CONTEXT_SUMMARY_TOKENS * 2
+        )
+        attach_shared_clients(summary_model, settings['openai_api_key_unmasked'])
+        track_usage(summary_model, 'summary')
+        return {
+            'chat_model': chat_model,
+            'summary_model': summary_model,
+            'prompt': prompt,
+            'chain': chain,
+            'chain_with_history': chain_with_history
+        }
     
     def stream_ai_response(self, session_id: str, user_message: str, user_timing: dict = None) -> Generator[dict, None, None]:
         """
@@ -113,17 +166,17 @@ class LLMChatService:
             config = {"configurable": {"session_id": session_id}}
             conversation_ended = False
             
-            # Get current turn number for context
-            existing_turns = LLMConversationService.get_session_conversations(session_id)
+            # Get current turn number for context (also primes the history the chain reads below)
+            existing_turns = PostgreSQLHistory.load_turns(session_id)
             current_turn = len(existing_turns) + 1
             
-            # Append turn information to user message for LLM context
-            enhanced_message = f"{user_message} [Turn: {current_turn}/30]"
+            # Turn marker goes after the user input, keeping the prompt prefix identical across turns
+            turn_context = LLMService.build_turn_context(current_turn)
             
             # Stream directly (sync version - works reliably)
             chunk_count = 0
             for chunk in self.chain_with_history.stream(
-                {"user_input": enhanced_message},  # Include turn context
+                {"user_input": user_message, "turn_context": turn_context},
                 config=config
             ):
                 chunk_count += 1
@@ -157,17 +210,16 @@ class LLMChatService:
                 raise ValueError("No response received from OpenAI")
             
             # After streaming completes, save turn to database immediately
-            self._save_conversation_turn(session_id, user_message, response_content, settings, user_timing)
+            self._save_conversation_turn(session_id, user_message, response_content, settings, user_timing, current_turn)
             
         except Exception as e:
             # Show raw error - no hiding
             raise e
     
-    def _save_conversation_turn(self, session_id: str, user_message: str, ai_response: str, settings: Dict[str, Any], user_timing: dict = None) -> None:
+    def _save_conversation_turn(self, session_id: str, user_message: str, ai_response: str, settings: Dict[str, Any], user_timing: dict = None, turn_number: int = None) -> None:
         """Save conversation turn immediately using LLMConversationService"""
-        # Get current turn number
-        existing_turns = LLMConversationService.get_session_conversations(session_id)
-        turn_number = len(existing_turns) + 1
+        if turn_number is None:
+            turn_number = len(PostgreSQLHistory.load_turns(session_id)) + 1
         
         # Save turn to database
         LLMConversationService.create_conversation_turn(
@@ -178,11 +230,16 @@ class LLMChatService:
             ai_model_used=settings['chat_model'],
             user_timing=user_timing
         )
+        PostgreSQLHistory.invalidate(session_id)
         
         # If conversation ended, clear LangChain memory AND complete the session
         # More robust end conversation detection
         normalized_response = ai_response.lower().strip()
-        if "</end_conversation>" in normalized_response or "<end_conversation>" in normalized_response or "\\u003c/end_conversation\\u003e" in normalized_response:
+        conversation_ended = "</end_conversation>" in normalized_response or "<end_conversation>" in normalized_response or "\\u003c/end_conversation\\u003e" in normalized_response
+        if not conversation_ended:
+            # Fold old turns into the rolling summary before the context budget is reached
+            ContextWindowService.schedule_refresh(session_id, settings)
+        if conversation_ended:
             # Automatically complete the LLM assessment when conversation ends
             try:
                 from ...services.session.sessionManager import SessionManager
@@ -208,17 +265,17 @@ class LLMChatService:
             config = {"configurable": {"session_id": session_id}}
             conversation_ended = False
             
-            # Get current turn number for context (async)
-            existing_turns = await sync_to_async(LLMConversationService.get_session_conversations, thread_sensitive=False)(session_id)
+            # Get current turn number for context (async, primes the history the chain reads below)
+            existing_turns = await PostgreSQLHistory.aload_turns(session_id)
             current_turn = len(existing_turns) + 1
             
-            # Append turn information to user message for LLM context
-            enhanced_message = f"{user_message} [Turn: {current_turn}/30]"
+            # Turn marker goes after the user input, keeping the prompt prefix identical across turns
+            turn_context = LLMService.build_turn_context(current_turn)
             
             # Use LangChain's native async streaming
             chunk_count = 0
             async for chunk in self.chain_with_history.astream(
-                {"user_input": enhanced_message},
+                {"user_input": user_message, "turn_context": turn_context},
                 config=config
             ):
                 chunk_count += 1
@@ -253,7 +310,7 @@ class LLMChatService:
             
             # After streaming completes, save turn to database asynchronously
             await sync_to_async(self._save_conversation_turn, thread_sensitive=False)(
-                session_id, user_message, response_content, settings, user_timing
+                session_id, user_message, response_content, settings, user_timing, current_turn
             )
             
         except Exception as e:
@@ -293,8 +350,7 @@ class LLMChatService:
         Start a new conversation - prepares for initial greeting but doesn't hardcode it
         """
         try:
-            settings_list = LLMService.get_settings()
-            if not settings_list:
+            if not LLMService.get_active_settings():
                 return {
                     'status': 'error',
                     'message': 'No LLM settings configured. Please configure settings first.'
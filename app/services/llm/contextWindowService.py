@@ -0,0 +1,214 @@
+# app/services/llm/contextWindowService.py
+"""
+Context Window Service
+
+Keeps the chat history sent to the model inside a token budget:
+1. Turns already folded into the conversation's rolling summary are replaced by one summary
+   message; the remaining (recent) turns are sent verbatim. The fixed prompt prefix
+   (system prompt, instructions, greeting) is never touched.
+2. If the verbatim turns still exceed LLM_CONTEXT_TOKEN_BUDGET the oldest are dropped, so
+   every request stays within budget even while a summary refresh is pending
+3. After a turn is saved, once the verbatim turns pass REFRESH_AT of the budget the oldest
+   are folded into the summary (previous summary + those turns -> new summary) in the
+   background, leaving KEEP_AFTER of the budget verbatim - the summary moves in steps, not every turn
+"""
+
+import logging
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from ...config import Config
+from ...utils.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a chars/4 estimate
+    tiktoken = None
+
+REFRESH_AT = 0.8
+KEEP_AFTER = 0.5
+
+# Per-message overhead of the chat format (role + separators), as in OpenAI's counting guide
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+@lru_cache(maxsize=16)
+def _encoding_for(model: Optional[str]):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding('cl100k_base')
+    except KeyError:
+        # Newer model names than this tiktoken knows - o200k_base covers the gpt-4o/4.1 family
+        try:
+            return tiktoken.get_encoding('o200k_base')
+        except ValueError:
+            return tiktoken.get_encoding('cl100k_base')
+
+
+class ContextWindowService:
+    """Token-budgeted history shaping with a rolling summary"""
+
+    @staticmethod
+    def enabled() -> bool:
+        return Config.LLM_CONTEXT_TOKEN_BUDGET > 0
+
+    @staticmethod
+    def count_tokens(text: str, model: Optional[str] = None) -> int:
+        if not text:
+            return 0
+        encoding = _encoding_for(model)
+        if encoding is None:
+            return len(text) // 4 + 1
+        return len(encoding.encode(text, disallowed_special=()))
+
+    @staticmethod
+    def turn_tokens(turn: Dict[str, Any], model: Optional[str] = None) -> int:
+        """Tokens a stored turn costs as history (user + AI message)"""
+        return (ContextWindowService.count_tokens(turn.get('user_message', ''), model) +
+                ContextWindowService.count_tokens(turn.get('ai_message', ''), model) +
+                2 * MESSAGE_OVERHEAD_TOKENS)
+
+    @staticmethod
+    def _unsummarized(turns: List[Dict[str, Any]], summary: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        through_turn = (summary or {}).get('through_turn', 0)
+        return [turn for turn in turns if (turn.get('turn_number') or 0) > through_turn]
+
+    @staticmethod
+    def shape(turns: List[Dict[str, Any]], summary: Optional[Dict[str, Any]],
+              model: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        (summary to send or None, verbatim turns) for one request.
+
+        Everything up to summary['through_turn'] is represented by the summary; the newest turns
+        that fit in the budget (at least the last one) are kept as-is.
+        """
+        if not ContextWindowService.enabled():
+            return None, turns
+
+        budget = Config.LLM_CONTEXT_TOKEN_BUDGET
+        used = ContextWindowService.count_tokens((summary or {}).get('text', ''), model)
+        recent = ContextWindowService._unsummarized(turns, summary)
+
+        kept: List[Dict[str, Any]] = []
+        for turn in reversed(recent):
+            cost = ContextWindowService.turn_tokens(turn, model)
+            if kept and used + cost > budget:
+                break
+            kept.append(turn)
+            used += cost
+        kept.reverse()
+
+        dropped = len(recent) - len(kept)
+        if dropped:
+            # Summary refresh is behind (or failed) - stay within budget anyway
+            instrumentation.incr('llm.context.trimmed_turns', dropped)
+        instrumentation.incr('llm.context.requests')
+        instrumentation.incr('llm.context.history_tokens', used)
+        return (summary if summary and summary.get('text') else None), kept
+
+    @staticmethod
+    def needs_refresh(turns: List[Dict[str, Any]], summary: Optional[Dict[str, Any]],
+                      model: Optional[str] = None) -> bool:
+        if not ContextWindowService.enabled():
+            return False
+        recent = ContextWindowService._unsummarized(turns, summary)
+        tokens = sum(ContextWindowService.turn_tokens(turn, model) for turn in recent)
+        return len(recent) > 1 and tokens > Config.LLM_CONTEXT_TOKEN_BUDGET * REFRESH_AT
+
+    @staticmethod
+    def schedule_refresh(session_id: str, settings: Dict[str, Any]) -> bool:
+        """Fold old turns into the summary in the background if the verbatim turns are near the budget"""
+        if not ContextWindowService.enabled():
+            return False
+        with _refreshing_lock:
+            if session_id in _refreshing:
+                return False
+            _refreshing.add(session_id)
+
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    ContextWindowService.refresh_summary(session_id, settings)
+            except Exception as e:
+                instrumentation.incr('llm.context.summary_errors')
+                logger.warning(f"Context summary refresh failed for session {session_id}: {e}")
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(session_id)
+
+        threading.Thread(target=run, name=f'llm-summary-{session_id[:8]}', daemon=True).start()
+        return True
+
+    @staticmethod
+    def refresh_summary(session_id: str, settings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Fold the oldest verbatim turns into the stored summary. Returns the new summary (None if not needed)."""
+        from ..assessment.llmService import LLMConversationService
+        from .postgreSQLHistory import PostgreSQLHistory
+
+        model = None  # Same encoding the history shaping counts with
+        turns, summary = LLMConversationService.get_session_context(session_id)
+        if not ContextWindowService.needs_refresh(turns, summary, model):
+            return None
+
+        recent = ContextWindowService._unsummarized(turns, summary)
+        keep_tokens = Config.LLM_CONTEXT_TOKEN_BUDGET * KEEP_AFTER
+        # The newest turn always stays verbatim
+        split = len(recent) - 1
+        kept_tokens = ContextWindowService.turn_tokens(recent[-1], model)
+        while split > 1:
+            cost = ContextWindowService.turn_tokens(recent[split - 1], model)
+            if kept_tokens + cost > keep_tokens:
+                break
+            kept_tokens += cost
+            split -= 1
+        to_fold = recent[:split]
+
+        with instrumentation.stage('llm.context.summarize'):
+            text = ContextWindowService._summarize((summary or {}).get('text'), to_fold, settings)
+
+        new_summary = {
+            'text': text,
+            'through_turn': to_fold[-1].get('turn_number'),
+            'updated_at': datetime.utcnow().isoformat()
+        }
+        LLMConversationService.save_context_summary(session_id, new_summary)
+        PostgreSQLHistory.invalidate(session_id)
+        return new_summary
+
+    @staticmethod
+    def _summarize(previous: Optional[str], turns: List[Dict[str, Any]], settings: Dict[str, Any]) -> str:
+        from langchain_core.messages import HumanMessage, SystemMessage
+        from .chatService import LLMChatService
+
+        transcript = "\n".join(
+            f"[Giliran {turn.get('turn_number')}]\nTeman: {turn.get('user_message', '')}\nSindi: {turn.get('ai_message', '')}"
+            for turn in turns
+        )
+        request = (
+            (f"Ringkasan sebelumnya:\n{previous}\n\n" if previous else "") +
+            f"Giliran percakapan baru:\n{transcript}\n\n"
+            "Perbarui ringkasan dengan giliran baru di atas."
+        )
+        summary_model = LLMChatService.get_chain_components(settings)['summary_model']
+        response = summary_model.invoke([
+            SystemMessage(content=(
+                "Anda meringkas percakapan antara Sindi dan seorang teman yang sedang bercerita. "
+                "Pertahankan semua hal penting: aktivitas, perasaan, gejala beserta alasan, frekuensi dan tingkat keparahannya, "
+                "aspek yang sudah dibahas, dan hal yang belum terjawab. Tulis sebagai catatan singkat dalam bahasa Indonesia, "
+                f"maksimal {Config.LLM_CONTEXT_SUMMARY_TOKENS} token."
+            )),
+            HumanMessage(content=request)
+        ])
+        return response.content.strip()
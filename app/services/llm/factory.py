@@ -6,6 +6,7 @@ LLM Factory for creating ChatOpenAI instances based on session settings
 from typing import Optional, Dict, Any
 from langchain_openai import ChatOpenAI
 from ...model.admin.llm import LLMSettings
+from .openaiClient import attach_shared_clients, openai_base_url
 
 
 class LLMFactory:
@@ -38,11 +39,13 @@ class LLMFactory:
         config = LLMFactory.DEFAULT_STREAMING_CONFIG.copy()
         config.update(kwargs)
         
-        return ChatOpenAI(
+        chat_model = ChatOpenAI(
             api_key=llm_settings.get_api_key(),
+            base_url=openai_base_url(),
             model=llm_settings.chat_model,  # e.g. gpt-4o
             **config
         )
+        return attach_shared_clients(chat_model, llm_settings.get_api_key())
     
     @staticmethod
     def create_analysis_agent(llm_settings: LLMSettings, **kwargs) -> ChatOpenAI:
@@ -59,11 +62,13 @@ class LLMFactory:
         config = LLMFactory.DEFAULT_ANALYSIS_CONFIG.copy()
         config.update(kwargs)
         
-        return ChatOpenAI(
+        chat_model = ChatOpenAI(
             api_key=llm_settings.get_api_key(),
+            base_url=openai_base_url(),
             model=llm_settings.analysis_model,  
             **config
         )
+        return attach_shared_clients(chat_model, llm_settings.get_api_key())
     @staticmethod
     def validate_settings(llm_settings: LLMSettings) -> Dict[str, Any]:
         """
@@ -160,13 +165,15 @@ class LLMFactory:
         Returns:
             ChatOpenAI instance
         """
-        return ChatOpenAI(
+        chat_model = ChatOpenAI(
             api_key=api_key,
+            base_url=openai_base_url(),
             model=model,
             streaming=streaming,
             temperature=0.1
             **kwargs
         )
+        return attach_shared_clients(chat_model, api_key)
     
     @staticmethod
     def get_model_info(llm_settings: LLMSettings) -> Dict[str, Any]:
@@ -0,0 +1,202 @@
+# app/services/llm/loadTestHarness.py
+"""
+Chat Load Test Harness
+
+Drives N concurrent chat sessions through the SSE endpoint of a running server (normally with
+OPENAI_BASE_URL pointing at `flask llm-stub-server`) and reports:
+1. Time to first token and full-turn latency (p50/p95/max) as the client sees them
+2. Tokens/s per turn (SSE chunks after the first one, over the time they took)
+3. DB writes per turn from pg_stat_database deltas (PostgreSQL only, whole database - run
+   against an otherwise idle database)
+4. Worker utilization: CPU seconds of the server processes over wall time, read from /proc
+   (Linux, server on the same host)
+"""
+
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy import text
+
+from ...db import get_session
+from ..admin.llmService import LLMService
+
+STREAM_PATH = '/assessment/llm/stream-async/'
+
+USER_MESSAGES = [
+    "Halo, aku lagi agak capek akhir-akhir ini.",
+    "Kerjaan numpuk terus, tidur juga jadi nggak teratur.",
+    "Kadang aku ngerasa nggak semangat ngapa-ngapain.",
+    "Iya, udah beberapa minggu kayak gini sih.",
+    "Makasih ya udah mau dengerin aku."
+]
+
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+    return {'p50': _percentile(values, 50), 'p95': _percentile(values, 95),
+            'max': round(max(values), 3) if values else None}
+
+
+def pg_write_stats() -> Optional[Dict[str, int]]:
+    """Commits and rows written so far in this database (None when not on PostgreSQL)"""
+    try:
+        with get_session() as db:
+            row = db.execute(text(
+                "SELECT xact_commit, tup_inserted, tup_updated, tup_deleted "
+                "FROM pg_stat_database WHERE datname = current_database()"
+            )).first()
+    except Exception:
+        return None
+    if not row:
+        return None
+    return {'commits': row[0], 'rows_written': row[1] + row[2] + row[3]}
+
+
+def process_cpu_seconds(match: str) -> Dict[int, float]:
+    """{pid: user+system CPU seconds} of processes whose command line contains `match` (Linux /proc)"""
+    ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+    usage = {}
+    if not os.path.isdir('/proc'):
+        return usage
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                cmdline = f.read().replace(b'\0', b' ').decode(errors='replace')
+            if match not in cmdline:
+                continue
+            with open(f'/proc/{pid}/stat') as f:
+                # Fields after the parenthesised command name; utime/stime are fields 14/15
+                fields = f.read().rsplit(')', 1)[1].split()
+            usage[int(pid)] = (int(fields[11]) + int(fields[12])) / ticks
+        except (OSError, IndexError, ValueError):
+            continue
+    return usage
+
+
+class ChatLoadTest:
+    """One load-test run over pre-created sessions: [{'session_id', 'user_id'}, ...]"""
+
+    def __init__(self, base_url: str, targets: List[Dict[str, Any]], turns: int = 5,
+                 think_time: float = 0.0, timeout: float = 120.0, process_match: str = 'gunicorn'):
+        self.base_url = base_url.rstrip('/')
+        self.targets = targets
+        self.turns = turns
+        self.think_time = think_time
+        self.timeout = timeout
+        self.process_match = process_match
+        self._records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _run_turn(self, client: httpx.Client, session_id: str, user_id: int, message: str) -> Dict[str, Any]:
+        params = {
+            'session_id': session_id,
+            'message': message,
+            'user_token': LLMService.generate_stream_token(user_id, session_id)
+        }
+        record = {'session_id': session_id, 'ok': False, 'chunks': 0, 'ended': False}
+        started = time.monotonic()
+        first_chunk = None
+        try:
+            with client.stream('GET', self.base_url + STREAM_PATH, params=params, timeout=self.timeout) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line.startswith('data: '):
+                        continue  # Heartbeat comments and separators
+                    event = json.loads(line[len('data: '):])
+                    if event.get('type') == 'chunk' and event.get('data'):
+                        if first_chunk is None:
+                            first_chunk = time.monotonic()
+                        record['chunks'] += 1
+                    elif event.get('type') == 'complete':
+                        record['ok'] = True
+                        record['ended'] = bool(event.get('conversation_ended'))
+                        break
+                    elif event.get('type') == 'error':
+                        record['error'] = event.get('message')
+                        break
+        except Exception as e:
+            record['error'] = str(e)
+
+        finished = time.monotonic()
+        record['latency'] = finished - started
+        if first_chunk is not None:
+            record['ttft'] = first_chunk - started
+            streaming_time = finished - first_chunk
+            if record['chunks'] > 1 and streaming_time > 0:
+                record['tokens_per_second'] = (record['chunks'] - 1) / streaming_time
+        return record
+
+    def _run_session(self, target: Dict[str, Any]) -> None:
+        with httpx.Client() as client:
+            for turn in range(self.turns):
+                record = self._run_turn(client, target['session_id'], target['user_id'],
+                                        USER_MESSAGES[turn % len(USER_MESSAGES)])
+                with self._lock:
+                    self._records.append(record)
+                if not record['ok'] or record['ended']:
+                    break
+                if self.think_time:
+                    time.sleep(self.think_time)
+
+    def run(self) -> Dict[str, Any]:
+        db_before = pg_write_stats()
+        cpu_before = process_cpu_seconds(self.process_match)
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=max(1, len(self.targets)), thread_name_prefix='load-test') as pool:
+            list(pool.map(self._run_session, self.targets))
+
+        wall = time.monotonic() - started
+        cpu_after = process_cpu_seconds(self.process_match)
+        # pg_stat_database is flushed asynchronously - give the last turns' stats a moment
+        time.sleep(1.0)
+        db_after = pg_write_stats()
+
+        completed = [record for record in self._records if record['ok']]
+        report = {
+            'sessions': len(self.targets),
+            'turns_attempted': len(self._records),
+            'turns_completed': len(completed),
+            'turns_failed': len(self._records) - len(completed),
+            'conversations_ended': sum(1 for record in completed if record['ended']),
+            'wall_seconds': round(wall, 2),
+            'turns_per_second': round(len(completed) / wall, 2) if wall else None,
+            'ttft_seconds': _summary([record['ttft'] for record in completed if 'ttft' in record]),
+            'turn_latency_seconds': _summary([record['latency'] for record in completed]),
+            'tokens_per_second': _summary([record['tokens_per_second'] for record in completed
+                                           if 'tokens_per_second' in record]),
+            'errors': sorted({record['error'] for record in self._records if record.get('error')})[:10]
+        }
+
+        if db_before and db_after and completed:
+            report['db_per_turn'] = {
+                'commits': round((db_after['commits'] - db_before['commits']) / len(completed), 2),
+                'rows_written': round((db_after['rows_written'] - db_before['rows_written']) / len(completed), 2)
+            }
+
+        pids = set(cpu_before) & set(cpu_after)
+        if pids and wall:
+            busy = sum(cpu_after[pid] - cpu_before[pid] for pid in pids)
+            report['workers'] = {
+                'processes': len(pids),
+                'cpu_seconds': round(busy, 2),
+                'utilization': round(busy / (wall * len(pids)), 3)
+            }
+        if completed:
+            report['mean_chunks_per_turn'] = round(statistics.mean(record['chunks'] for record in completed), 1)
+        return report
@@ -0,0 +1,135 @@
+# app/services/llm/openaiClient.py
+"""
+OpenAI clients shared by the whole process
+
+1. OPENAI_BASE_URL points every client (LangChain, openai SDK and the plain HTTP calls) at an
+   OpenAI-compatible endpoint such as the local load-test stub
+2. One pooled httpx client per process (HTTP/2 when h2 is installed) carries every sync call,
+   and one async client carries the chat streams on the stream loop, so turns reuse warm
+   TCP/TLS connections instead of handshaking on each request
+3. openai SDK clients are cached per API key on top of those pools; ChatOpenAI instances get
+   them swapped in after construction (langchain-openai 0.0.2 hands a single http_client to
+   both its sync and async SDK clients, so it cannot be passed in directly)
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+import httpx
+import openai
+
+from ...config import Config
+
+DEFAULT_BASE_URL = 'https://api.openai.com/v1'
+
+# Per-request timeouts come from the SDK/caller; this only bounds the connect phase for plain calls
+DEFAULT_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+_lock = threading.Lock()
+_pid: Optional[int] = None
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_sync_clients: Dict[str, openai.OpenAI] = {}
+_async_clients: Dict[str, openai.AsyncOpenAI] = {}
+
+
+def openai_base_url() -> Optional[str]:
+    """Configured endpoint, or None to let each client use its default"""
+    return Config.OPENAI_BASE_URL.rstrip('/') or None
+
+
+def openai_url(path: str) -> str:
+    """Absolute URL of an API path such as 'chat/completions'"""
+    return f"{openai_base_url() or DEFAULT_BASE_URL}/{path.lstrip('/')}"
+
+
+def _http2_enabled() -> bool:
+    if not Config.OPENAI_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401  (httpx only negotiates HTTP/2 when it is installed)
+    except ImportError:
+        return False
+    return True
+
+
+def http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=Config.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=Config.OPENAI_KEEPALIVE_EXPIRY
+    )
+
+
+def _reset_after_fork() -> None:
+    """Pools must not be shared across forked workers - start fresh in a new process"""
+    global _pid, _http_client, _async_http_client
+    if _pid != os.getpid():
+        _pid = os.getpid()
+        _http_client = None
+        _async_http_client = None
+        _sync_clients.clear()
+        _async_clients.clear()
+
+
+def get_http_client() -> httpx.Client:
+    """The process-wide pooled sync client (thread-safe)"""
+    global _http_client
+    with _lock:
+        _reset_after_fork()
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.Client(http2=_http2_enabled(), limits=http_limits(), timeout=DEFAULT_TIMEOUT)
+        return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    The process-wide pooled async client. Its connections belong to the event loop that first
+    uses them - this is for the shared chat stream loop; other loops use new_async_http_client().
+    """
+    global _async_http_client
+    with _lock:
+        _reset_after_fork()
+        if _async_http_client is None or _async_http_client.is_closed:
+            _async_http_client = httpx.AsyncClient(http2=_http2_enabled(), limits=http_limits(),
+                                                   timeout=DEFAULT_TIMEOUT)
+        return _async_http_client
+
+
+def new_async_http_client() -> httpx.AsyncClient:
+    """A pooled async client owned (and closed) by the caller, e.g. one batch run's event loop"""
+    return httpx.AsyncClient(http2=_http2_enabled(), limits=http_limits(), timeout=DEFAULT_TIMEOUT)
+
+
+def get_openai_client(api_key: str) -> openai.OpenAI:
+    """openai.OpenAI for this key on the shared sync pool"""
+    http_client = get_http_client()
+    with _lock:
+        client = _sync_clients.get(api_key)
+        if client is None:
+            client = openai.OpenAI(api_key=api_key, base_url=openai_base_url(), http_client=http_client)
+            _sync_clients[api_key] = client
+        return client
+
+
+def get_async_openai_client(api_key: str) -> openai.AsyncOpenAI:
+    """openai.AsyncOpenAI for this key on the shared async pool"""
+    http_client = get_async_http_client()
+    with _lock:
+        client = _async_clients.get(api_key)
+        if client is None:
+            client = openai.AsyncOpenAI(api_key=api_key, base_url=openai_base_url(), http_client=http_client)
+            _async_clients[api_key] = client
+        return client
+
+
+def attach_shared_clients(chat_model, api_key: str):
+    """Point a ChatOpenAI's sync/async SDK clients at the shared pools, keeping its timeout/retries"""
+    options = {'max_retries': chat_model.max_retries}
+    if chat_model.request_timeout is not None:
+        options['timeout'] = chat_model.request_timeout
+    # with_options() copies the SDK client but keeps the same http_client (and so the same pool)
+    chat_model.client = get_openai_client(api_key).with_options(**options).chat.completions
+    chat_model.async_client = get_async_openai_client(api_key).with_options(**options).chat.completions
+    return chat_model
@@ -0,0 +1,185 @@
+# app/services/llm/openaiStub.py
+"""
+OpenAI Stub Server
+
+Local stand-in for the chat-completions API, for load tests that must not pay OpenAI or touch
+the network (run it with `flask llm-stub-server`, point OPENAI_BASE_URL at it):
+1. POST /v1/chat/completions streams SSE chunks at a configurable token rate after a
+   configurable first-token delay; stream_options.include_usage adds the final usage chunk
+2. The reply ends with <end_conversation> once the [Turn: n/..] marker reaches end_after_turns
+   (or at random with end_probability), so chats finish like real ones
+3. Non-streamed JSON-mode requests (conversation analysis) get a well-formed score for every
+   aspect found in the prompt's JSON example
+4. GET /v1/models lists a few model ids (settings page / API key checks)
+"""
+
+import json
+import random
+import re
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+FILLER_WORDS = (
+    "oh gitu ya, aku ngerti kok rasanya. boleh cerita lebih lanjut nggak, "
+    "gimana perasaan kamu akhir-akhir ini? aku di sini buat dengerin kamu, "
+    "pelan-pelan aja ceritanya, nggak usah buru-buru."
+).split()
+
+END_MARKER = "<end_conversation>"
+TURN_PATTERN = re.compile(r"\[Turn: (\d+)/\d+\]")
+ASPECT_KEY_PATTERN = re.compile(r'"([^"]+)":\s*\{\s*"penjelasan"')
+
+
+class StubBehavior:
+    """Knobs for the stub's responses"""
+
+    def __init__(self, tokens_per_second: float = 40.0, first_token_delay: float = 0.3,
+                 reply_tokens: int = 40, end_after_turns: int = 10, end_probability: float = 0.0,
+                 models: Optional[List[str]] = None):
+        self.tokens_per_second = tokens_per_second
+        self.first_token_delay = first_token_delay
+        self.reply_tokens = reply_tokens
+        self.end_after_turns = end_after_turns
+        self.end_probability = end_probability
+        self.models = models or ['gpt-4o', 'gpt-4o-mini', 'gpt-4.1-mini']
+
+    def should_end(self, messages: List[Dict[str, Any]]) -> bool:
+        turn = None
+        for message in reversed(messages):
+            match = TURN_PATTERN.search(str(message.get('content') or ''))
+            if match:
+                turn = int(match.group(1))
+                break
+        if turn is None:
+            turn = sum(1 for message in messages if message.get('role') == 'user')
+        if self.end_after_turns and turn >= self.end_after_turns:
+            return True
+        return random.random() < self.end_probability
+
+    def reply_words(self, end: bool) -> List[str]:
+        words = [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(self.reply_tokens)]
+        if end:
+            words.append(END_MARKER)
+        return words
+
+
+def _estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(len(str(message.get('content') or '')) for message in messages) // 4 + 1
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    behavior: StubBehavior = StubBehavior()
+
+    def log_message(self, format, *args):
+        pass  # One line per request drowns the console under load
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json({'object': 'list', 'data': [
+                {'id': model, 'object': 'model', 'created': 0, 'owned_by': 'stub'} for model in self.behavior.models
+            ]})
+        else:
+            self._send_json({'error': {'message': f'Unknown path {self.path}'}}, 404)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json({'error': {'message': f'Unknown path {self.path}'}}, 404)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json({'error': {'message': 'Invalid JSON body'}}, 400)
+            return
+
+        messages = request.get('messages') or []
+        if request.get('stream'):
+            self._stream(request, messages)
+        else:
+            self._complete(request, messages)
+
+    def _usage(self, messages: List[Dict[str, Any]], completion_tokens: int) -> Dict[str, Any]:
+        prompt_tokens = _estimate_tokens(messages)
+        return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+                'prompt_tokens_details': {'cached_tokens': 0}}
+
+    def _complete(self, request: Dict[str, Any], messages: List[Dict[str, Any]]) -> None:
+        behavior = self.behavior
+        if (request.get('response_format') or {}).get('type') == 'json_object':
+            prompt = str(messages[-1].get('content') or '') if messages else ''
+            content = json.dumps({
+                key: {'penjelasan': 'Jawaban stub untuk uji beban.', 'skor': random.randint(0, 3)}
+                for key in dict.fromkeys(ASPECT_KEY_PATTERN.findall(prompt))
+            }, ensure_ascii=False)
+        else:
+            content = ' '.join(behavior.reply_words(behavior.should_end(messages)))
+
+        completion_tokens = len(content) // 4 + 1
+        time.sleep(behavior.first_token_delay + completion_tokens / max(behavior.tokens_per_second, 1e-3))
+        self._send_json({
+            'id': f'chatcmpl-stub-{uuid.uuid4().hex[:12]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': self._usage(messages, completion_tokens)
+        })
+
+    def _stream(self, request: Dict[str, Any], messages: List[Dict[str, Any]]) -> None:
+        behavior = self.behavior
+        completion_id = f'chatcmpl-stub-{uuid.uuid4().hex[:12]}'
+        created = int(time.time())
+        model = request.get('model', 'stub')
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+            return {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                    'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]}
+
+        def send(payload) -> None:
+            data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+            self.wfile.write(f"data: {data}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        words = behavior.reply_words(behavior.should_end(messages))
+        interval = 1.0 / max(behavior.tokens_per_second, 1e-3)
+        try:
+            time.sleep(behavior.first_token_delay)
+            send(chunk({'role': 'assistant', 'content': ''}))
+            for index, word in enumerate(words):
+                send(chunk({'content': word if index == 0 else f' {word}'}))
+                time.sleep(interval)
+            send(chunk({}, 'stop'))
+            if (request.get('stream_options') or {}).get('include_usage'):
+                send({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                      'choices': [], 'usage': self._usage(messages, len(words))})
+            send('[DONE]')
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client cancelled the stream
+
+
+def build_stub_server(host: str = '127.0.0.1', port: int = 8090,
+                    behavior: Optional[StubBehavior] = None) -> ThreadingHTTPServer:
+    """Build the stub server (one thread per connection); call serve_forever() on the result"""
+    handler = type('StubHandler', (_StubHandler,), {'behavior': behavior or StubBehavior()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -1,51 +1,97 @@
 # app/services/llm/postgreSQLHistory.py
-import asyncio
-from typing import List
+import logging
+from typing import Any, Dict, List, Optional
 from asgiref.sync import sync_to_async
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from app.services.assessment.llmService import LLMConversationService
-from ...db import get_session
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from ...utils.ttl_cache import TTLCache
+from ..assessment.llmService import LLMConversationService
+from .contextWindowService import ContextWindowService
+
+logger = logging.getLogger(__name__)
+
+# Turns + rolling summary loaded at the start of a chat turn, so the chain's history read in the
+# same turn is free. Every turn re-primes its entry (and saving a turn drops it), so the short TTL only matters for
+# callers that read history without loading it first.
+_turns_cache = TTLCache(maxsize=1024, ttl=30)
+
 
 class PostgreSQLHistory(BaseChatMessageHistory):
-    """PostgreSQL implementation of chat message history - zero memory usage."""
-    
+    """PostgreSQL implementation of chat message history - turns come from the llm_turns table."""
+
     def __init__(self, session_id: str):
         self.session_id = session_id
 
+    @staticmethod
+    def load_context(session_id: str) -> Dict[str, Any]:
+        """Read a session's turns and context summary and cache them for this turn"""
+        turns, summary = LLMConversationService.get_session_context(session_id)
+        context = {'turns': turns, 'summary': summary}
+        _turns_cache.set(session_id, context)
+        return context
+
+    @staticmethod
+    def load_turns(session_id: str) -> List[Dict[str, Any]]:
+        return PostgreSQLHistory.load_context(session_id)['turns']
+
+    @staticmethod
+    async def aload_turns(session_id: str) -> List[Dict[str, Any]]:
+        """load_turns for async callers - the query runs in a worker thread, never on the event loop"""
+        return await sync_to_async(PostgreSQLHistory.load_turns, thread_sensitive=False)(session_id)
+
+    @staticmethod
+    def invalidate(session_id: Optional[str] = None) -> None:
+        """Drop cached turns for one session (a turn was saved or cleared), or all sessions"""
+        if session_id:
+            _turns_cache.invalidate(session_id)
+        else:
+            _turns_cache.clear()
+
+    @staticmethod
+    def turns_to_messages(turns: List[Dict[str, Any]]) -> List[BaseMessage]:
+        """Convert stored turns to LangChain messages in turn order"""
+        langchain_messages = []
+        for turn in sorted(turns, key=lambda x: x.get('turn_number', 0)):
+            user_msg = turn.get('user_message', '')
+            ai_msg = turn.get('ai_message', '')
+
+            if user_msg:
+                langchain_messages.append(HumanMessage(content=user_msg))
+            if ai_msg:
+                langchain_messages.append(AIMessage(content=ai_msg))
+        return langchain_messages
+
+    @staticmethod
+    def context_to_messages(context: Dict[str, Any]) -> List[BaseMessage]:
+        """History within the token budget: rolling summary (if any) followed by the recent turns"""
+        summary, turns = ContextWindowService.shape(context['turns'], context.get('summary'))
+        messages = []
+        if summary:
+            messages.append(SystemMessage(
+                content=f"Ringkasan percakapan sebelumnya (giliran 1-{summary['through_turn']}):\n{summary['text']}"
+            ))
+        return messages + PostgreSQLHistory.turns_to_messages(turns)
+
+    def _cached_context(self) -> Optional[Dict[str, Any]]:
+        return _turns_cache.get(self.session_id)
+
     @property
     def messages(self) -> List[BaseMessage]:
-        """Load conversation history from PostgreSQL and convert to LangChain format"""
-        # Use sync_to_async to prevent blocking
-        return asyncio.run(self._get_messages_async())
-    
-    @sync_to_async
-    def _get_messages_sync(self) -> List[BaseMessage]:
-        """Synchronous implementation wrapped for async"""
-        try:
-            # Load conversation turns from PostgreSQL
-            turns = LLMConversationService.get_session_conversations(self.session_id)
-            
-            # Convert to LangChain message format
-            langchain_messages = []
-            for turn in sorted(turns, key=lambda x: x.get('turn_number', 0)):
-                user_msg = turn.get('user_message', '')
-                ai_msg = turn.get('ai_message', '')
-                
-                if user_msg:
-                    langchain_messages.append(HumanMessage(content=user_msg))
-                if ai_msg:
-                    langchain_messages.append(AIMessage(content=ai_msg))
-            
-            return langchain_messages
-        except Exception as e:
-            # Return empty list if error (new conversation)
-            print(f"Warning: Failed to load conversation history for {self.session_id}: {e}")
-            return []
-    
-    async def _get_messages_async(self) -> List[BaseMessage]:
-        """Async wrapper for message loading"""
-        return await self._get_messages_sync()
+        """
+        Conversation history as LangChain messages (cached context when this turn already loaded it)
+
+        langchain-core 0.1.23 reads this synchronously in both invoke and astream, so the async
+        chat path primes the cache with aload_turns() (off the event loop) before running the chain.
+        """
+        context = self._cached_context()
+        if context is None:
+            try:
+                context = PostgreSQLHistory.load_context(self.session_id)
+            except Exception as e:
+                # Return empty list if error (new conversation)
+                logger.warning(f"Failed to load conversation history for {self.session_id}: {e}")
+                return []
+        return PostgreSQLHistory.context_to_messages(context)
 
     def add_messages(self, messages: List[BaseMessage]) -> None:
         """Add messages to PostgreSQL - LangChain calls this during conversation"""
@@ -56,28 +102,14 @@ class PostgreSQLHistory(BaseChatMessageHistory):
 
     def clear(self) -> None:
         """Clear all conversation history for this session"""
-        # Use sync_to_async to prevent blocking
-        asyncio.run(self._clear_async())
-    
-    @sync_to_async
-    def _clear_sync(self) -> None:
-        """Synchronous implementation of clear wrapped for async"""
         try:
-            # Clear conversation turns in PostgreSQL
-            with get_session() as db:
-                from ...model.assessment.sessions import LLMConversation
-                conversation_record = db.query(LLMConversation).filter_by(session_id=self.session_id).first()
-                if conversation_record:
-                    conversation_record.conversation_history = {"turns": []}
-                    db.commit()
+            LLMConversationService.clear_conversation_turns(self.session_id)
         except Exception as e:
-            print(f"Warning: Failed to clear conversation history for {self.session_id}: {e}")
-    
-    async def _clear_async(self) -> None:
-        """Async wrapper for clearing history"""
-        await self._clear_sync()
+            logger.warning(f"Failed to clear conversation history for {self.session_id}: {e}")
+        finally:
+            PostgreSQLHistory.invalidate(self.session_id)
 
 
 def get_postgresql_history_by_session_id(session_id: str) -> BaseChatMessageHistory:
     """Factory function to get PostgreSQL-based chat history by session ID"""
-    return PostgreSQLHistory(session_id)
\ No newline at end of file
+    return PostgreSQLHistory(session_id)
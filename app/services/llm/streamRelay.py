@@ -0,0 +1,146 @@
+# app/services/llm/streamRelay.py
+"""
+Chat Stream Relay
+
+Runs one chat turn's LLM stream in the background and hands chunks to the SSE response
+through a queue, so heartbeats go out on a timer instead of between chunks:
+1. Under gevent workers (the chat stream instance, gunicorn.stream.conf.py) the sync stream
+   runs in a greenlet and the SSE generator's queue wait yields to the hub, so one worker
+   holds hundreds of open chats
+2. Under threaded workers (gthread) every chat's astream_ai_response runs as a task on one
+   shared per-process event loop, but the WSGI request thread still blocks on the queue for
+   the whole stream - each open chat pins a worker thread, as before the relay
+3. A client that disconnects cancels its producer, closing the upstream OpenAI stream
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from typing import Any, Iterator, Optional, Tuple
+
+from flask import current_app
+
+from ...config import Config
+from ...utils.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+_thread_worker_warned = False
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def gevent_active() -> bool:
+    """True when running under a gevent worker (sockets monkey-patched)"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def get_stream_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide event loop chat streams run on (started on first use)"""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='llm-stream-loop', daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+class ChatStreamRelay:
+    """Background producer + heartbeat-aware consumer for one streamed chat turn"""
+
+    def __init__(self, session_id: str, message: str, user_timing: Optional[dict] = None,
+                 heartbeat_interval: Optional[float] = None):
+        self.session_id = session_id
+        self.message = message
+        self.user_timing = user_timing
+        self.heartbeat_interval = heartbeat_interval or Config.SSE_HEARTBEAT_SECONDS
+        self._app = current_app._get_current_object()
+        self._queue: queue.Queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self._future = None
+
+    def start(self) -> 'ChatStreamRelay':
+        global _thread_worker_warned
+        if gevent_active():
+            import gevent
+            gevent.spawn(self._produce_sync)
+        else:
+            if not _thread_worker_warned:
+                _thread_worker_warned = True
+                logger.warning("Chat streams are served by a threaded worker - each open chat holds a worker "
+                               "thread; route /assessment/llm/stream-async/ to gunicorn.stream.conf.py (gevent)")
+            self._future = asyncio.run_coroutine_threadsafe(self._produce_async(), get_stream_loop())
+        instrumentation.incr('llm.stream.started')
+        return self
+
+    def cancel(self) -> None:
+        """Stop the producer (client went away)"""
+        self._cancelled.set()
+        if self._future is not None:
+            self._future.cancel()
+
+    def events(self) -> Iterator[Tuple[str, Any]]:
+        """
+        ('chunk', {'content', 'conversation_ended'}) as they arrive, ('heartbeat', None) whenever
+        heartbeat_interval passes without one. Re-raises the producer's error; ends after the turn is saved.
+        """
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.heartbeat_interval)
+                except queue.Empty:
+                    yield 'heartbeat', None
+                    continue
+
+                if item is _DONE:
+                    return
+                kind, payload = item
+                if kind == 'error':
+                    raise payload
+                yield kind, payload
+        finally:
+            # Generator closed early (client disconnect) or finished - either way the producer can stop
+            self.cancel()
+
+    def _produce_sync(self) -> None:
+        from .chatService import LLMChatService
+        try:
+            with self._app.app_context():
+                with instrumentation.stage('llm.stream.sync'):
+                    stream = LLMChatService().stream_ai_response(self.session_id, self.message, self.user_timing)
+                    try:
+                        for chunk in stream:
+                            if self._cancelled.is_set():
+                                instrumentation.incr('llm.stream.cancelled')
+                                break
+                            self._queue.put(('chunk', chunk))
+                    finally:
+                        stream.close()
+        except Exception as e:
+            # Raised to the SSE response by events(), which reports it
+            self._queue.put(('error', e))
+        finally:
+            self._queue.put(_DONE)
+
+    async def _produce_async(self) -> None:
+        from .chatService import LLMChatService
+        try:
+            with self._app.app_context():
+                with instrumentation.stage('llm.stream.async'):
+                    async for chunk in LLMChatService().astream_ai_response(self.session_id, self.message, self.user_timing):
+                        self._queue.put(('chunk', chunk))
+        except asyncio.CancelledError:
+            instrumentation.incr('llm.stream.cancelled')
+        except Exception as e:
+            # Raised to the SSE response by events(), which reports it
+            self._queue.put(('error', e))
+        finally:
+            self._queue.put(_DONE)
@@ -0,0 +1,112 @@
+# app/services/llm/usageRecorder.py
+"""
+OpenAI usage recording
+
+langchain-openai drops the usage chunk of streamed responses, so the OpenAI completions client
+inside each ChatOpenAI is wrapped: responses pass through untouched and their usage (prompt,
+cached prompt and completion tokens) is added to instrumentation counters. The prompt-cache
+hit rate is llm.usage.<source>.cached_tokens / llm.usage.<source>.prompt_tokens.
+"""
+
+import logging
+from typing import Any
+
+from ...utils.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# Ask OpenAI for a final usage chunk on streamed responses (only valid with stream=True)
+STREAM_USAGE_KWARGS = {'stream_options': {'include_usage': True}}
+
+
+def record_usage(usage: Any, source: str) -> None:
+    prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached_tokens = (getattr(details, 'cached_tokens', 0) or 0) if details else 0
+
+    instrumentation.incr(f'llm.usage.{source}.responses')
+    instrumentation.incr(f'llm.usage.{source}.prompt_tokens', prompt_tokens)
+    instrumentation.incr(f'llm.usage.{source}.cached_tokens', cached_tokens)
+    instrumentation.incr(f'llm.usage.{source}.completion_tokens', completion_tokens)
+    instrumentation.debug(logger, "%s usage: prompt=%s cached=%s completion=%s",
+                          source, prompt_tokens, cached_tokens, completion_tokens)
+
+
+class _UsageRecordingStream:
+    def __init__(self, stream, source: str):
+        self._stream = stream
+        self._source = source
+
+    def __iter__(self):
+        for chunk in self._stream:
+            usage = getattr(chunk, 'usage', None)
+            if usage:
+                record_usage(usage, self._source)
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _AsyncUsageRecordingStream:
+    def __init__(self, stream, source: str):
+        self._stream = stream
+        self._source = source
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            usage = getattr(chunk, 'usage', None)
+            if usage:
+                record_usage(usage, self._source)
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class UsageRecordingCompletions:
+    """Stands in for openai's chat.completions resource"""
+
+    def __init__(self, completions, source: str):
+        self._completions = completions
+        self._source = source
+
+    def create(self, *args, **kwargs):
+        result = self._completions.create(*args, **kwargs)
+        if kwargs.get('stream'):
+            return _UsageRecordingStream(result, self._source)
+        if getattr(result, 'usage', None):
+            record_usage(result.usage, self._source)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+class AsyncUsageRecordingCompletions:
+    """Stands in for openai's async chat.completions resource"""
+
+    def __init__(self, completions, source: str):
+        self._completions = completions
+        self._source = source
+
+    async def create(self, *args, **kwargs):
+        result = await self._completions.create(*args, **kwargs)
+        if kwargs.get('stream'):
+            return _AsyncUsageRecordingStream(result, self._source)
+        if getattr(result, 'usage', None):
+            record_usage(result.usage, self._source)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+def track_usage(chat_model, source: str):
+    """Wrap a ChatOpenAI's sync/async completions clients so usage is recorded under `source`"""
+    if getattr(chat_model, 'client', None) is not None:
+        chat_model.client = UsageRecordingCompletions(chat_model.client, source)
+    if getattr(chat_model, 'async_client', None) is not None:
+        chat_model.async_client = AsyncUsageRecordingCompletions(chat_model.async_client, source)
+    return chat_model
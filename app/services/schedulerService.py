@@ -72,6 +72,18 @@ class SchedulerService:
         # Job 4: Facial Analysis Queue Processor - Process facial analysis tasks sequentially (every 5 seconds)
         self._add_facial_analysis_queue_processor_job(app)
 
+        # Job 5: Export Queue Processor - Build background export archives (every 10 seconds)
+        self._add_export_queue_processor_job(app)
+
+        # Job 6: Export Job Cleanup - Daily removal of old export archives
+        self._add_export_cleanup_job(app)
+
+        # Job 7: LLM Analysis Batch Processor - Run queued batch analyses (every 10 seconds)
+        self._add_analysis_batch_processor_job(app)
+
+        # Job 8: Pending Frame Reconciliation - Settle frames whose writer died (every 5 minutes)
+        self._add_frame_reconcile_job(app)
+
         self._jobs_registered = True
         logger.info("All scheduled jobs registered successfully")
     
@@ -137,6 +149,121 @@ class SchedulerService:
         )
         logger.info("Facial analysis queue processor scheduled to run every 10 seconds")
 
+    def _add_export_queue_processor_job(self, app):
+        """Add high-frequency job to build queued export archives one at a time"""
+        self.scheduler.add_job(
+            func=self._execute_export_queue_processor,
+            trigger=IntervalTrigger(seconds=10),  # Check queue every 10 seconds
+            id='export_queue_processor',
+            name='Export Queue Processor',
+            replace_existing=True,
+            max_instances=1,  # One archive per worker at a time
+            misfire_grace_time=15,
+            kwargs={'app': app}
+        )
+        logger.info("Export queue processor scheduled to run every 10 seconds")
+
+    def _add_export_cleanup_job(self, app):
+        """Add daily job to remove old export jobs and their archives"""
+        self.scheduler.add_job(
+            func=self._execute_export_cleanup,
+            trigger=CronTrigger(hour=2, minute=30),  # 2:30 AM daily
+            id='export_job_cleanup',
+            name='Export Job Cleanup Job',
+            replace_existing=True,
+            max_instances=1,
+            misfire_grace_time=3600,  # 1 hour grace time
+            kwargs={'app': app}
+        )
+        logger.info("Export job cleanup scheduled daily at 02:30")
+
+    def _add_analysis_batch_processor_job(self, app):
+        """Add high-frequency job to run queued LLM analysis batches one at a time"""
+        self.scheduler.add_job(
+            func=self._execute_analysis_batch_processor,
+            trigger=IntervalTrigger(seconds=10),  # Check queue every 10 seconds
+            id='analysis_batch_processor',
+            name='LLM Analysis Batch Processor',
+            replace_existing=True,
+            max_instances=1,  # One batch per worker at a time (each batch is concurrent internally)
+            misfire_grace_time=15,
+            kwargs={'app': app}
+        )
+        logger.info("LLM analysis batch processor scheduled to run every 10 seconds")
+
+    def _add_frame_reconcile_job(self, app):
+        """Add job that marks frames left PENDING by a dead ingest writer WRITTEN or FAILED"""
+        self.scheduler.add_job(
+            func=self._execute_frame_reconcile,
+            trigger=IntervalTrigger(minutes=5),
+            id='pending_frame_reconcile',
+            name='Pending Frame Reconciliation',
+            replace_existing=True,
+            max_instances=1,
+            misfire_grace_time=300,
+            kwargs={'app': app}
+        )
+        logger.info("Pending frame reconciliation scheduled every 5 minutes")
+
+    def _execute_frame_reconcile(self, app):
+        """Execute pending frame reconciliation within Flask app context"""
+        with app.app_context():
+            try:
+                from .camera.cameraStorageService import CameraStorageService
+
+                CameraStorageService.reconcile_pending_frames()
+
+            except Exception as e:
+                logger.error(f"Pending frame reconciliation failed: {e}")
+                # Don't re-raise to prevent scheduler from stopping
+
+    def _execute_analysis_batch_processor(self, app):
+        """Execute the analysis batch processor (runs at most one batch per run)"""
+        with app.app_context():
+            try:
+                from .llm.analysisBatchService import LLMAnalysisBatchService
+
+                result = LLMAnalysisBatchService.process_queue()
+
+                if result['processed'] > 0:
+                    logger.info(f"[ANALYSIS-BATCH] Ran batch {result['batch_id']}")
+
+            except Exception as e:
+                logger.error(f"Analysis batch processor failed: {e}")
+                # Don't re-raise to prevent scheduler from stopping
+
+    def _execute_export_queue_processor(self, app):
+        """Execute the export queue processor (builds at most one archive per run)"""
+        with app.app_context():
+            try:
+                from .admin.exportJobService import ExportJobService
+
+                result = ExportJobService.process_queue()
+
+                if result['processed'] > 0:
+                    logger.info(f"[EXPORT-QUEUE] Built export job {result['job_id']}")
+
+            except Exception as e:
+                logger.error(f"Export queue processor failed: {e}")
+                # Don't re-raise to prevent scheduler from stopping
+
+    def _execute_export_cleanup(self, app):
+        """Execute export job cleanup within Flask app context"""
+        with app.app_context():
+            try:
+                from .admin.exportJobService import ExportJobService
+
+                days = app.config.get('EXPORT_JOB_RETENTION_DAYS', 3)
+                removed_count = ExportJobService.clean_old_jobs(days=days)
+
+                logger.info(f"Export job cleanup completed: {removed_count} old jobs removed")
+                return {'removed_jobs': removed_count}
+
+            except Exception as e:
+                logger.error(f"Export job cleanup failed: {e}")
+                # Don't re-raise to prevent scheduler from stopping
+                return {'removed_jobs': 0, 'error': str(e)}
+
     def _execute_facial_analysis_queue_processor(self, app):
         """
         Execute the facial analysis task queue processor.
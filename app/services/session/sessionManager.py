@@ -281,10 +281,11 @@ class SessionManager:
 
             if clear_data:
                 # Clear all assessment data to restart fresh
-                from ...model.assessment.sessions import PHQResponse, LLMConversation
+                from ...model.assessment.sessions import PHQResponse, LLMConversation, LLMTurn
 
                 # Delete existing responses
                 db.query(PHQResponse).filter_by(session_id=session_id).delete()
+                db.query(LLMTurn).filter_by(session_id=session_id).delete()
                 db.query(LLMConversation).filter_by(session_id=session_id).delete()
 
                 # Clear session assessment data
@@ -492,7 +493,7 @@ class SessionManager:
     def reset_session_to_new_attempt(session_id: str, reason: str = "MANUAL_RESET") -> Dict[str, Any]:
         """Reset session to new attempt"""
         with get_session() as db:
-            from ...model.assessment.sessions import PHQResponse, LLMConversation, CameraCapture
+            from ...model.assessment.sessions import PHQResponse, LLMConversation, LLMTurn, CameraCapture
             
             session = db.query(AssessmentSession).filter_by(id=session_id).first()
             if not session:
@@ -500,6 +501,7 @@ class SessionManager:
             
             # Clear all assessment data but keep the session record
             db.query(PHQResponse).filter_by(session_id=session_id).delete()
+            db.query(LLMTurn).filter_by(session_id=session_id).delete()
             db.query(LLMConversation).filter_by(session_id=session_id).delete()
             db.query(CameraCapture).filter_by(session_id=session_id).delete()
             CameraStorageService.cleanup_session_captures(session_id)
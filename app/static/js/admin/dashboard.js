@@ -951,6 +951,72 @@ function downloadAllSessions() {
   }, 2000);
 }
 
+// Build the all-sessions archive as a background job, then download the finished file
+function startAllSessionsExportJob(link) {
+  const originalText = link.innerHTML;
+  const resetLink = () => {
+    link.innerHTML = originalText;
+    link.classList.remove("pointer-events-none", "opacity-75");
+  };
+
+  link.classList.add("pointer-events-none", "opacity-75");
+  link.innerHTML = "Queuing export...";
+
+  fetch(`${link.getAttribute("href")}?background=1`)
+    .then((response) => response.json())
+    .then((job) => {
+      if (!job.job_id) throw new Error(job.error || "Failed to queue export");
+      pollExportJob(job.job_id, link, resetLink);
+    })
+    .catch((error) => {
+      resetLink();
+      alert("Export failed:\n\n" + error.message);
+    });
+
+  return false; // Keep the plain link as a no-JS fallback
+}
+
+// Poll an export job every 5 seconds until it completes (up to 2 hours)
+function pollExportJob(jobId, link, onDone, maxPollCount = 1440) {
+  let pollCount = 0;
+
+  const pollInterval = setInterval(async () => {
+    pollCount++;
+
+    try {
+      const result = await fetch(`/admin/export/jobs/${jobId}`).then((r) => r.json());
+      const job = result.status === "OLKORECT" ? result.data : null;
+      if (!job) throw new Error(result.error || "Export job not found");
+
+      if (job.status === "COMPLETED") {
+        clearInterval(pollInterval);
+        onDone();
+        window.location.href = `/admin/export/jobs/${jobId}/download`;
+        return;
+      }
+      if (job.status === "FAILED") {
+        clearInterval(pollInterval);
+        onDone();
+        alert("Export failed:\n\n" + (job.error || "Unknown error"));
+        return;
+      }
+
+      const sizeMb = ((job.progress.bytes_written || 0) / (1024 * 1024)).toFixed(1);
+      link.innerHTML = job.status === "PENDING" ? "Waiting in queue..." : `Building export... ${job.progress.percent}% (${sizeMb} MB)`;
+
+      if (pollCount >= maxPollCount) {
+        clearInterval(pollInterval);
+        onDone();
+        alert(`Export is still running. Download it later from /admin/export/jobs/${jobId}/download`);
+      }
+    } catch (error) {
+      clearInterval(pollInterval);
+      onDone();
+      alert("Error checking export status:\n\n" + error.message);
+    }
+  }, 5000);
+}
+
 // NOTE: Facial analysis functionality has been moved to facial-analysis-dashboard.js
 // Session exports functionality has been moved to session-exports-dashboard.js
 // These separate modules are loaded in the dashboard template
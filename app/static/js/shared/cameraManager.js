@@ -13,6 +13,8 @@ class CameraManager {
     this.isInitialized = false;
     this.intervalTimer = null;
     this.currentResponseId = null;
+    this.pendingFrames = [];
+    this.uploadInFlight = null;
 
     // Bind methods to preserve context
     this.captureImage = this.captureImage.bind(this);
@@ -188,20 +190,44 @@ class CameraManager {
   }
 
   async uploadBlob(blob, trigger, timing) {
-    const formData = new FormData();
-    const timestamp = new Date().toISOString().replace(/[:.]/g, "-");
-    const filename = `capture_${timestamp}.jpg`;
+    this.pendingFrames.push({ blob, trigger, timing });
+    await this.flushPendingFrames();
 
-    formData.append("image", blob, filename);
-    formData.append("trigger", trigger);
+    return {
+      success: true,
+      message: "Frame uploaded via batched ingestion",
+    };
+  }
 
-    // Add timing data if provided
-    if (timing) {
-      formData.append("timing", JSON.stringify(timing));
+  // Frames captured while a request is in flight ride along in the next one
+  async flushPendingFrames() {
+    while (this.uploadInFlight) {
+      await this.uploadInFlight.catch(() => {});
+    }
+    if (this.pendingFrames.length === 0) {
+      return;
     }
 
+    const frames = this.pendingFrames.splice(0);
+    this.uploadInFlight = this.sendFrameBatch(frames).finally(() => {
+      this.uploadInFlight = null;
+    });
+    await this.uploadInFlight;
+  }
+
+  async sendFrameBatch(frames) {
+    const formData = new FormData();
+
+    frames.forEach((frame) => {
+      const timestamp = new Date().toISOString().replace(/[:.]/g, "-");
+      formData.append("images", frame.blob, `capture_${timestamp}.jpg`);
+      formData.append("trigger", frame.trigger);
+      // Keep per-frame fields index-aligned with images
+      formData.append("timing", frame.timing ? JSON.stringify(frame.timing) : "");
+    });
+
     const response = await fetch(
-      `/assessment/camera/upload-single/${this.sessionId}`,
+      `/assessment/camera/upload-batch/${this.sessionId}`,
       {
         method: "POST",
         body: formData,
@@ -214,10 +240,7 @@ class CameraManager {
       throw new Error(result.error || "Upload failed");
     }
 
-    return {
-      success: true,
-      message: "File uploaded and added to database incrementally",
-    };
+    return result;
   }
 
   // Smart trigger methods that only work if enabled in settings
@@ -268,6 +291,7 @@ class CameraManager {
       // console.log("Starting camera cleanup - incremental backend approach (no batch upload needed)");
 
       this.stopIntervalCapture();
+      await this.flushPendingFrames().catch(() => {});
 
       if (this.stream) {
         this.stream.getTracks().forEach((track) => track.stop());
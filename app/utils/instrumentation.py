@@ -0,0 +1,122 @@
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+from ..config import Config
+
+
+class Instrumentation:
+    """
+    Per-process counters, stage timers and sampled debug logs for hot paths.
+
+    Counters and timers are cheap (one lock, no formatting) and read via snapshot().
+    debug() only formats its message when the logger is at DEBUG *and* the call is sampled,
+    so hot paths can describe large objects without paying for it in production.
+    Settings are per process - every gunicorn worker has its own; InstrumentationService
+    keeps them in sync through a shared DB row.
+    """
+
+    def __init__(self, enabled: bool = True, debug_sample_rate: float = 0.0):
+        self.enabled = enabled
+        self.debug_sample_rate = debug_sample_rate
+        self._counters: Dict[str, int] = {}
+        self._timers: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+
+    def configure(self, enabled: Optional[bool] = None, debug_sample_rate: Optional[float] = None,
+                  log_level: Optional[Union[int, str]] = None, logger_name: str = 'app') -> None:
+        """Switch instrumentation at runtime (log_level applies to the app's loggers)"""
+        if enabled is not None:
+            self.enabled = enabled
+        if debug_sample_rate is not None:
+            self.debug_sample_rate = min(1.0, max(0.0, float(debug_sample_rate)))
+        if log_level is not None:
+            logging.getLogger(logger_name).setLevel(
+                logging.getLevelName(log_level.upper()) if isinstance(log_level, str) else log_level
+            )
+
+    def incr(self, name: str, value: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = {'count': 0, 'total': 0.0, 'max': 0.0}
+            timer['count'] += 1
+            timer['total'] += seconds
+            timer['max'] = max(timer['max'], seconds)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block under `name` (errors are counted as `<name>.errors`)"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.incr(f'{name}.errors')
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def should_sample(self, logger: logging.Logger) -> bool:
+        if self.debug_sample_rate <= 0 or not logger.isEnabledFor(logging.DEBUG):
+            return False
+        return self.debug_sample_rate >= 1 or random.random() < self.debug_sample_rate
+
+    def debug(self, logger: logging.Logger, message: Union[str, Callable[[], str]], *args: Any) -> None:
+        """Sampled debug log - pass a callable or %-args so nothing is formatted unless it is emitted"""
+        if not self.should_sample(logger):
+            return
+        logger.debug(message() if callable(message) else message, *args)
+
+    @property
+    def started_at(self) -> float:
+        """Epoch seconds of the last reset (or process start)"""
+        return self._started_at
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            timers = {
+                name: {
+                    'count': int(timer['count']),
+                    'total_ms': round(timer['total'] * 1000, 2),
+                    'avg_ms': round(timer['total'] * 1000 / timer['count'], 2) if timer['count'] else 0.0,
+                    'max_ms': round(timer['max'] * 1000, 2)
+                }
+                for name, timer in self._timers.items()
+            }
+            counters = dict(self._counters)
+        return {
+            'pid': os.getpid(),
+            'enabled': self.enabled,
+            'debug_sample_rate': self.debug_sample_rate,
+            'since': self._started_at,
+            'counters': counters,
+            'timers': timers
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+            self._started_at = time.time()
+
+
+instrumentation = Instrumentation(
+    enabled=Config.INSTRUMENTATION_ENABLED,
+    debug_sample_rate=Config.INSTRUMENTATION_DEBUG_SAMPLE_RATE
+)
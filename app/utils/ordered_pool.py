@@ -0,0 +1,36 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def ordered_map(fn: Callable[[T], R], items: Iterable[T], max_workers: int = 4,
+                max_pending: Optional[int] = None, thread_name_prefix: str = 'OrderedMap') -> Iterator[R]:
+    """
+    Run fn over items on a thread pool, yielding results in input order.
+
+    At most max_pending calls (default 2 * max_workers) are submitted or waiting to be consumed,
+    so a slow consumer applies backpressure instead of buffering every result. Closing the
+    generator early cancels work that has not started yet.
+    """
+    max_workers = max(1, max_workers)
+    max_pending = max(max_workers, max_pending or 2 * max_workers)
+
+    if max_workers == 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
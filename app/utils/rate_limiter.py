@@ -0,0 +1,71 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class AsyncRateLimiter:
+    """
+    Request- and token-per-minute limiter for asyncio callers (one instance per event loop).
+    State is per process - it only matches a provider limit when a single process spends that
+    budget (LLMAnalysisBatchService runs one batch at a time across workers for this reason).
+
+    Both budgets refill continuously (a token bucket holding one minute of capacity), so a
+    batch runs at the provider's sustained rate without bursting past it. Callers reserve an
+    estimate up front and refund what the response shows they did not use.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = max(1, requests_per_minute)
+        self.tokens_per_minute = max(1, tokens_per_minute)
+        self._requests = float(self.requests_per_minute)
+        self._tokens = float(self.tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    async def acquire(self, tokens: int) -> float:
+        """Wait until one request and `tokens` tokens are available; returns seconds waited"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # A single call larger than the whole minute budget would otherwise wait forever
+        tokens = min(tokens, self.tokens_per_minute)
+        waited = 0.0
+        # Holding the lock while sleeping keeps callers first-come, first-served
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return waited
+                delay = max(
+                    (1 - self._requests) * 60 / self.requests_per_minute,
+                    (tokens - self._tokens) * 60 / self.tokens_per_minute,
+                    0.01
+                )
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def refund(self, tokens: int) -> None:
+        """Return reserved tokens the request did not use; a negative amount debits what it used beyond the reservation"""
+        if tokens > 0:
+            self._refill()
+            self._tokens = min(self.tokens_per_minute, self._tokens + tokens)
+        elif tokens < 0:
+            self.consume(-tokens)
+
+    def consume(self, tokens: int) -> None:
+        """Debit tokens spent without a reservation - the bucket may go negative, delaying later acquires"""
+        self._refill()
+        self._tokens -= tokens
+
+    def penalize(self, seconds: float) -> None:
+        """Provider said slow down (429) - drain the request bucket so every caller waits about `seconds`"""
+        self._refill()
+        self._requests = min(self._requests, 1 - seconds * self.requests_per_minute / 60)
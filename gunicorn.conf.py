@@ -0,0 +1,19 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings for the main app - picked up automatically when gunicorn starts in this
+directory (command-line flags such as -k still override them)
+
+These workers also run the APScheduler jobs (exports, verification, analysis batches, facial
+analysis) and the frame writer/transcoder thread pools, which do zlib, PIL, file and gRPC work
+that never yields to a gevent hub - so they stay on gthread. Chat SSE streams are served by a
+separate gevent instance (gunicorn.stream.conf.py) that nginx routes /assessment/llm/stream-async/ to.
+"""
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:6789')  # nginx upstream "mentalhealth"
+workers = int(os.getenv('GUNICORN_WORKERS', '6'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+keepalive = 5
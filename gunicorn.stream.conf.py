@@ -0,0 +1,37 @@
+# gunicorn.stream.conf.py
+"""
+Gunicorn settings for the chat SSE instance: gunicorn -c gunicorn.stream.conf.py wsgi
+
+nginx sends only /assessment/llm/stream-async/ here (upstream "mentalhealth_stream"). gevent
+workers let one worker hold hundreds of open chats (app/services/llm/streamRelay.py). The
+scheduler is switched off so no export, transcode or facial analysis job - CPU and file work
+that would freeze every greenlet on the worker - ever runs on this instance.
+"""
+
+import os
+
+# Read by Config when the app loads in each worker
+os.environ['SCHEDULER_ENABLED'] = 'false'
+
+bind = os.getenv('GUNICORN_STREAM_BIND', '127.0.0.1:6790')
+workers = int(os.getenv('GUNICORN_STREAM_WORKERS', '2'))
+worker_class = 'gevent'
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))  # concurrent requests per worker
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+keepalive = 5
+
+
+def post_fork(server, worker):
+    """Make psycopg2 and gRPC cooperative, otherwise every query or call blocks the whole worker"""
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        server.log.warning("psycogreen not installed - database queries block gevent workers")
+    else:
+        patch_psycopg()
+
+    try:
+        from grpc.experimental import gevent as grpc_gevent
+    except ImportError:
+        return
+    grpc_gevent.init_gevent()